@@ -74,6 +74,13 @@ def create_app(config_name=None):
     # Registra i blueprint
     app.register_blueprint(api_bp)
     app.register_blueprint(web_bp)
+
+    if LIMITER_AVAILABLE:
+        # I delta dell'analisi live arrivano a ogni pausa di scrittura: il
+        # limite di default (200/ora) bloccherebbe una sessione in pochi minuti
+        limiter.limit("1200 per hour")(app.view_functions['api.api_live_delta'])
+        # Endpoint operativo: pochi accessi bastano
+        limiter.limit("30 per hour")(app.view_functions['api.api_cache_stats'])
     
     # Crea le tabelle del database
     with app.app_context():
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Verifica con EXPLAIN che le query della bacheca usino gli indici di poems
+(models.poem.indici_poems, creati da migrate_database.py).
+
+Uso: DATABASE_URL=... python check_query_plans.py
+Esce con codice 1 se una query non usa l'indice atteso. Su PostgreSQL le
+scansioni sequenziali sono disattivate per la sessione: con poche righe il
+pianificatore le preferirebbe comunque, qui si verifica che l'indice sia
+utilizzabile.
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import text
+
+from migrate_database import create_app
+from models.poem import db, Poem, pg_trgm_installato
+from services.authors import filtro_autore
+from services.full_text import filtro_full_text
+from services.pagination import codifica_cursore, query_keyset
+
+# (descrizione, query, indici accettati)
+def query_da_verificare():
+    cursore_data = codifica_cursore('recent', datetime(2024, 1, 1), 1000)
+    verifiche = [
+        ("più recenti, prima pagina",
+         query_keyset(Poem.query, 'recent'),
+         {'ix_poems_created_at_id'}),
+        ("più recenti, dopo un cursore",
+         query_keyset(Poem.query, 'recent', cursore_data),
+         {'ix_poems_created_at_id'}),
+        ("solo valide, più recenti",
+         query_keyset(Poem.query.filter(Poem.is_valid == True), 'recent', cursore_data),
+         {'ix_poems_valid_created_at_id'}),
+        ("per tipo, più recenti",
+         query_keyset(Poem.query.filter(Poem.poem_type == 'haiku'), 'recent', cursore_data),
+         {'ix_poems_type_created_at_id', 'ix_poems_type_id'}),
+        # Autore esatto (/bacheca?autore=): con poche poesie per autore il
+        # pianificatore può preferire l'indice per data
+        ("per autore (uguaglianza)",
+         query_keyset(Poem.query.filter(Poem.author == 'Anonimo'), 'recent'),
+         {'ix_poems_author_id', 'ix_poems_created_at_id'}),
+        ("ordinamento per titolo",
+         query_keyset(Poem.query, 'title', codifica_cursore('title', 'M', 1000)),
+         {'ix_poems_title_id'}),
+        ("ordinamento per autore",
+         query_keyset(Poem.query, 'author', codifica_cursore('author', 'M', 1000)),
+         {'ix_poems_author_id'}),
+        ("ordinamento per tipo",
+         query_keyset(Poem.query, 'type', codifica_cursore('type', 'haiku', 1000)),
+         {'ix_poems_type_id', 'ix_poems_type_created_at_id'}),
+        ("statistiche per tipo (GROUP BY)",
+         db.session.query(Poem.poem_type, db.func.count(Poem.id)).group_by(Poem.poem_type),
+         {'ix_poems_type_created_at_id', 'ix_poems_type_id'}),
+    ]
+    # /api/bacheca?autore= (ILIKE '%...%'): nessun btree serve il filtro. Su
+    # PostgreSQL deve usare l'indice trigrammi; altrove il filtro scorre tutte
+    # le righe e l'indice verificato è solo quello dell'ordine per data
+    filtro = query_keyset(filtro_autore(Poem.query, 'nonim'), 'recent')
+    if db.engine.dialect.name != 'postgresql':
+        verifiche.append(("filtro autore (sottostringa): senza indice, solo ordine per data",
+                          filtro, {'ix_poems_created_at_id'}))
+    else:
+        with db.engine.connect() as conn:
+            trgm = pg_trgm_installato(conn)
+        if trgm:
+            verifiche.append(("filtro autore (sottostringa, trigrammi)", filtro, {'ix_poems_author_trgm'}))
+        else:
+            print("⚠️  Estensione pg_trgm assente: il filtro autore scorre tutta la tabella "
+                  "(eseguire migrate_database.py con un ruolo che possa installarla)")
+    ricerca = filtro_full_text(Poem.query, 'rana stagno')
+    if ricerca is None:
+        print("⚠️  Indice full-text assente: la ricerca usa LIKE (eseguire migrate_database.py)")
+    else:
+        query, punteggio = ricerca
+        # SQLite: "SCAN poems_fts VIRTUAL TABLE INDEX ..." (MATCH sull'indice FTS5)
+        verifiche.append(("ricerca full-text per pertinenza",
+                          query_keyset(query, 'relevance', punteggio=punteggio),
+                          {'ix_poems_search_vector', 'poems_fts VIRTUAL TABLE'}))
+    return verifiche
+
+
+def piano(conn, query, is_postgres):
+    """Righe del piano di esecuzione (testo) per una query ORM"""
+    if is_postgres:
+        # Parametri passati al driver: literal_binds non sa scrivere il regconfig di to_tsquery
+        compilata = query.statement.compile(dialect=db.engine.dialect)
+        return [row[0] for row in conn.exec_driver_sql('EXPLAIN ' + str(compilata), compilata.params)]
+    sql = str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    return [row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql))]
+
+
+def check_plans():
+    app = create_app()
+    fallite = 0
+    with app.app_context():
+        is_postgres = db.engine.dialect.name == 'postgresql'
+        print(f"=== PIANI DI ESECUZIONE ({db.engine.dialect.name}) ===")
+        with db.engine.begin() as conn:
+            if is_postgres:
+                conn.execute(text('SET LOCAL enable_seqscan = off'))
+            for descrizione, query, attesi in query_da_verificare():
+                righe = piano(conn, query, is_postgres)
+                testo = '\n'.join(righe)
+                usati = sorted(nome for nome in attesi if nome in testo)
+                if usati:
+                    print(f"✅ {descrizione}: {', '.join(usati)}")
+                else:
+                    fallite += 1
+                    print(f"❌ {descrizione}: nessuno di {sorted(attesi)}")
+                if not is_postgres and 'USE TEMP B-TREE FOR ORDER BY' in testo:
+                    print("   ⚠️  ordinamento non coperto dall'indice (TEMP B-TREE)")
+                for riga in righe:
+                    print(f"     {riga}")
+    if fallite:
+        print(f"\n❌ {fallite} query senza l'indice atteso: eseguire migrate_database.py")
+    else:
+        print("\n✅ Tutte le query usano un indice")
+    return fallite == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_plans() else 1)
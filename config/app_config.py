@@ -14,6 +14,9 @@ class Config:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL or 'sqlite:///poems.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Token per gli endpoint operativi (/api/cache/stats), header X-Admin-Token
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
     # Configurazioni per JSON
     JSON_AS_ASCII = False  # Supporto caratteri Unicode
     JSONIFY_PRETTYPRINT_REGULAR = True
@@ -39,6 +42,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
 
 # Dizionario delle configurazioni
 config = {
@@ -6,7 +6,11 @@ Può essere eseguito su Heroku con: heroku run python migrate_database.py
 import os
 from flask import Flask
 from sqlalchemy import text
-from models.poem import db, Poem
+from sqlalchemy.schema import CreateIndex
+from models.poem import (
+    db, Poem, indici_poems, DDL_ESTENSIONE_TRGM, INDICE_AUTORE_TRGM,
+    DDL_FTS_POSTGRES, DDL_FTS_SQLITE, sqlite_supporta_fts5
+)
 
 def create_app():
     """Crea l'app Flask per la migrazione"""
@@ -23,6 +27,105 @@ def create_app():
     db.init_app(app)
     return app
 
+def pg_invalid_indexes(conn):
+    """Nomi degli indici di poems rimasti INVALID (build concorrente interrotta)"""
+    return {
+        row[0] for row in conn.execute(text(
+            """
+            SELECT c.relname
+            FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'poems'::regclass AND NOT i.indisvalid
+            """
+        ))
+    }
+
+def create_indexes(is_postgres: bool):
+    """Crea gli indici della bacheca (models.poem.indici_poems) se mancano.
+
+    Su PostgreSQL usa CREATE INDEX CONCURRENTLY, che non blocca le scritture
+    ma non può stare in una transazione: ogni indice va in autocommit. Un
+    indice rimasto INVALID da una build concorrente interrotta viene
+    eliminato e ricreato (IF NOT EXISTS lo salterebbe).
+    """
+    indici = indici_poems(db.engine.dialect.name)
+    if is_postgres:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            invalidi = pg_invalid_indexes(conn)
+            for indice in indici:
+                if indice.name in invalidi:
+                    print(f"🔄 Indice '{indice.name}' non valido: lo ricreo...")
+                    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {indice.name}'))
+                ddl = str(CreateIndex(indice, if_not_exists=True).compile(dialect=db.engine.dialect))
+                print(f"➕ Indice '{indice.name}'...")
+                conn.execute(text(ddl.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)))
+            conn.execute(text('ANALYZE poems'))
+    else:
+        with db.engine.begin() as conn:
+            for indice in indici:
+                print(f"➕ Indice '{indice.name}'...")
+                conn.execute(CreateIndex(indice, if_not_exists=True))
+            # Statistiche per il pianificatore (sqlite_stat1)
+            conn.execute(text('ANALYZE poems'))
+    print(f"✅ Indici verificati ({len(indici)})")
+
+def create_author_trgm_index():
+    """Indice a trigrammi su poems.author (solo PostgreSQL, usato da services.authors).
+
+    Serve l'estensione pg_trgm: se non si può installare (permessi) il filtro
+    per autore resta un ILIKE senza indice. Su SQLite services.authors usa
+    un indice in memoria e qui non c'è nulla da fare.
+    """
+    nome = INDICE_AUTORE_TRGM.name
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        try:
+            print("➕ Estensione 'pg_trgm'...")
+            conn.execute(text(DDL_ESTENSIONE_TRGM))
+        except Exception as e:
+            print(f"⚠️  Estensione pg_trgm non disponibile, indice '{nome}' saltato: {e}")
+            return
+        if nome in pg_invalid_indexes(conn):
+            print(f"🔄 Indice '{nome}' non valido: lo ricreo...")
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {nome}'))
+        ddl = str(CreateIndex(INDICE_AUTORE_TRGM, if_not_exists=True).compile(dialect=db.engine.dialect))
+        print(f"➕ Indice GIN '{nome}'...")
+        conn.execute(text(ddl.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)))
+    print("✅ Indice autori (pg_trgm) pronto")
+
+def create_full_text_index(is_postgres: bool):
+    """Indice full-text della ricerca (models.poem, usato da services.full_text).
+
+    PostgreSQL: colonna generata search_vector (l'aggiunta riscrive la tabella
+    sotto lock) e indice GIN creato CONCURRENTLY. SQLite: tabella FTS5 con i
+    trigger di allineamento, popolata con 'rebuild' alla creazione; se la
+    libreria SQLite non ha FTS5 la ricerca resta su LIKE.
+    """
+    if is_postgres:
+        colonna, indice = DDL_FTS_POSTGRES
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            print("➕ Colonna 'search_vector' (tsvector generato)...")
+            conn.execute(text(colonna))
+            if 'ix_poems_search_vector' in pg_invalid_indexes(conn):
+                print("🔄 Indice 'ix_poems_search_vector' non valido: lo ricreo...")
+                conn.execute(text('DROP INDEX CONCURRENTLY IF EXISTS ix_poems_search_vector'))
+            print("➕ Indice GIN 'ix_poems_search_vector'...")
+            conn.execute(text(indice.replace('CREATE INDEX', 'CREATE INDEX CONCURRENTLY', 1)))
+        print("✅ Ricerca full-text (tsvector) pronta")
+        return
+
+    with db.engine.begin() as conn:
+        if not sqlite_supporta_fts5(conn):
+            print("⚠️  SQLite senza FTS5: la ricerca userà LIKE")
+            return
+        esistente = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'poems_fts'"
+        )).first() is not None
+        for ddl in DDL_FTS_SQLITE:
+            conn.execute(text(ddl))
+        if not esistente:
+            print("🔄 Popolamento indice FTS5 dalle poesie esistenti...")
+            conn.execute(text("INSERT INTO poems_fts(poems_fts) VALUES ('rebuild')"))
+    print("✅ Ricerca full-text (FTS5) pronta")
+
 def migrate_schema():
     """Migra lo schema del database"""
     app = create_app()
@@ -110,6 +213,11 @@ def migrate_schema():
                     if 'likes' not in columns:
                         print("➕ Aggiunta colonna 'likes'...")
                         exec_ddl("ALTER TABLE poems ADD COLUMN likes INTEGER DEFAULT 0")
+                    
+                    # Indici per filtri e ordinamenti della bacheca
+                    create_indexes(is_postgres=True)
+                    create_author_trgm_index()
+                    create_full_text_index(is_postgres=True)
                         
                 else:
                     print("🆕 Creazione nuova tabella 'poems'...")
@@ -131,6 +239,10 @@ def migrate_schema():
                 
                 # Esegui comunque create_all per eventuali nuove tabelle
                 db.create_all()
+                
+                # create_all non aggiunge indici a tabelle già esistenti
+                create_indexes(is_postgres=False)
+                create_full_text_index(is_postgres=False)
                 print("✅ Schema aggiornato")
             
             print("✅ Migrazione completata con successo!")
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -56,9 +57,154 @@ class Poem(db.Model):
             title=title,
             content=content,
             author=author,
-            verse_count=analysis.get('num_versi', 0),
-            syllable_counts=','.join(map(str, analysis.get('sillabe_per_verso', []))),
-            rhyme_scheme=analysis.get('schema_rime', ''),
             poem_type=poem_type_final,
-            is_valid=analysis.get('rispetta_metrica', False)
+            **cls.campi_analisi(analysis)
         )
+
+    @staticmethod
+    def campi_analisi(analysis):
+        """Colonne metriche ricavate dall'analisi (anche per la rianalisi, utils.reanalyze_poems)"""
+        return {
+            'verse_count': analysis.get('num_versi', 0),
+            'syllable_counts': ','.join(map(str, analysis.get('sillabe_per_verso', []))),
+            'rhyme_scheme': analysis.get('schema_rime', ''),
+            'is_valid': analysis.get('rispetta_metrica', False),
+        }
+
+
+# Indici per le query della bacheca: filtri (is_valid, poem_type, author) e
+# ordinamenti della paginazione keyset (services.pagination), sempre con id
+# come spareggio. "Più recenti" è created_at DESC NULLS LAST, id DESC:
+# NULLS LAST negli indici esiste solo su PostgreSQL, su SQLite i NULL stanno
+# già in fondo con DESC. migrate_database.py li crea sui database esistenti.
+INDICI_PER_DATA = {
+    'ix_poems_created_at_id': (),
+    'ix_poems_valid_created_at_id': (Poem.is_valid,),
+    'ix_poems_type_created_at_id': (Poem.poem_type,),  # anche GROUP BY poem_type
+}
+INDICI_ORDINAMENTO = {
+    'ix_poems_title_id': (Poem.title, Poem.id),
+    # Ordinamento per autore, autore esatto (/bacheca?autore=) ed elenco autori;
+    # il filtro per sottostringa (ILIKE '%...%') lo serve ix_poems_author_trgm
+    'ix_poems_author_id': (Poem.author, Poem.id),
+    'ix_poems_type_id': (Poem.poem_type, Poem.id),
+}
+
+
+def _non_postgres(ddl, target, bind, dialect=None, **kw):
+    return dialect is None or dialect.name != 'postgresql'
+
+
+def _crea_indici():
+    """Index per PostgreSQL e per gli altri dialetti (create_all sceglie con ddl_if)"""
+    indici = {'postgresql': [], 'altri': []}
+    for nome, colonne in INDICI_PER_DATA.items():
+        indici['postgresql'].append(db.Index(
+            nome, *colonne, Poem.created_at.desc().nulls_last(), Poem.id.desc()
+        ).ddl_if(dialect='postgresql'))
+        indici['altri'].append(db.Index(
+            nome, *colonne, Poem.created_at.desc(), Poem.id.desc()
+        ).ddl_if(callable_=_non_postgres))
+    for nome, colonne in INDICI_ORDINAMENTO.items():
+        indice = db.Index(nome, *colonne)
+        indici['postgresql'].append(indice)
+        indici['altri'].append(indice)
+    return indici
+
+
+_INDICI = _crea_indici()
+
+
+def indici_poems(dialetto):
+    """Indici della tabella poems per un dialetto SQLAlchemy (es. 'postgresql', 'sqlite')"""
+    return list(_INDICI['postgresql' if dialetto == 'postgresql' else 'altri'])
+
+
+# Filtro per autore (sottostringa) e autocompletamento di /api/authors
+# (services.authors): solo su PostgreSQL, indice GIN trigrammi (estensione
+# pg_trgm) che serve ILIKE '%...%' e la somiglianza (operatore %). Sugli
+# altri dialetti c'è l'indice in memoria di services.authors.
+# L'estensione la installa migrate_database.py (serve un ruolo con i
+# permessi): create_all crea l'indice solo se l'estensione c'è già.
+DDL_ESTENSIONE_TRGM = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+
+
+def pg_trgm_installato(conn):
+    """True se l'estensione pg_trgm è installata nel database PostgreSQL"""
+    return conn.exec_driver_sql("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").first() is not None
+
+
+def _postgres_con_trgm(ddl, target, bind, dialect=None, **kw):
+    return (dialect is not None and dialect.name == 'postgresql'
+            and bind is not None and pg_trgm_installato(bind))
+
+
+INDICE_AUTORE_TRGM = db.Index(
+    'ix_poems_author_trgm', Poem.author,
+    postgresql_using='gin', postgresql_ops={'author': 'gin_trgm_ops'}
+).ddl_if(callable_=_postgres_con_trgm)
+
+
+# Indice full-text per la ricerca della bacheca (services.full_text).
+# PostgreSQL: colonna generata tsvector (configurazione italiana, pesi
+# titolo > autore > testo) con indice GIN; la colonna non è mappata sul
+# modello, la usano solo le query di ricerca. SQLite: tabella FTS5 "ombra"
+# (external content su poems) tenuta allineata da trigger.
+CONFIGURAZIONE_FTS_POSTGRES = 'italian'
+DDL_FTS_POSTGRES = [
+    f"""
+    ALTER TABLE poems ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('{CONFIGURAZIONE_FTS_POSTGRES}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{CONFIGURAZIONE_FTS_POSTGRES}', coalesce(author, '')), 'B') ||
+        setweight(to_tsvector('{CONFIGURAZIONE_FTS_POSTGRES}', coalesce(content, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_poems_search_vector ON poems USING GIN (search_vector)",
+]
+DDL_FTS_SQLITE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS poems_fts USING fts5(
+        title, author, content,
+        content='poems', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS poems_fts_ai AFTER INSERT ON poems BEGIN
+        INSERT INTO poems_fts(rowid, title, author, content)
+        VALUES (new.id, new.title, new.author, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS poems_fts_ad AFTER DELETE ON poems BEGIN
+        INSERT INTO poems_fts(poems_fts, rowid, title, author, content)
+        VALUES ('delete', old.id, old.title, old.author, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS poems_fts_au AFTER UPDATE OF title, author, content ON poems BEGIN
+        INSERT INTO poems_fts(poems_fts, rowid, title, author, content)
+        VALUES ('delete', old.id, old.title, old.author, old.content);
+        INSERT INTO poems_fts(rowid, title, author, content)
+        VALUES (new.id, new.title, new.author, new.content);
+    END
+    """,
+]
+
+
+def sqlite_supporta_fts5(conn):
+    """True se la libreria SQLite in uso è compilata con FTS5"""
+    opzioni = {row[0] for row in conn.exec_driver_sql('PRAGMA compile_options')}
+    return 'ENABLE_FTS5' in opzioni
+
+
+def _sqlite_con_fts5(ddl, target, bind, dialect=None, **kw):
+    return dialect is not None and dialect.name == 'sqlite' and sqlite_supporta_fts5(bind)
+
+
+# Tabelle nuove (create_all): l'indice nasce con la tabella; per quelle
+# esistenti provvede migrate_database.py
+for _ddl in DDL_FTS_POSTGRES:
+    event.listen(Poem.__table__, 'after_create', DDL(_ddl).execute_if(dialect='postgresql'))
+for _ddl in DDL_FTS_SQLITE:
+    event.listen(Poem.__table__, 'after_create', DDL(_ddl).execute_if(callable_=_sqlite_con_fts5))
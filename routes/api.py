@@ -1,10 +1,32 @@
-from flask import Blueprint, request, jsonify, session, current_app
+from flask import Blueprint, Response, request, jsonify, session, current_app, stream_with_context
 from functools import wraps
+import hmac
+from itertools import chain
+import json
+import queue
+import re
+import threading
+import time
 
 from utils.text_processing import sanitize_user_text
-from services.poetry_analyzer import analizza_poesia_completa
+from services.poetry_analyzer import (
+    analizza_poesia, analizza_poesie_batch, forme_vicine, statistiche_cache_analisi,
+    statistiche_cache_versi, statistiche_coalescenza,
+)
+from services.rhyme_index import IndiceRime
+from services.suggest_index import get_indice_metrico
+from services.rhyme_analyzer import rhyme_key, cache_rime
+from services.syllable_analyzer import statistiche_cache_sillabe
+from services.lexicon import get_lessico
+from services.live_session import (
+    get_sessione_live, libera_stream_live, nuova_sessione_live, occupa_stream_live,
+)
+from services.authors import MAX_AUTORI_SUGGERITI, cerca_autori, filtro_autore, invalida_indice_autori
+from services.pagination import (
+    ORDINAMENTO_PREDEFINITO, conta_totale, invalida_totali_bacheca, normalizza_ordinamento, pagina_keyset
+)
 from models.poem import Poem, db
-from config.constants import SCHEMI_POESIA
+from services.form_registry import FORME, PATTERN_SILLABE, SCHEMI_RIMA_ATTESI
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -30,6 +52,137 @@ def require_json(f):
     return wrapper
 
 
+def require_admin(f):
+    """Decorator per gli endpoint operativi (statistiche interne).
+
+    Aperti solo in debug/testing oppure con l'header X-Admin-Token uguale ad
+    ADMIN_TOKEN; altrimenti 404, per non rivelarne l'esistenza.
+    """
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not (current_app.debug or current_app.testing):
+            atteso = current_app.config.get('ADMIN_TOKEN')
+            fornito = request.headers.get('X-Admin-Token', '')
+            if not atteso or not hmac.compare_digest(fornito.encode('utf-8'), atteso.encode('utf-8')):
+                return jsonify({'error': True, 'message': 'Risorsa non trovata'}), 404
+        return f(*args, **kwargs)
+
+    return wrapper
+
+
+# Indice delle rime per /api/rhymes: costruito e aggiornato da un thread in
+# background, così le richieste non aspettano mai (prima della costruzione
+# /api/rhymes risponde 503). La sincronizzazione aggiunge le poesie nuove per
+# id crescente; se ne sono sparite alcune già indicizzate (cancellate, anche
+# da altri processi) e comunque ogni INTERVALLO_RICOSTRUZIONE_RIME secondi
+# (testi modificati) l'indice viene ricostruito da capo e sostituito
+_indice_rime = None
+_indice_rime_sync_lock = threading.Lock()  # al più una costruzione/sincronizzazione alla volta
+_indice_rime_sync = 0.0
+_indice_rime_costruito = 0.0
+_indice_rime_sync_richiesta = False
+INTERVALLO_SYNC_RIME = 60  # secondi: raccoglie anche le poesie inserite da altri worker
+INTERVALLO_RICOSTRUZIONE_RIME = 3600
+
+
+def _costruisci_indice_rime():
+    """Nuovo indice con le forme del lessico e tutte le poesie"""
+    nuovo = IndiceRime()
+    lessico = get_lessico()
+    if lessico is not None:
+        # Le forme del lessico entrano con 0 occorrenze (visibili con min_count=0)
+        for parola, _, suono in lessico.voci():
+            nuovo.aggiungi_parola(parola, 0, suono)
+    _sincronizza_indice_rime(nuovo)
+    return nuovo
+
+
+def _sincronizza_indice_rime(indice):
+    """Aggiunge all'indice le poesie con id successivo all'ultimo indicizzato.
+
+    Restituisce False (senza modificare l'indice) se alcune poesie già
+    indicizzate non ci sono più: l'indice va ricostruito.
+    """
+    global _indice_rime_sync
+    presenti = db.session.query(db.func.count(Poem.id)).filter(Poem.id <= indice.ultimo_id).scalar()
+    if presenti != indice.num_poesie:
+        return False
+    nuove = db.session.query(Poem.id, Poem.content).filter(
+        Poem.id > indice.ultimo_id
+    ).order_by(Poem.id.asc()).all()
+    for poem_id, content in nuove:
+        indice.aggiungi_testo(content)
+        indice.ultimo_id = poem_id
+        indice.num_poesie += 1
+    _indice_rime_sync = time.monotonic()
+    return True
+
+
+def _sincronizza_in_background(app):
+    """Corpo del thread di sincronizzazione (tiene _indice_rime_sync_lock)"""
+    global _indice_rime, _indice_rime_costruito, _indice_rime_sync_richiesta
+    try:
+        with app.app_context():
+            while True:
+                _indice_rime_sync_richiesta = False
+                try:
+                    indice = _indice_rime
+                    if (indice is None
+                            or time.monotonic() - _indice_rime_costruito > INTERVALLO_RICOSTRUZIONE_RIME
+                            or not _sincronizza_indice_rime(indice)):
+                        # Le richieste continuano a usare il vecchio indice fino allo scambio
+                        _indice_rime = _costruisci_indice_rime()
+                        _indice_rime_costruito = time.monotonic()
+                except Exception as e:
+                    print(f"Aggiornamento indice rime fallito: {e}")
+                    break
+                # Poesie pubblicate mentre la sincronizzazione era in corso
+                if not _indice_rime_sync_richiesta:
+                    break
+    finally:
+        _indice_rime_sync_lock.release()
+
+
+def _avvia_sincronizzazione_rime():
+    """Avvia costruzione o sincronizzazione in background senza attendere; se
+    è già in corso la fa ripetere alla fine"""
+    global _indice_rime_sync_richiesta
+    _indice_rime_sync_richiesta = True
+    if not _indice_rime_sync_lock.acquire(blocking=False):
+        return
+    try:
+        threading.Thread(
+            target=_sincronizza_in_background,
+            args=(current_app._get_current_object(),),
+            name='sync-indice-rime',
+            daemon=True,
+        ).start()
+    except Exception:
+        _indice_rime_sync_lock.release()
+        raise
+
+
+def get_indice_rime():
+    """Restituisce l'indice delle rime attuale, None finché la prima
+    costruzione non è finita; se manca o è vecchio avvia l'aggiornamento in
+    background"""
+    indice = _indice_rime
+    if indice is None or time.monotonic() - _indice_rime_sync > INTERVALLO_SYNC_RIME:
+        _avvia_sincronizzazione_rime()
+    return indice
+
+
+def aggiorna_indice_rime():
+    """Da chiamare dopo l'inserimento di una poesia (se l'indice è in memoria o in costruzione)"""
+    if _indice_rime is None and not _indice_rime_sync_lock.locked():
+        return
+    try:
+        _avvia_sincronizzazione_rime()
+    except Exception as e:
+        print(f"Aggiornamento indice rime fallito: {e}")
+
+
 def format_poem_type_label(raw_type: str | None, default: str = 'poesia') -> str:
     """Normalizza una tipologia per uso testuale/UI (non per logica interna).
 
@@ -129,29 +282,12 @@ def validate_rhyme_pattern(analyzed_scheme, expected_scheme, analisi_rime=None,
     return False, errors
 
 def get_expected_rhyme_scheme(tipo_poesia):
-    """Restituisce lo schema rime atteso per un tipo di poesia"""
-    # Prima controlla negli schemi predefiniti
-    if tipo_poesia in SCHEMI_POESIA and 'rima' in SCHEMI_POESIA[tipo_poesia]:
-        schema_predefinito = SCHEMI_POESIA[tipo_poesia]['rima']
-        if schema_predefinito:
-            return schema_predefinito
-    
-    # Schemi di default per tipi comuni
-    schemi_attesi = {
-        'sonetto': ['ABBA', 'ABBA', 'CDC', 'DCD'],
-        'quartina': ['ABAB'],  # Schema più comune
-        'quartina (rima alternata)': ['ABAB'],
-        'quartina (rima baciata)': ['AABB'],
-        'quartina (rima incrociata)': ['ABBA'],
-        'terzina_dantesca': ['ABA'],
-        'terzina (rima continua)': ['AAA'],
-        'limerick': ['AABBA'],
-        'ballad': ['ABCB'],
-        'clerihew': ['AABB'],
-        'stornello': ['ABA']
-    }
-    
-    return schemi_attesi.get(tipo_poesia, [])
+    """Restituisce lo schema rime atteso per un tipo di poesia.
+
+    Schemi predefiniti di SCHEMI_POESIA, altrimenti default per i tipi comuni
+    (tabella precompilata in services.form_registry).
+    """
+    return SCHEMI_RIMA_ATTESI.get(tipo_poesia, ())
 
 def convert_rhyme_scheme_to_frontend(schema_string, tipo_poesia):
     """Converte lo schema rime da stringa al formato array compatibile con frontend"""
@@ -159,10 +295,9 @@ def convert_rhyme_scheme_to_frontend(schema_string, tipo_poesia):
         return []
     
     # Se il tipo di poesia ha uno schema predefinito, usalo per dividere correttamente
-    if tipo_poesia in SCHEMI_POESIA and 'rima' in SCHEMI_POESIA[tipo_poesia]:
-        schema_predefinito = SCHEMI_POESIA[tipo_poesia]['rima']
-        if schema_predefinito:
-            return schema_predefinito
+    forma = FORME.get(tipo_poesia)
+    if forma is not None and forma.rima:
+        return forma.rima
     
     # Altrimenti, cerca di dividere in base a pattern comuni
     schema = schema_string.strip()
@@ -190,156 +325,226 @@ def convert_rhyme_scheme_to_frontend(schema_string, tipo_poesia):
     
     return groups if groups else [schema]
 
-@api_bp.route('/analyze', methods=['POST'])
-@require_json
-def api_analizza():
-    """API endpoint per analizzare una poesia"""
-    try:
-        data = request.get_json() or {}
-        
-        if not data or 'text' not in data:
-            return jsonify({'error': True, 'message': 'Testo non fornito'}), 400
-        
-        testo = data['text']
-        if not testo or not testo.strip():
-            return jsonify({'error': True, 'message': 'Testo vuoto'}), 400
-        
-        # Parametro tolleranza opzionale (default: False per precisione assoluta)
-        use_tolerance = data.get('use_tolerance', False)
-        
-        # Validazioni di base: consenti componimenti più lunghi (es. sonetto)
-        # Alza il limite a 2000 caratteri per evitare falsi negativi sui sonetti
-        if len(testo) > 2000:
-            return jsonify({
-                'error': True,
-                'error_type': 'too_long',
-                'message': 'Il testo è troppo lungo (max 2000 caratteri).'
-            }), 400
-        
-        # Verifica tag HTML
-        import re
-        if re.search(r'<[^>]+>', testo):
-            return jsonify({
+_TAG_HTML_RE = re.compile(r'<[^>]+>')
+
+# Numero massimo di poesie per /api/analyze/batch
+MAX_BATCH_ANALISI = 500
+
+# /api/analyze/stream: corpo massimo (al posto di MAX_CONTENT_LENGTH) e
+# lunghezza massima di una riga letta dal corpo
+MAX_BYTES_STREAM = 512 * 1024 * 1024
+MAX_BYTES_RIGA_STREAM = 16 * 1024
+MAX_CARATTERI_POESIA = 2000
+
+# /api/live: durata massima di uno stream SSE (poi il client si riconnette
+# alla stessa sessione dopo RICONNESSIONE_LIVE_MS) e intervallo dei commenti
+# keep-alive. Stream brevi: ogni stream tiene occupato un thread del worker
+DURATA_MAX_STREAM_LIVE = 15
+INTERVALLO_PING_LIVE = 10
+RICONNESSIONE_LIVE_MS = 1000
+
+def _analizza_richiesta(data):
+    """Analisi per /api/analyze: restituisce (payload, status) senza serializzare.
+
+    Passa da cache_analisi (analisi e poi pubblicazione dello stesso testo);
+    le eccezioni sono gestite dal chiamante.
+    """
+    errore = _valida_richiesta(data)
+    if errore:
+        return errore
+    use_tolerance = data.get('use_tolerance', False)
+    analisi = analizza_poesia(data['text'], use_tolerance=use_tolerance)
+    return _risposta_analisi(data, analisi, use_tolerance)
+
+def _analizza_richieste(richieste):
+    """Come _analizza_richiesta per più richieste, senza passare da cache_analisi.
+
+    Un corpus analizzato in blocco non deve scalzare dalla cache le analisi
+    dell'editor: i testi con la stessa tolleranza sono analizzati insieme con
+    analizza_poesie_batch (ogni parola distinta contata una volta). Restituisce
+    (payload, status) nello stesso ordine; gli errori restano confinati alla
+    singola richiesta.
+    """
+    risultati = [None] * len(richieste)
+    gruppi = {}
+    for i, data in enumerate(richieste):
+        try:
+            risultati[i] = _valida_richiesta(data)
+        except Exception as e:
+            risultati[i] = {'error': True, 'message': f'Errore durante l\'analisi: {str(e)}'}, 500
+        if risultati[i] is None:
+            gruppi.setdefault(bool(data.get('use_tolerance', False)), []).append(i)
+
+    for use_tolerance, indici in gruppi.items():
+        testi = list(dict.fromkeys(richieste[i]['text'] for i in indici))
+        try:
+            per_testo = dict(zip(testi, analizza_poesie_batch(testi, use_tolerance)))
+        except Exception:
+            # Un testo che fa fallire il blocco: si riprova un testo alla volta
+            per_testo = {}
+        for i in indici:
+            testo = richieste[i]['text']
+            try:
+                if testo not in per_testo:
+                    per_testo[testo] = analizza_poesie_batch([testo], use_tolerance)[0]
+                risultati[i] = _risposta_analisi(richieste[i], per_testo[testo], use_tolerance)
+            except Exception as e:
+                risultati[i] = {'error': True, 'message': f'Errore durante l\'analisi: {str(e)}'}, 500
+    return risultati
+
+def _valida_richiesta(data):
+    """(payload, status) di errore per una richiesta non valida, altrimenti None"""
+    if not data or 'text' not in data:
+        return {'error': True, 'message': 'Testo non fornito'}, 400
+    
+    testo = data['text']
+    if not testo or not testo.strip():
+        return {'error': True, 'message': 'Testo vuoto'}, 400
+    
+    # Validazioni di base: consenti componimenti più lunghi (es. sonetto)
+    # Alza il limite a 2000 caratteri per evitare falsi negativi sui sonetti
+    if len(testo) > 2000:
+        return {
+            'error': True,
+            'error_type': 'too_long',
+            'message': 'Il testo è troppo lungo (max 2000 caratteri).'
+        }, 400
+    
+    # Verifica tag HTML
+    if _TAG_HTML_RE.search(testo):
+        return {
+            'error': True,
+            'error_type': 'invalid_input',
+            'message': 'Il testo contiene caratteri non ammessi.'
+        }, 400
+    return None
+
+def _risposta_analisi(data, analisi, use_tolerance):
+    """Payload di /api/analyze per una richiesta valida e la sua analisi"""
+    # Verifica errori nell'analisi
+    if 'errore' in analisi:
+        return {
+            'error': True,
+            'message': f'Errore nell\'analisi: {analisi["errore"]}'
+        }, 500
+
+    # Determina il tipo di poesia: se non fornito, usa quello riconosciuto dall'analizzatore
+    tipo_poesia_req = (data.get('type') or '').strip().lower()
+    tipo_poesia = tipo_poesia_req if tipo_poesia_req else analisi.get('tipo_riconosciuto', 'versi_liberi')
+    
+    # Ottieni il pattern aspettato per questo tipo di poesia
+    pattern = get_syllable_pattern(tipo_poesia)
+    
+    # Verifica numero di versi
+    num_versi = len(analisi['versi'])
+    if tipo_poesia != 'versi_liberi' and pattern:
+        if num_versi < len(pattern):
+            return {
                 'error': True,
-                'error_type': 'invalid_input',
-                'message': 'Il testo contiene caratteri non ammessi.'
-            }), 400
-        
-        # Analizza la poesia (passando parametro tolleranza)
-        analisi = analizza_poesia_completa(testo, use_tolerance=use_tolerance)
-        
-        # Verifica errori nell'analisi
-        if 'errore' in analisi:
-            return jsonify({
+                'error_type': 'too_few_verses',
+                'poem_type': tipo_poesia,
+                'pattern': pattern,
+                'required': len(pattern),
+                'received': num_versi,
+                'message': f'Poesia troppo corta! Un {tipo_poesia} richiede {len(pattern)} versi.'
+            }, 200
+        elif num_versi > len(pattern):
+            return {
                 'error': True,
-                'message': f'Errore nell\'analisi: {analisi["errore"]}'
-            }), 500
-
-        # Determina il tipo di poesia: se non fornito, usa quello riconosciuto dall'analizzatore
-        tipo_poesia_req = (data.get('type') or '').strip().lower()
-        tipo_poesia = tipo_poesia_req if tipo_poesia_req else analisi.get('tipo_riconosciuto', 'versi_liberi')
+                'error_type': 'too_many_verses',
+                'poem_type': tipo_poesia,
+                'pattern': pattern,
+                'required': len(pattern),
+                'received': num_versi,
+                'message': f'Poesia troppo lunga! Un {tipo_poesia} richiede {len(pattern)} versi.'
+            }, 200
+    
+    # Formatta la risposta per il frontend
+    results = []
+    for i, verso in enumerate(analisi['versi']):
+        sillabe = analisi['sillabe_per_verso'][i]
+        # Determina il target basato sul tipo di poesia
+        target = get_target_sillabe(tipo_poesia, i)
         
-        # Ottieni il pattern aspettato per questo tipo di poesia
-        pattern = get_syllable_pattern(tipo_poesia)
+        # Estrai informazioni sulle rime per questo verso
+        rhyme_info = None
+        if 'analisi_rime' in analisi and 'schema' in analisi['analisi_rime']:
+            schema = analisi['analisi_rime']['schema']
+            if i < len(schema):
+                rhyme_info = schema[i] if schema[i] != '-' else None
         
-        # Verifica numero di versi
-        num_versi = len(analisi['versi'])
-        if tipo_poesia != 'versi_liberi' and pattern:
-            if num_versi < len(pattern):
-                return jsonify({
-                    'error': True,
-                    'error_type': 'too_few_verses',
-                    'poem_type': tipo_poesia,
-                    'pattern': pattern,
-                    'required': len(pattern),
-                    'received': num_versi,
-                    'message': f'Poesia troppo corta! Un {tipo_poesia} richiede {len(pattern)} versi.'
-                })
-            elif num_versi > len(pattern):
-                return jsonify({
-                    'error': True,
-                    'error_type': 'too_many_verses',
-                    'poem_type': tipo_poesia,
-                    'pattern': pattern,
-                    'required': len(pattern),
-                    'received': num_versi,
-                    'message': f'Poesia troppo lunga! Un {tipo_poesia} richiede {len(pattern)} versi.'
-                })
+        result_item = {
+            'verse': i + 1,
+            'text': verso,
+            'syllables': sillabe,
+            'target': target,
+            'correct': sillabe == target if target else True
+        }
         
-        # Formatta la risposta per il frontend
-        results = []
-        for i, verso in enumerate(analisi['versi']):
-            sillabe = analisi['sillabe_per_verso'][i]
-            # Determina il target basato sul tipo di poesia
-            target = get_target_sillabe(tipo_poesia, i)
-            
-            # Estrai informazioni sulle rime per questo verso
-            rhyme_info = None
-            if 'analisi_rime' in analisi and 'schema' in analisi['analisi_rime']:
-                schema = analisi['analisi_rime']['schema']
-                if i < len(schema):
-                    rhyme_info = schema[i] if schema[i] != '-' else None
-            
-            result_item = {
-                'verse': i + 1,
-                'text': verso,
-                'syllables': sillabe,
-                'target': target,
-                'correct': sillabe == target if target else True
-            }
+        # Aggiungi informazioni sulle rime se disponibili (sempre per i versi liberi)
+        if rhyme_info:
+            result_item['rhyme'] = rhyme_info
+        elif tipo_poesia == 'versi_liberi':
+            # Per i versi liberi, aggiungi sempre il campo rhyme anche se null
+            result_item['rhyme'] = None
             
-            # Aggiungi informazioni sulle rime se disponibili (sempre per i versi liberi)
-            if rhyme_info:
-                result_item['rhyme'] = rhyme_info
-            elif tipo_poesia == 'versi_liberi':
-                # Per i versi liberi, aggiungi sempre il campo rhyme anche se null
-                result_item['rhyme'] = None
-                
-            results.append(result_item)
-        
-        # Converti lo schema rime per compatibilità frontend
-        # IMPORTANTE: Usa lo schema ATTESO, non quello analizzato
-        expected_scheme = get_expected_rhyme_scheme(tipo_poesia)
-        
-        # Se non c'è uno schema atteso, usa quello analizzato come fallback
-        if not expected_scheme:
-            scheme_for_frontend = convert_rhyme_scheme_to_frontend(analisi['schema_rime'], analisi['tipo_riconosciuto'])
-        else:
-            scheme_for_frontend = expected_scheme
-        
-        # Valida se le rime rispettano il pattern atteso (se non c'è schema atteso, la funzione restituisce True, [])
-        rhyme_valid, rhyme_errors = validate_rhyme_pattern(
-            analisi['schema_rime'],
-            expected_scheme,
-            analisi.get('analisi_rime', {}),
-            poem_type=tipo_poesia
-        )
-        
-        # Calcola lo stato delle rime per ogni verso (per i badge nel frontend)
-        rhyme_status = calculate_rhyme_status_for_verses(analisi['schema_rime'], expected_scheme, len(analisi['versi']))
-        
-        # Calcola la validità globale
-        all_correct = all(r['correct'] for r in results)
-        
-        return jsonify({
-            'poem_type': tipo_poesia,
-            'pattern': pattern or [],
-            'results': results,
-            'valid': all_correct,
-            'rhyme_analysis': {
-                'scheme': scheme_for_frontend,
-                'details': analisi['analisi_rime'],
-                'valid': rhyme_valid,
-                'errors': rhyme_errors,
-                'verse_status': rhyme_status
-            },
-            'total_syllables': analisi['sillabe_totali'],
-            'total_verses': analisi['num_versi'],
-            'valid_structure': analisi['rispetta_metrica'],
-            'metadata': analisi['dettagli_metrica'],
-            'error': False,
-            'parsing_version': 'modular_v1.0'
-        })
+        results.append(result_item)
+    
+    # Converti lo schema rime per compatibilità frontend
+    # IMPORTANTE: Usa lo schema ATTESO, non quello analizzato
+    expected_scheme = get_expected_rhyme_scheme(tipo_poesia)
+    
+    # Se non c'è uno schema atteso, usa quello analizzato come fallback
+    if not expected_scheme:
+        scheme_for_frontend = convert_rhyme_scheme_to_frontend(analisi['schema_rime'], analisi['tipo_riconosciuto'])
+    else:
+        scheme_for_frontend = expected_scheme
+    
+    # Valida se le rime rispettano il pattern atteso (se non c'è schema atteso, la funzione restituisce True, [])
+    rhyme_valid, rhyme_errors = validate_rhyme_pattern(
+        analisi['schema_rime'],
+        expected_scheme,
+        analisi.get('analisi_rime', {}),
+        poem_type=tipo_poesia
+    )
+    
+    # Calcola lo stato delle rime per ogni verso (per i badge nel frontend)
+    rhyme_status = calculate_rhyme_status_for_verses(analisi['schema_rime'], expected_scheme, len(analisi['versi']))
+    
+    # Calcola la validità globale
+    all_correct = all(r['correct'] for r in results)
+    
+    return {
+        'poem_type': tipo_poesia,
+        'pattern': pattern or [],
+        'results': results,
+        'valid': all_correct,
+        'rhyme_analysis': {
+            'scheme': scheme_for_frontend,
+            'details': analisi['analisi_rime'],
+            'valid': rhyme_valid,
+            'errors': rhyme_errors,
+            'verse_status': rhyme_status
+        },
+        'total_syllables': analisi['sillabe_totali'],
+        'total_verses': analisi['num_versi'],
+        'valid_structure': analisi['rispetta_metrica'],
+        'metadata': analisi['dettagli_metrica'],
+        # Forme più vicine (best-fit su tutte le forme, vedi services.form_ranking):
+        # calcolate una volta e memorizzate con l'analisi in cache_analisi
+        'closest_forms': (analisi['forme_vicine'] if 'forme_vicine' in analisi
+                          else forme_vicine(analisi, use_tolerance)),
+        'error': False,
+        'parsing_version': 'modular_v1.0'
+    }, 200
+
+@api_bp.route('/analyze', methods=['POST'])
+@require_json
+def api_analizza():
+    """API endpoint per analizzare una poesia"""
+    try:
+        payload, status = _analizza_richiesta(request.get_json() or {})
+        return jsonify(payload), status
         
     except Exception as e:
         return jsonify({
@@ -347,38 +552,387 @@ def api_analizza():
             'message': f'Errore durante l\'analisi: {str(e)}'
         }), 500
 
+@api_bp.route('/analyze/batch', methods=['POST'])
+@require_json
+def api_analizza_batch():
+    """API endpoint per analizzare più poesie in una richiesta.
+
+    Corpo: lista di {text, type, use_tolerance} (o {"items": [...]}). Ogni
+    risultato ha la forma di /api/analyze più il suo 'status'; gli errori
+    restano confinati al singolo elemento e i duplicati sono analizzati una volta.
+    """
+    data = request.get_json()
+    items = data.get('items') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': True, 'message': 'Fornire una lista non vuota di poesie'}), 400
+    if len(items) > MAX_BATCH_ANALISI:
+        return jsonify({
+            'error': True,
+            'error_type': 'too_many_items',
+            'message': f'Troppe poesie in una richiesta (max {MAX_BATCH_ANALISI}).'
+        }), 413
+
+    per_chiave = {}
+    unici = []       # richieste distinte, nell'ordine di arrivo
+    posizioni = []   # per ogni elemento, la sua richiesta in unici
+    for item in items:
+        chiave = None
+        if isinstance(item, dict) and isinstance(item.get('text'), str):
+            chiave = (item['text'], str(item.get('type') or '').strip().lower(), bool(item.get('use_tolerance', False)))
+        if chiave in per_chiave:
+            posizioni.append(per_chiave[chiave])
+            continue
+        if chiave is not None:
+            per_chiave[chiave] = len(unici)
+        posizioni.append(len(unici))
+        unici.append(item)
+
+    valide = [i for i, item in enumerate(unici) if isinstance(item, dict)]
+    risultati = [({'error': True, 'message': 'Elemento non valido'}, 400)] * len(unici)
+    for i, risultato in zip(valide, _analizza_richieste([unici[i] for i in valide])):
+        risultati[i] = risultato
+    risultati = [{**payload, 'status': status} for payload, status in risultati]
+    results = [risultati[i] for i in posizioni]
+
+    return jsonify({
+        'error': False,
+        'count': len(results),
+        'unique': len(per_chiave),
+        'results': results,
+    })
+
+def _righe_stream(stream):
+    """Righe decodificate del corpo, lette una alla volta (None se troppo lunga)"""
+    while True:
+        riga = stream.readline(MAX_BYTES_RIGA_STREAM + 1)
+        if not riga:
+            return
+        if len(riga) > MAX_BYTES_RIGA_STREAM and not riga.endswith(b'\n'):
+            # Scarta il resto della riga senza tenerlo in memoria
+            while riga and not riga.endswith(b'\n'):
+                riga = stream.readline(MAX_BYTES_RIGA_STREAM + 1)
+            yield None
+            continue
+        yield riga.decode('utf-8', 'replace').rstrip('\r\n')
+
+
+def _richieste_ndjson(righe):
+    """Un oggetto {text, type, use_tolerance} (o una stringa) per riga"""
+    for riga in righe:
+        if riga is None:
+            yield {'error': True, 'error_type': 'too_long', 'message': 'Riga troppo lunga.'}
+            continue
+        if not riga.strip():
+            continue
+        try:
+            item = json.loads(riga)
+        except ValueError:
+            yield {'error': True, 'error_type': 'invalid_json', 'message': 'JSON non valido nella riga.'}
+            continue
+        yield {'text': item} if isinstance(item, str) else item
+
+
+def _richieste_testo(righe, opzioni):
+    """Poesie separate da righe vuote; opzioni (type, use_tolerance) comuni a tutte"""
+    limite = MAX_CARATTERI_POESIA + 1  # versi uniti da '\n': len(testo) = lunghezza - 1
+    versi = []
+    lunghezza = 0
+    for riga in chain(righe, ('',)):
+        if riga is None:
+            lunghezza = limite + 1
+            continue
+        if riga.strip():
+            # Oltre il limite smette di accumulare: la poesia sarà un errore too_long
+            lunghezza += len(riga) + 1
+            if lunghezza <= limite:
+                versi.append(riga)
+            continue
+        if lunghezza > limite:
+            yield {'error': True, 'error_type': 'too_long',
+                   'message': f'Il testo è troppo lungo (max {MAX_CARATTERI_POESIA} caratteri).'}
+        elif versi:
+            yield {**opzioni, 'text': '\n'.join(versi)}
+        versi = []
+        lunghezza = 0
+
+
+@api_bp.route('/analyze/stream', methods=['POST'])
+def api_analizza_stream():
+    """API endpoint per analizzare un corpus in streaming (NDJSON in uscita).
+
+    Corpo application/x-ndjson: un oggetto {text, type, use_tolerance} per
+    riga. Altrimenti testo semplice con poesie separate da righe vuote (type e
+    use_tolerance dalla query string). Ogni risultato è scritto come una riga
+    JSON compatta appena calcolato, con 'index' e 'status'.
+    """
+    request.max_content_length = MAX_BYTES_STREAM
+    formato = request.args.get('format') or (
+        'ndjson' if request.mimetype in ('application/x-ndjson', 'application/jsonlines') else 'text'
+    )
+    if formato not in ('ndjson', 'text'):
+        return jsonify({'error': True, 'message': 'Formato non supportato (ndjson, text)'}), 400
+    opzioni = {
+        'type': request.args.get('type', ''),
+        'use_tolerance': request.args.get('use_tolerance', '').lower() in ('1', 'true', 'yes'),
+    }
+
+    def genera():
+        righe = _righe_stream(request.stream)
+        richieste = _richieste_ndjson(righe) if formato == 'ndjson' else _richieste_testo(righe, opzioni)
+        for indice, item in enumerate(richieste):
+            if not isinstance(item, dict):
+                payload, status = {'error': True, 'message': 'Elemento non valido'}, 400
+            elif item.get('error'):
+                payload, status = item, 400
+            else:
+                payload, status = _analizza_richieste([item])[0]
+            yield json.dumps({'index': indice, 'status': status, **payload},
+                             ensure_ascii=False, separators=(',', ':')) + '\n'
+
+    return Response(
+        stream_with_context(genera()),
+        mimetype='application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-store'},
+    )
+
+def _evento_sse(evento, dati):
+    return f"event: {evento}\ndata: {json.dumps(dati, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+def _payload_live(aggiornamento):
+    """Aggiornamento per il client: solo i versi ricalcolati più il riepilogo"""
+    analisi = aggiornamento.analisi
+    tipo_poesia = aggiornamento.tipo or analisi.get('tipo_riconosciuto', 'versi_liberi')
+    if tipo_poesia == 'sconosciuto':
+        tipo_poesia = 'versi_liberi'
+    schema = analisi.get('schema_rime', '')
+    verso_di_riga = {riga: v for v, riga in enumerate(aggiornamento.righe_versi)}
+
+    targets = [get_target_sillabe(tipo_poesia, v) for v in range(len(aggiornamento.versi))]
+    corretti = [
+        verso.sillabe == target if target else True
+        for verso, target in zip(aggiornamento.versi, targets)
+    ]
+
+    verses = []
+    cleared = []
+    for riga in aggiornamento.righe_cambiate:
+        v = verso_di_riga.get(riga)
+        if v is None:
+            cleared.append(riga)
+            continue
+        verso = aggiornamento.versi[v]
+        verses.append({
+            'line': riga,
+            'verse': v + 1,
+            'text': verso.tokens.testo,
+            'syllables': verso.sillabe,
+            'target': targets[v],
+            'correct': corretti[v],
+        })
+
+    expected_scheme = get_expected_rhyme_scheme(tipo_poesia)
+    return {
+        'version': aggiornamento.versione,
+        'lines': aggiornamento.num_righe,
+        'verses': verses,
+        'cleared': cleared,
+        'verse_lines': list(aggiornamento.righe_versi),
+        'rhyme_scheme': schema,
+        'rhyme_status': calculate_rhyme_status_for_verses(schema, expected_scheme, len(aggiornamento.versi)),
+        'poem_type': tipo_poesia,
+        'recognized_type': analisi.get('tipo_riconosciuto'),
+        'pattern': list(get_syllable_pattern(tipo_poesia)),
+        'total_syllables': analisi.get('sillabe_totali', 0),
+        'total_verses': analisi.get('num_versi', 0),
+        'valid': all(corretti),
+        'valid_structure': analisi.get('rispetta_metrica', False),
+        'error': False,
+    }
+
+
+@api_bp.route('/live', methods=['GET'])
+def api_live():
+    """Canale SSE per l'analisi live: apre una sessione e ne trasmette gli aggiornamenti.
+
+    Il primo evento ('ready') contiene l'id di sessione da usare con
+    POST /api/live/<id>; i delta successivi arrivano come eventi 'update'.
+    Lo stream dura al più DURATA_MAX_STREAM_LIVE secondi: alla riconnessione
+    EventSource rimanda l'id (Last-Event-ID) e la sessione prosegue.
+    Ogni stream occupa un thread: oltre MAX_STREAM_LIVE stream nel processo
+    risponde 503 e il client usa le risposte ai POST.
+    """
+    if not occupa_stream_live():
+        return jsonify({
+            'error': True,
+            'error_type': 'stream_unavailable',
+            'fallback': 'post',
+            'message': 'Canale live occupato: gli aggiornamenti arrivano nella risposta ai POST.'
+        }), 503, {'Retry-After': '30'}
+
+    id_precedente = request.headers.get('Last-Event-ID', '')
+    sessione = (get_sessione_live(id_precedente) if id_precedente else None) or nuova_sessione_live()
+
+    def genera():
+        sessione.collega_stream()
+        try:
+            yield (f"retry: {RICONNESSIONE_LIVE_MS}\nid: {sessione.id}\n"
+                   f"{_evento_sse('ready', {'session': sessione.id})}")
+            fine = time.monotonic() + DURATA_MAX_STREAM_LIVE
+            while (restante := fine - time.monotonic()) > 0:
+                try:
+                    evento = sessione.coda.get(timeout=min(INTERVALLO_PING_LIVE, restante))
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield _evento_sse('update', evento)
+        finally:
+            sessione.scollega_stream()
+
+    risposta = Response(
+        genera(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+    # Alla chiusura della risposta, anche se il generatore non è mai partito
+    risposta.call_on_close(libera_stream_live)
+    return risposta
+
+
+@api_bp.route('/live/<id_sessione>', methods=['POST'])
+@require_json
+def api_live_delta(id_sessione):
+    """API endpoint per inviare le righe modificate di una sessione live.
+
+    Corpo: {lines: {indice: testo}, count, type, use_tolerance} oppure
+    {reset: true, lines: [...]} con il testo completo. Se lo stream della
+    sessione è attivo in questo processo l'aggiornamento viaggia su SSE
+    (202), altrimenti torna nella risposta (200). 409 se la sessione non è
+    nota a questo processo: il client deve reinviare il testo con reset.
+    """
+    data = request.get_json() or {}
+    reset = bool(data.get('reset'))
+    righe = data.get('lines', [] if reset else {})
+
+    testi = righe if isinstance(righe, list) else righe.values() if isinstance(righe, dict) else ()
+    if any(isinstance(t, str) and _TAG_HTML_RE.search(t) for t in testi):
+        return jsonify({
+            'error': True,
+            'error_type': 'invalid_input',
+            'message': 'Il testo contiene caratteri non ammessi.'
+        }), 400
+
+    sessione = get_sessione_live(id_sessione)
+    if sessione is None:
+        if not reset:
+            return jsonify({
+                'error': True,
+                'error_type': 'unknown_session',
+                'resync': True,
+                'message': 'Sessione live non trovata: reinviare il testo completo.'
+            }), 409
+        if len(id_sessione) > 64:
+            return jsonify({'error': True, 'message': 'Id di sessione non valido'}), 400
+        sessione = nuova_sessione_live(id_sessione)
+
+    tipo = str(data.get('type') or '').strip().lower() if 'type' in data else None
+    try:
+        aggiornamento = sessione.applica(
+            righe, data.get('count'), reset=reset,
+            tipo=tipo, use_tolerance=data.get('use_tolerance'),
+        )
+    except ValueError as e:
+        return jsonify({'error': True, 'error_type': 'invalid_delta', 'message': str(e)}), 400
+
+    payload = _payload_live(aggiornamento)
+    if sessione.pubblica(payload):
+        return jsonify({'error': False, 'version': aggiornamento.versione, 'delivery': 'stream'}), 202
+    return jsonify(payload)
+
 def get_syllable_pattern(tipo_poesia):
     """Restituisce il pattern di sillabe per un tipo di poesia"""
-    patterns = {
-        'haiku': [5, 7, 5],
-        'tanka': [5, 7, 5, 7, 7],
-        'katauta': [5, 7, 7],
-        'choka': [5, 7, 5, 7, 5, 7, 5, 7, 7],
-        'sedoka': [5, 7, 7, 5, 7, 7],
-        'sonetto': [11] * 14,
-        'quartina': [11] * 4,
-        'stornello': [5, 11, 11],
-        'ottava_rima': [11] * 8,
-        'terzina_dantesca': [11, 11, 11],
-        'limerick': [8, 8, 5, 5, 8],
-        'ballad': [8, 6, 8, 6],
-        'clerihew': [8, 8, 8, 8],
-        'cinquain': [2, 4, 6, 8, 2],
-        'sestina': [11] * 6,
-        'versi_liberi': []
-    }
-    return patterns.get(tipo_poesia, [])
+    return PATTERN_SILLABE.get(tipo_poesia, ())
 
 def get_target_sillabe(tipo_poesia, indice_verso):
     """Restituisce il numero di sillabe atteso per un verso specifico"""
-    # Usa la stessa logica di get_syllable_pattern per mantenere coerenza
-    pattern = get_syllable_pattern(tipo_poesia)
+    # Usa la stessa tabella di get_syllable_pattern per mantenere coerenza
+    pattern = PATTERN_SILLABE.get(tipo_poesia)
     
     if pattern and indice_verso < len(pattern):
         return pattern[indice_verso]
     
     return None  # Nessun target specifico (per versi liberi o fuori dal pattern)
 
+@api_bp.route('/rhymes', methods=['GET'])
+def api_rhymes():
+    """API endpoint per il dizionario delle rime: parole del corpus che rimano con word"""
+    word = (request.args.get('word') or '').strip()
+    if not word:
+        return jsonify({'error': True, 'message': 'Parametro word mancante'}), 400
+    if len(word) > 50:
+        return jsonify({'error': True, 'message': 'Parola troppo lunga (max 50 caratteri).'}), 400
+
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    min_count = max(request.args.get('min_count', 1, type=int), 0)
+
+    try:
+        indice = get_indice_rime()
+        if indice is None:
+            risposta = jsonify({
+                'error': True,
+                'error_type': 'index_building',
+                'message': 'Indice delle rime in costruzione, riprovare tra poco.'
+            })
+            risposta.headers['Retry-After'] = '2'
+            return risposta, 503
+        suono, rime = indice.cerca(word, limit=limit, min_count=min_count)
+        return jsonify({
+            'word': word,
+            'sound': suono,
+            'rhymes': rime,
+            'limit': limit,
+            'min_count': min_count,
+            'error': False
+        })
+    except Exception as e:
+        return jsonify({'error': True, 'message': 'Errore interno nella ricerca delle rime.'}), 500
+
+@api_bp.route('/suggest', methods=['GET'])
+def api_suggest():
+    """API endpoint per suggerire parole per numero di sillabe e rima.
+
+    Parametri: rhyme (es. 'ore' o '-ore') oppure word (se ne usa il suono
+    finale), syllables oppure min_syllables/max_syllables, limit.
+    """
+    rima = (request.args.get('rhyme') or '').strip().lower().lstrip('-')
+    word = (request.args.get('word') or '').strip()
+    if not rima and word:
+        rima = rhyme_key(word)
+    if not rima or len(rima) > 20:
+        return jsonify({'error': True, 'message': 'Parametro rhyme o word mancante o non valido'}), 400
+
+    sillabe = request.args.get('syllables', type=int)
+    min_sillabe = request.args.get('min_syllables', sillabe or 1, type=int)
+    max_sillabe = request.args.get('max_syllables', sillabe or min_sillabe, type=int)
+    if min_sillabe < 1 or max_sillabe < min_sillabe or max_sillabe - min_sillabe > 10:
+        return jsonify({'error': True, 'message': 'Intervallo di sillabe non valido (max 10 valori).'}), 400
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+    indice = get_indice_metrico()
+    if indice is None:
+        return jsonify({'error': True, 'message': 'Indice dei suggerimenti non disponibile.'}), 503
+
+    try:
+        return jsonify({
+            'rhyme': rima,
+            'min_syllables': min_sillabe,
+            'max_syllables': max_sillabe,
+            'suggestions': indice.suggerisci(rima, min_sillabe, max_sillabe, limit),
+            'error': False
+        })
+    except Exception as e:
+        return jsonify({'error': True, 'message': 'Errore interno nel recupero dei suggerimenti.'}), 500
+
 @api_bp.route('/poems', methods=['POST'])
 @require_json
 def api_create_poem():
@@ -409,8 +963,8 @@ def api_create_poem():
         # Parametri opzionali
         use_tolerance = data.get('use_tolerance', False)
 
-        # Analizza la poesia (passando parametro tolleranza)
-        analisi = analizza_poesia_completa(data['testo'], use_tolerance=use_tolerance)
+        # Analizza la poesia (dalla cache se già analizzata con /api/analyze)
+        analisi = analizza_poesia(data['testo'], use_tolerance=use_tolerance)
 
         # Verifica se ci sono errori nell'analisi
         if 'errore' in analisi:
@@ -436,7 +990,7 @@ def api_create_poem():
         final_valid = (is_valid_selected if is_valid_selected is not None else is_valid_recognized)
         if not final_valid:
             # Prepara messaggio coerente col frontend
-            expected_info = get_syllable_pattern(selected_type) if selected_type else None
+            expected_info = list(get_syllable_pattern(selected_type)) if selected_type else None
             return jsonify({
                 'success': False,
                 'message': 'Pubblicazione non consentita: la poesia non rispetta i vincoli metrici della tipologia scelta.',
@@ -462,6 +1016,9 @@ def api_create_poem():
 
         db.session.add(poesia)
         db.session.commit()
+        aggiorna_indice_rime()
+        invalida_totali_bacheca()
+        invalida_indice_autori()
 
         return jsonify({
             'success': True,
@@ -504,8 +1061,8 @@ def api_pubblica():
         # Parametri opzionali
         use_tolerance = data.get('use_tolerance', False)
 
-        # Analizza la poesia con eventuale tolleranza
-        analisi = analizza_poesia_completa(testo, use_tolerance=use_tolerance)
+        # Analizza la poesia con eventuale tolleranza (dalla cache se già analizzata)
+        analisi = analizza_poesia(testo, use_tolerance=use_tolerance)
 
         # Verifica se ci sono errori nell'analisi
         if 'errore' in analisi:
@@ -525,7 +1082,7 @@ def api_pubblica():
         is_valid_recognized = bool(analisi.get('rispetta_metrica', False))
         final_valid = (is_valid_selected if is_valid_selected is not None else is_valid_recognized)
         if not final_valid:
-            expected_info = get_syllable_pattern(selected_type) if selected_type else None
+            expected_info = list(get_syllable_pattern(selected_type)) if selected_type else None
             return jsonify({
                 'success': False,
                 'message': 'Pubblicazione non consentita: la poesia non rispetta i vincoli metrici della tipologia scelta.',
@@ -551,6 +1108,9 @@ def api_pubblica():
 
         db.session.add(poesia)
         db.session.commit()
+        aggiorna_indice_rime()
+        invalida_totali_bacheca()
+        invalida_indice_autori()
 
         return jsonify({
             'success': True,
@@ -563,13 +1123,19 @@ def api_pubblica():
         db.session.rollback()
         return jsonify({'error': True, 'message': 'Errore interno durante la pubblicazione.'}), 500
 
+# Limite di poesie per pagina della bacheca via API
+MAX_PER_PAGE_BACHECA = 100
+
 @api_bp.route('/bacheca', methods=['GET'])
 def api_bacheca():
-    """API endpoint per ottenere le poesie della bacheca"""
+    """API endpoint per ottenere le poesie della bacheca.
+
+    Paginazione a cursore: `cursor` (next_cursor della risposta precedente),
+    `sort` (recent, oldest, title, author, type) e `include_total=true` per il
+    totale. Con `page` resta la vecchia paginazione a offset.
+    """
     try:
-        # Parametri di paginazione
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), MAX_PER_PAGE_BACHECA)
         
         # Filtri
         tipo = request.args.get('tipo')  # Filtra per tipo di poesia
@@ -583,34 +1149,73 @@ def api_bacheca():
             query = query.filter(Poem.poem_type.ilike(f'%{tipo}%'))
         
         if autore:
-            query = query.filter(Poem.author.ilike(f'%{autore}%'))
+            query = filtro_autore(query, autore)
         
         if solo_valide:
             query = query.filter(Poem.is_valid == True)
         
-        # Ordina per data di creazione (più recenti prima)
-        query = query.order_by(Poem.created_at.desc())
+        cursore = request.args.get('cursor')
+        if 'page' in request.args and not cursore:
+            # Compatibilità: paginazione a offset (più recenti prima)
+            page = request.args.get('page', 1, type=int)
+            poesie_paginate = query.order_by(Poem.created_at.desc().nulls_last(), Poem.id.desc()).paginate(
+                page=page, 
+                per_page=per_page, 
+                error_out=False
+            )
+            
+            return jsonify({
+                'poesie': [poesia.to_dict() for poesia in poesie_paginate.items],
+                'total': poesie_paginate.total,
+                'pages': poesie_paginate.pages,
+                'current_page': page,
+                'per_page': per_page,
+                'has_next': poesie_paginate.has_next,
+                'has_prev': poesie_paginate.has_prev
+            })
         
-        # Paginazione
-        poesie_paginate = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        ordinamento = normalizza_ordinamento(request.args.get('sort', ORDINAMENTO_PREDEFINITO))
+        try:
+            pagina = pagina_keyset(query, ordinamento, cursore, per_page)
+        except ValueError:
+            return jsonify({'error': True, 'message': 'Cursore non valido.'}), 400
         
-        return jsonify({
-            'poesie': [poesia.to_dict() for poesia in poesie_paginate.items],
-            'total': poesie_paginate.total,
-            'pages': poesie_paginate.pages,
-            'current_page': page,
+        risposta = {
+            'poesie': [poesia.to_dict() for poesia in pagina.items],
+            'sort': ordinamento,
             'per_page': per_page,
-            'has_next': poesie_paginate.has_next,
-            'has_prev': poesie_paginate.has_prev
-        })
+            'has_next': pagina.has_next,
+            'next_cursor': pagina.next_cursor
+        }
+        if request.args.get('include_total', 'false').lower() == 'true':
+            risposta['total'] = conta_totale(query, ('api', tipo, autore, solo_valide))
+        return jsonify(risposta)
         
     except Exception as e:
         return jsonify({'error': True, 'message': 'Errore interno nel recupero delle poesie.'}), 500
 
+@api_bp.route('/authors', methods=['GET'])
+def api_authors():
+    """API endpoint per l'autocompletamento degli autori della bacheca.
+
+    Parametri: prefix (inizio del nome o di una sua parola; vuoto = primi in
+    ordine alfabetico) e limit.
+    """
+    prefisso = (request.args.get('prefix') or '').strip()
+    if len(prefisso) > 100:
+        return jsonify({'error': True, 'message': 'Prefisso troppo lungo (max 100 caratteri).'}), 400
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_AUTORI_SUGGERITI)
+
+    try:
+        return jsonify({
+            'prefix': prefisso,
+            'authors': cerca_autori(prefisso, limit),
+            'limit': limit,
+            'error': False
+        })
+    except Exception as e:
+        return jsonify({'error': True, 'message': 'Errore interno nel recupero degli autori.'}), 500
+
 @api_bp.route('/poesia/<int:poesia_id>', methods=['GET'])
 def api_poesia_dettaglio(poesia_id):
     """API endpoint per ottenere i dettagli di una poesia specifica"""
@@ -730,3 +1335,15 @@ def api_stats():
         
     except Exception as e:
         return jsonify({'error': True, 'message': 'Errore interno nel recupero delle statistiche.'}), 500
+
+@api_bp.route('/cache/stats', methods=['GET'])
+@require_admin
+def api_cache_stats():
+    """Contatori delle cache dell'analizzatore (per processo/worker); vedi require_admin"""
+    return jsonify({
+        'analisi': statistiche_cache_analisi(),
+        'coalescenza': statistiche_coalescenza(),
+        'versi': statistiche_cache_versi(),
+        'sillabe': statistiche_cache_sillabe(),
+        'rime': cache_rime.stats(),
+    })
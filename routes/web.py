@@ -1,5 +1,8 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from models.poem import Poem, db
+from sqlalchemy.exc import SQLAlchemyError
+from services.full_text import filtro_like, filtro_ricerca, segna_indice_non_disponibile
+from services.pagination import conta_totale, normalizza_ordinamento, pagina_keyset
 from services.poetry_analyzer import analizza_poesia_completa
 
 web_bp = Blueprint('web', __name__)
@@ -33,8 +36,8 @@ def wiki():
 def bacheca():
     """Pagina della bacheca comunitaria con filtri avanzati"""
     try:
-        # Parametri di paginazione e filtri con valori DEFAULT sicuri
-        page = max(1, request.args.get('page', 1, type=int))
+        # Paginazione a cursore: `cursor` è il next_cursor della pagina precedente
+        cursore = request.args.get('cursor', '').strip()
         per_page = 12
         
         # Parametri filtro - SEMPRE stringe, mai None
@@ -53,25 +56,12 @@ def bacheca():
         if len(search_query) > 120:
             search_query = search_query[:120]
         solo_valide = request.args.get('solo_valide', '').lower() == 'true'
-        sort_by = request.args.get('sort', 'recent').strip() or 'recent'
+        # Con una ricerca l'ordinamento predefinito è per pertinenza
+        sort_by = request.args.get('sort', '').strip() or ('relevance' if search_query else 'recent')
         
         # Query base
         query = Poem.query
         
-        # Applica filtri solo se non vuoti
-        if search_query:
-            # Escapa i caratteri jolly di LIKE per trattarli come letterali
-            # Usa backslash come escape char e specifica escape='\\'
-            like_input = search_query.replace('\\', '\\\\').replace('%', r'\%').replace('_', r'\_')
-            search_pattern = f"%{like_input}%"
-            query = query.filter(
-                db.or_(
-                    Poem.title.ilike(search_pattern, escape='\\'),
-                    Poem.content.ilike(search_pattern, escape='\\'),
-                    Poem.author.ilike(search_pattern, escape='\\')
-                )
-            )
-        
         if tipo_filtro:
             query = query.filter(Poem.poem_type == tipo_filtro)
         
@@ -81,46 +71,56 @@ def bacheca():
         if solo_valide:
             query = query.filter(Poem.is_valid == True)
         
-        # Ordinamento sicuro
-        if sort_by == 'recent':
-            query = query.order_by(Poem.created_at.desc())
-        elif sort_by == 'oldest':
-            query = query.order_by(Poem.created_at.asc())
-        elif sort_by == 'title':
-            query = query.order_by(Poem.title.asc())
-        elif sort_by == 'author':
-            query = query.order_by(Poem.author.asc())
-        elif sort_by == 'type':
-            query = query.order_by(Poem.poem_type.asc())
-        else:
-            query = query.order_by(Poem.created_at.desc())
+        # Ricerca: indice full-text con punteggio, altrimenti LIKE
+        filtrata, punteggio = query, None
+        if search_query:
+            filtrata, punteggio = filtro_ricerca(query, search_query)
         
-        # Paginazione sicura
-        try:
-            poesie = query.paginate(
-                page=page, 
-                per_page=per_page, 
-                error_out=False
-            )
-        except Exception as paginate_error:
-            print(f"Errore paginazione: {paginate_error}")
-            # Fallback alla prima pagina
-            poesie = query.paginate(
-                page=1, 
-                per_page=per_page, 
-                error_out=False
-            )
+        # Ordinamento sicuro (valori sconosciuti -> più recenti)
+        sort_by = normalizza_ordinamento(sort_by, pertinenza=punteggio is not None)
         
-        # Lista autori sicura
+        # Paginazione keyset: cursore non valido o di un altro ordinamento -> prima pagina
+        cursore_richiesto = cursore
         try:
-            autori = db.session.query(Poem.author).distinct().filter(
-                Poem.author.isnot(None),
-                Poem.author != ''
-            ).order_by(Poem.author.asc()).all()
-            autori = [a[0] for a in autori if a[0]]
-        except Exception as authors_error:
-            print(f"Errore caricamento autori: {authors_error}")
-            autori = []
+            try:
+                poesie = pagina_keyset(filtrata, sort_by, cursore, per_page, punteggio)
+            except ValueError as cursor_error:
+                print(f"Errore paginazione: {cursor_error}")
+                cursore = ''
+                poesie = pagina_keyset(filtrata, sort_by, None, per_page, punteggio)
+        except SQLAlchemyError as search_error:
+            if punteggio is None:
+                raise
+            # Indice full-text assente o non valido: si torna al LIKE
+            print(f"Ricerca full-text non disponibile: {getattr(search_error, 'orig', search_error)}")
+            db.session.rollback()
+            segna_indice_non_disponibile()
+            filtrata, punteggio = filtro_like(query, search_query), None
+            sort_by = normalizza_ordinamento(sort_by)
+            cursore = ''
+            poesie = pagina_keyset(filtrata, sort_by, None, per_page)
+        
+        # Totale memorizzato per insieme di filtri (niente COUNT(*) a ogni pagina)
+        chiave_totale = ('web', search_query, punteggio is not None, tipo_filtro, autore_filtro, solo_valide)
+
+        # Frammento per lo scroll infinito di bacheca.js: solo le card successive
+        if request.args.get('fragment') == '1':
+            frammento = {
+                'html': render_template('_poem_cards.html', poesie=poesie),
+                'count': len(poesie.items),
+                'has_next': poesie.has_next,
+                'next_cursor': poesie.next_cursor
+            }
+            if cursore_richiesto and not cursore:
+                # Cursore scartato (non valido o ricerca ripiegata sul LIKE): è la
+                # prima pagina, il client sostituisce le card invece di accodarle
+                frammento['reset'] = True
+                frammento['total'] = conta_totale(filtrata, chiave_totale)
+            return jsonify(frammento)
+        
+        poesie = poesie._replace(total=conta_totale(filtrata, chiave_totale))
+        
+        # Gli autori del filtro li carica bacheca.js da /api/authors (autocompletamento)
         
         # RETURN con valori SEMPRE definiti
         return render_template('bacheca.html',
@@ -130,7 +130,7 @@ def bacheca():
                              autore_filtro=autore_filtro, # Sempre stringa
                              solo_valide=solo_valide,    # Sempre boolean
                              sort_by=sort_by,           # Sempre stringa
-                             autori=autori)             # Sempre lista
+                             cursore=cursore)           # '' sulla prima pagina
                              
     except Exception as e:
         print(f"ERRORE CRITICO BACHECA: {str(e)}")
@@ -145,7 +145,7 @@ def bacheca():
                              autore_filtro='',
                              solo_valide=False,
                              sort_by='recent',
-                             autori=[]), 500
+                             cursore=''), 500
 
 @web_bp.route('/poesia/<int:poesia_id>')
 def dettaglio_poesia(poesia_id):
@@ -0,0 +1,148 @@
+"""Autori della bacheca: filtro per autore e autocompletamento (/api/authors).
+
+PostgreSQL: le query vanno sull'indice GIN a trigrammi di poems.author
+(models.poem, estensione pg_trgm), che serve sia ILIKE con prefisso o
+sottostringa sia la somiglianza (operatore %) per i nomi scritti con un
+refuso; senza l'estensione restano i soli ILIKE, senza indice. Gli altri
+dialetti (SQLite) non hanno un indice per '%testo%': i suggerimenti vengono
+da IndiceAutori, l'elenco degli autori in memoria con una lista ordinata di
+chiavi (nome intero e ogni sua parola, in minuscolo) in cui i nomi con un
+certo prefisso sono un intervallo contiguo trovato con bisect. L'indice in
+memoria può essere indietro di INTERVALLO_SYNC_AUTORI secondi rispetto alle
+pubblicazioni degli altri worker: per questo il filtro della bacheca
+(filtro_autore) resta una query SQL.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.poem import Poem, db, pg_trgm_installato
+
+MAX_AUTORI_SUGGERITI = 50
+
+# Lunghezza minima del prefisso per i suggerimenti per somiglianza (trigrammi)
+MIN_LUNGHEZZA_SOMIGLIANZA = 3
+
+INTERVALLO_SYNC_AUTORI = 60  # secondi: raccoglie anche le poesie inserite da altri worker
+
+_indice_autori = None
+_indice_autori_sync = 0.0
+_indice_autori_lock = threading.Lock()
+
+_stato_trgm = {'disponibile': None, 'verificato': 0.0}
+
+
+def _escape_like(testo):
+    return testo.replace('\\', '\\\\').replace('%', r'\%').replace('_', r'\_')
+
+
+class IndiceAutori:
+    """Elenco degli autori in memoria, ordinato per la ricerca per prefisso.
+
+    Immutabile: per aggiornarlo se ne costruisce uno nuovo (get_indice_autori).
+    """
+
+    def __init__(self, nomi):
+        self._nomi = sorted(set(nomi), key=lambda nome: (nome.casefold(), nome))
+        self._minuscoli = [nome.casefold() for nome in self._nomi]
+        chiavi = set()
+        for posizione, minuscolo in enumerate(self._minuscoli):
+            chiavi.add((minuscolo, posizione))
+            for parola in minuscolo.split()[1:]:
+                chiavi.add((parola, posizione))
+        self._chiavi = sorted(chiavi)
+
+    def __len__(self):
+        return len(self._nomi)
+
+    def cerca(self, prefisso, limit=20):
+        """Autori con un nome (o una parola del nome) che inizia con prefisso:
+        prima quelli in cui è l'inizio del nome, poi in ordine alfabetico"""
+        prefisso = (prefisso or '').strip().casefold()
+        if not prefisso:
+            return self._nomi[:limit]
+        posizioni = set()
+        i = bisect_left(self._chiavi, (prefisso,))
+        while i < len(self._chiavi) and self._chiavi[i][0].startswith(prefisso):
+            posizioni.add(self._chiavi[i][1])
+            i += 1
+        ordinate = sorted(posizioni, key=lambda p: (not self._minuscoli[p].startswith(prefisso), p))
+        return [self._nomi[p] for p in ordinate[:limit]]
+
+
+def _carica_indice_autori():
+    global _indice_autori_sync
+    righe = db.session.query(Poem.author).filter(Poem.author != '').group_by(Poem.author).all()
+    _indice_autori_sync = time.monotonic()
+    return IndiceAutori(autore for autore, in righe if autore)
+
+
+def get_indice_autori():
+    """Restituisce l'indice degli autori, ricaricandolo se vecchio o invalidato"""
+    global _indice_autori
+    with _indice_autori_lock:
+        if _indice_autori is None or time.monotonic() - _indice_autori_sync > INTERVALLO_SYNC_AUTORI:
+            _indice_autori = _carica_indice_autori()
+        return _indice_autori
+
+
+def invalida_indice_autori():
+    """Da chiamare dopo l'inserimento di una poesia: ricarica alla prossima richiesta"""
+    global _indice_autori
+    with _indice_autori_lock:
+        _indice_autori = None
+
+
+def trgm_disponibile():
+    """True su PostgreSQL con l'estensione pg_trgm (verifica memorizzata per qualche minuto)"""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    adesso = time.monotonic()
+    if _stato_trgm['disponibile'] is not None and adesso - _stato_trgm['verificato'] < INTERVALLO_SYNC_AUTORI * 5:
+        return _stato_trgm['disponibile']
+    try:
+        with db.engine.connect() as conn:
+            disponibile = pg_trgm_installato(conn)
+    except SQLAlchemyError as e:
+        print(f"Verifica estensione pg_trgm fallita: {e}")
+        disponibile = False
+    _stato_trgm.update(disponibile=disponibile, verificato=adesso)
+    return disponibile
+
+
+def cerca_autori(prefisso, limit=20):
+    """Nomi di autori per l'autocompletamento (al più limit)"""
+    prefisso = (prefisso or '').strip()
+    if db.engine.dialect.name != 'postgresql':
+        return get_indice_autori().cerca(prefisso, limit)
+
+    query = db.session.query(Poem.author).filter(Poem.author != '')
+    if not prefisso:
+        # Scansione ordinata di ix_poems_author_id
+        righe = query.group_by(Poem.author).order_by(Poem.author).limit(limit).all()
+        return [autore for autore, in righe]
+
+    pattern = _escape_like(prefisso)
+    inizio_nome = Poem.author.ilike(f'{pattern}%', escape='\\')
+    condizione = or_(inizio_nome, Poem.author.ilike(f'% {pattern}%', escape='\\'))
+    ordine = [inizio_nome.desc()]
+    if len(prefisso) >= MIN_LUNGHEZZA_SOMIGLIANZA and trgm_disponibile():
+        # Anche i nomi simili (refusi), dopo quelli che iniziano con il prefisso
+        condizione = or_(condizione, Poem.author.op('%')(prefisso))
+        ordine.append(func.similarity(Poem.author, prefisso).desc())
+    righe = (query.filter(condizione).group_by(Poem.author)
+             .order_by(*ordine, Poem.author).limit(limit).all())
+    return [autore for autore, in righe]
+
+
+def filtro_autore(query, testo):
+    """Filtra `query` sulle poesie il cui autore contiene testo (come il vecchio
+    ILIKE '%testo%', con i caratteri jolly trattati come letterali)"""
+    testo = (testo or '').strip()
+    if not testo:
+        return query
+    # Su PostgreSQL con pg_trgm coperto da ix_poems_author_trgm
+    return query.filter(Poem.author.ilike(f'%{_escape_like(testo)}%', escape='\\'))
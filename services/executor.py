@@ -0,0 +1,89 @@
+"""Esecuzione parallela dell'analisi su più processi per carichi offline.
+
+L'analisi è Python puro e CPU-bound: in un singolo processo il GIL la
+serializza. EsecutoreAnalisi distribuisce blocchi di poesie su un
+ProcessPoolExecutor; ogni blocco passa da analizza_poesie_batch, quindi le
+parole ripetute nel blocco vengono contate una volta sola. I risultati
+tornano nell'ordine dell'input e coincidono con quelli del percorso seriale.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from services.poetry_analyzer import analizza_poesie_batch
+
+# Parole frequentissime usate per scaldare la cache dei worker
+PAROLE_FREQUENTI = (
+    'il', 'lo', 'la', 'i', 'gli', 'le', 'un', 'uno', 'una', 'di', 'a', 'da',
+    'in', 'con', 'su', 'per', 'tra', 'fra', 'e', 'o', 'ma', 'che', 'non',
+    'mi', 'ti', 'si', 'ci', 'vi', 'io', 'tu', 'noi', 'voi', 'del', 'della',
+    'nel', 'nella', 'al', 'alla', 'come', 'quando', 'sole', 'luna', 'cuore',
+    'amore', 'vita', 'notte', 'giorno', 'cielo', 'mare', 'vento', 'fiore',
+)
+
+
+def _inizializza_worker():
+    """Precarica costanti, regex, lessico e cache nel processo worker"""
+    from services.lexicon import get_lessico
+    from services.syllable_analyzer import ECCEZIONI, conta_sillabe_singola
+
+    get_lessico()
+    for parola in (*ECCEZIONI, *PAROLE_FREQUENTI):
+        conta_sillabe_singola(parola)
+
+
+def _analizza_blocco(args):
+    testi, use_tolerance = args
+    return analizza_poesie_batch(testi, use_tolerance)
+
+
+class EsecutoreAnalisi:
+    """Pool di processi per analizza_poesia_completa su molte poesie.
+
+    workers: numero di processi (ANALYSIS_WORKERS o numero di CPU);
+    con workers <= 1 l'analisi resta nel processo corrente.
+    """
+
+    def __init__(self, workers=None, chunksize=None):
+        if workers is None:
+            workers = int(os.environ.get('ANALYSIS_WORKERS', 0)) or os.cpu_count() or 1
+        self.workers = max(1, workers)
+        self.chunksize = chunksize
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None and self.workers > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_inizializza_worker
+            )
+        return self._pool
+
+    def analizza(self, testi, use_tolerance=False):
+        """Analizza una sequenza di testi; risultati nello stesso ordine"""
+        testi = list(testi)
+        pool = self._get_pool()
+        if pool is None or len(testi) < 2:
+            return analizza_poesie_batch(testi, use_tolerance)
+
+        # Blocchi abbastanza grandi da ammortizzare il pickling, ma almeno
+        # qualche blocco per worker per bilanciare il carico
+        dimensione = self.chunksize or max(1, -(-len(testi) // (self.workers * 4)))
+        blocchi = [
+            (testi[i:i + dimensione], use_tolerance)
+            for i in range(0, len(testi), dimensione)
+        ]
+        risultati = []
+        for parziale in pool.map(_analizza_blocco, blocchi):
+            risultati.extend(parziale)
+        return risultati
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
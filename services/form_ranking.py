@@ -0,0 +1,118 @@
+"""Classifica delle forme più vicine a una poesia (best-fit su tutte le forme).
+
+A differenza di identifica_tipo_poesia (prima forma che corrisponde) e di
+verifica_metrica (booleano), qui ogni forma di SCHEMI_POESIA con un vettore di
+sillabe riceve un punteggio:
+
+- distanza_sillabe: L1 verso per verso, con versi mancanti/in eccesso
+  contati per intero (pattern e poesia riempiti con zeri);
+- errori_rima: posizioni dello schema rime diverse dallo schema accettato
+  più vicino (più la differenza di lunghezza);
+- tolleranza_minima: massimo scarto per verso, cioè la tolleranza che
+  servirebbe per passare (None se il numero di versi non coincide).
+
+La distanza sulle sillabe è calcolata in un'unica passata su una matrice
+NumPy dei pattern (forme x versi); senza NumPy si usa un ciclo equivalente.
+"""
+from services.form_registry import FORME, OTTAVE_SONETTO
+from services.poetry_analyzer import verifica_metrica
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+# Peso di un errore di rima rispetto a una sillaba di scarto
+PESO_RIMA = 2
+
+_NOMI = tuple(nome for nome, forma in FORME.items() if forma.sillabe)
+_LUNGHEZZE = tuple(len(FORME[nome].sillabe) for nome in _NOMI)
+_MAX_VERSI = max(_LUNGHEZZE)
+
+if NUMPY_AVAILABLE:
+    _PATTERN = np.zeros((len(_NOMI), _MAX_VERSI), dtype=np.int32)
+    for _i, _nome in enumerate(_NOMI):
+        _PATTERN[_i, :_LUNGHEZZE[_i]] = FORME[_nome].sillabe
+    _PATTERN.setflags(write=False)
+    _LUNGHEZZE_NP = np.array(_LUNGHEZZE, dtype=np.int32)
+
+
+def _distanze_numpy(sillabe_per_verso):
+    n = len(sillabe_per_verso)
+    colonne = max(_MAX_VERSI, n)
+    pattern = _PATTERN if colonne == _MAX_VERSI else np.pad(_PATTERN, ((0, 0), (0, colonne - _MAX_VERSI)))
+    poesia = np.zeros(colonne, dtype=np.int32)
+    poesia[:n] = sillabe_per_verso
+
+    scarti = np.abs(pattern - poesia)
+    distanze = scarti.sum(axis=1)
+    # Con lo stesso numero di versi le prime n colonne sono tutte allineate
+    massimi = scarti[:, :n].max(axis=1) if n else np.zeros(len(_NOMI), dtype=np.int32)
+    stessi_versi = _LUNGHEZZE_NP == n
+    return [
+        (int(d), int(m) if uguale else None)
+        for d, m, uguale in zip(distanze, massimi, stessi_versi)
+    ]
+
+
+def _distanze_python(sillabe_per_verso):
+    n = len(sillabe_per_verso)
+    risultati = []
+    for nome, lunghezza in zip(_NOMI, _LUNGHEZZE):
+        pattern = FORME[nome].sillabe
+        colonne = max(lunghezza, n)
+        scarti = [
+            abs((pattern[i] if i < lunghezza else 0) - (sillabe_per_verso[i] if i < n else 0))
+            for i in range(colonne)
+        ]
+        risultati.append((sum(scarti), max(scarti[:n], default=0) if lunghezza == n else None))
+    return risultati
+
+
+def _errori_rima(nome, schema_rime):
+    forma = FORME[nome]
+    if nome == 'sonetto':
+        # verifica_metrica impone solo le ottave: le terzine hanno varianti libere
+        accettati = OTTAVE_SONETTO
+        confronto = schema_rime[:8]
+        extra = abs(len(schema_rime) - len(forma.schema))
+    elif forma.schemi_accettati:
+        accettati = forma.schemi_accettati
+        confronto = schema_rime
+        extra = 0
+    else:
+        return 0
+    return extra + min(
+        sum(1 for a, b in zip(confronto, s) if a != b) + abs(len(confronto) - len(s))
+        for s in accettati
+    )
+
+
+def classifica_forme(sillabe_per_verso, schema_rime, top_k=3, use_tolerance=False):
+    """Le top_k forme più vicine, ordinate per punteggio (più basso = più vicina)"""
+    sillabe_per_verso = list(sillabe_per_verso)
+    schema_rime = schema_rime or ''
+    n = len(sillabe_per_verso)
+    distanze = _distanze_numpy(sillabe_per_verso) if NUMPY_AVAILABLE else _distanze_python(sillabe_per_verso)
+
+    punteggi = []
+    for ordine, (nome, lunghezza, (distanza, tolleranza_minima)) in enumerate(zip(_NOMI, _LUNGHEZZE, distanze)):
+        errori_rima = _errori_rima(nome, schema_rime)
+        punteggi.append((distanza + PESO_RIMA * errori_rima, ordine, nome, lunghezza,
+                         distanza, errori_rima, tolleranza_minima))
+    punteggi.sort()
+
+    return [
+        {
+            'tipo': nome,
+            'punteggio': punteggio,
+            'distanza_sillabe': distanza,
+            'differenza_versi': abs(lunghezza - n),
+            'errori_rima': errori_rima,
+            'tolleranza_minima': tolleranza_minima,
+            'rispetta_metrica': verifica_metrica(nome, n, sillabe_per_verso, schema_rime, use_tolerance),
+        }
+        for punteggio, _, nome, lunghezza, distanza, errori_rima, tolleranza_minima in punteggi[:top_k]
+    ]
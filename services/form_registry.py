@@ -0,0 +1,201 @@
+"""Registro delle forme poetiche compilato una volta da SCHEMI_POESIA.
+
+Tutte le tabelle sono immutabili (tuple, frozenset, MappingProxyType) e
+condivise da classificatore (identifica_tipo_poesia), verifica_metrica e dai
+costruttori delle risposte API: nessun dizionario viene ricostruito per
+richiesta e la classificazione valuta solo le regole per il numero di versi.
+"""
+from types import MappingProxyType
+from typing import NamedTuple
+
+from config.constants import SCHEMI_POESIA
+
+# Forme "giapponesi": con tolleranza attiva ammettono ±1 sillaba, le altre ±2
+FORME_TOLLERANZA_STRETTA = frozenset({'haiku', 'tanka', 'katauta', 'choka', 'sedoka'})
+
+# Varianti di rima accettate da verifica_metrica oltre allo schema canonico
+VARIANTI_RIMA = {
+    'quartina': ('ABAB', 'AABB', 'ABBA'),
+}
+
+# Sonetto: ottave accettate (le terzine ammettono le varianti comuni)
+OTTAVE_SONETTO = frozenset({'ABBAABBA', 'ABABABAB'})
+MIN_ENDECASILLABI_SONETTO = 12
+
+# Schemi di default per tipi comuni senza rima in SCHEMI_POESIA (o varianti nominali)
+_SCHEMI_RIMA_DEFAULT = {
+    'sonetto': ('ABBA', 'ABBA', 'CDC', 'DCD'),
+    'quartina': ('ABAB',),  # Schema più comune
+    'quartina (rima alternata)': ('ABAB',),
+    'quartina (rima baciata)': ('AABB',),
+    'quartina (rima incrociata)': ('ABBA',),
+    'terzina_dantesca': ('ABA',),
+    'terzina (rima continua)': ('AAA',),
+    'limerick': ('AABBA',),
+    'ballad': ('ABCB',),
+    'clerihew': ('AABB',),
+    'stornello': ('ABA',),
+}
+
+# L'API storicamente non impone target di sillabe ai distici (con o senza rima)
+_FORME_SENZA_PATTERN_API = frozenset({'distico', 'verso libero'})
+
+
+class Forma(NamedTuple):
+    nome: str
+    sillabe: tuple           # vettore sillabe atteso (vuoto = libero)
+    rima: tuple              # gruppi di rima come in SCHEMI_POESIA
+    schema: str              # gruppi concatenati (es. 'ABBAABBACDCDCD')
+    schemi_accettati: frozenset
+    tolleranza: int          # scarto ammesso con use_tolerance attivo
+
+
+class RegolaClassificazione(NamedTuple):
+    nome: str                # tipo restituito se la regola è soddisfatta
+    sillabe: tuple | None    # target per verso (None = nessun controllo sillabe)
+    tolleranze: tuple        # (per verso senza tolleranza, per verso con tolleranza)
+    schemi: frozenset | None  # schemi rima richiesti (None = qualsiasi)
+    prefissi_schema: tuple | None
+    min_conformi: int | None  # se impostato basta che min_conformi versi rientrino
+
+
+def _compila_forme():
+    forme = {}
+    for nome, schema in SCHEMI_POESIA.items():
+        rima = tuple(schema.get('rima') or ())
+        concatenato = ''.join(rima)
+        forme[nome] = Forma(
+            nome=nome,
+            sillabe=tuple(schema.get('sillabe') or ()),
+            rima=rima,
+            schema=concatenato,
+            schemi_accettati=frozenset(VARIANTI_RIMA.get(nome, (concatenato,) if concatenato else ())),
+            tolleranza=1 if nome in FORME_TOLLERANZA_STRETTA else 2,
+        )
+    return MappingProxyType(forme)
+
+
+FORME = _compila_forme()
+
+
+def _regola(nome, tolleranze, tipo=None, controlla_sillabe=True, schemi=(),
+            prefissi_schema=None, min_conformi=None):
+    """Costruisce una regola: sillabe e schema rima vengono da FORME[nome].
+
+    tolleranze: (senza, con) tolleranza, intero o tupla per verso.
+    schemi=() usa lo schema canonico della forma, None accetta qualsiasi schema.
+    """
+    forma = FORME[nome]
+    n = len(forma.sillabe)
+
+    def per_verso(t):
+        return tuple(t) if isinstance(t, tuple) else (t,) * n
+
+    if schemi == ():
+        schemi = frozenset({forma.schema}) if forma.schema else None
+    elif schemi is not None:
+        schemi = frozenset(schemi)
+    return n, RegolaClassificazione(
+        nome=tipo or nome,
+        sillabe=forma.sillabe if controlla_sillabe else None,
+        tolleranze=(per_verso(tolleranze[0]), per_verso(tolleranze[1])),
+        schemi=schemi,
+        prefissi_schema=prefissi_schema,
+        min_conformi=min_conformi,
+    )
+
+
+# Ordine di valutazione del classificatore (a parità di numero di versi vince la prima)
+_REGOLE = (
+    _regola('haiku', (0, 1), schemi=None),
+    _regola('tanka', (0, 1), schemi=None),
+    _regola('cinquain', (0, 1), schemi=None),
+    _regola('limerick', (0, 0), controlla_sillabe=False),
+    _regola('stornello', (0, (1, 2, 2))),
+    _regola('ballad', (0, 1)),
+    _regola('clerihew', (0, 2)),
+    # Quartina: endecasillabi con qualsiasi schema (ABAB/AABB/ABBA o altro)
+    _regola('quartina', (0, 2), schemi=None),
+    _regola('ottava_rima', (0, 2)),
+    _regola('terzina_dantesca', (0, 2), schemi=None),
+    # Sonetto: maggioranza di endecasillabi e schema che inizia con ABAB/ABBA
+    _regola('sonetto', (1, 2), schemi=None, prefissi_schema=('ABAB', 'ABBA'),
+            min_conformi=MIN_ENDECASILLABI_SONETTO),
+    _regola('distico', (0, 0), tipo='distico (rima baciata)', controlla_sillabe=False),
+)
+
+
+def _compila_regole():
+    per_versi = {}
+    for n, regola in _REGOLE:
+        per_versi.setdefault(n, []).append(regola)
+    return MappingProxyType({n: tuple(regole) for n, regole in per_versi.items()})
+
+
+REGOLE_PER_VERSI = _compila_regole()
+
+# Tipo restituito quando nessuna regola per quel numero di versi è soddisfatta
+RIPIEGO_PER_VERSI = MappingProxyType({
+    1: 'monostico',
+    2: 'distico',
+    6: 'sestina',
+    8: 'ottava',
+})
+RIPIEGO_PREDEFINITO = 'versi_liberi'  # Usa nome compatibile con SCHEMI_POESIA
+
+
+def regola_soddisfatta(regola, sillabe_per_verso, schema_rime, use_tolerance=False):
+    """Verifica una regola di classificazione"""
+    if regola.schemi is not None and schema_rime not in regola.schemi:
+        return False
+    if regola.prefissi_schema and not schema_rime.startswith(regola.prefissi_schema):
+        return False
+    if regola.sillabe is None:
+        return True
+
+    tolleranze = regola.tolleranze[1 if use_tolerance else 0]
+    if regola.min_conformi is not None:
+        conformi = sum(1 for s, t, tol in zip(sillabe_per_verso, regola.sillabe, tolleranze)
+                       if abs(s - t) <= tol)
+        return conformi >= regola.min_conformi
+    if len(sillabe_per_verso) != len(regola.sillabe):
+        return False
+    return all(abs(s - t) <= tol for s, t, tol in zip(sillabe_per_verso, regola.sillabe, tolleranze))
+
+
+def classifica(num_versi, sillabe_per_verso, schema_rime, use_tolerance=False):
+    """Prima forma le cui regole sono soddisfatte, tra i candidati per num_versi"""
+    for regola in REGOLE_PER_VERSI.get(num_versi, ()):
+        if regola_soddisfatta(regola, sillabe_per_verso, schema_rime, use_tolerance):
+            return regola.nome
+    return RIPIEGO_PER_VERSI.get(num_versi, RIPIEGO_PREDEFINITO)
+
+
+# Tabelle per i costruttori delle risposte API
+PATTERN_SILLABE = MappingProxyType({
+    nome: forma.sillabe for nome, forma in FORME.items()
+    if nome not in _FORME_SENZA_PATTERN_API
+})
+
+SCHEMI_RIMA_ATTESI = MappingProxyType({
+    **_SCHEMI_RIMA_DEFAULT,
+    **{nome: forma.rima for nome, forma in FORME.items() if forma.rima},
+})
+
+# Dizionari semplici (finiscono nelle risposte JSON): da trattare in sola lettura
+DETTAGLI_METRICA = MappingProxyType({
+    nome: {
+        'descrizione': SCHEMI_POESIA[nome].get('descrizione', f'Schema per {nome}'),
+        'versi': len(forma.sillabe) if forma.sillabe else None,
+        'sillabe': SCHEMI_POESIA[nome].get('sillabe'),
+        'rime': SCHEMI_POESIA[nome].get('rima'),
+    }
+    for nome, forma in FORME.items()
+})
+
+DETTAGLI_NON_DEFINITI = {
+    'descrizione': 'Schema non definito o verso libero',
+    'versi': None,
+    'sillabe': None,
+    'rime': None
+}
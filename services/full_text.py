@@ -0,0 +1,119 @@
+"""Ricerca full-text della bacheca su titolo, autore e testo.
+
+Con l'indice (models.poem: tsvector + GIN su PostgreSQL, tabella FTS5 su
+SQLite) la ricerca usa il MATCH dell'indice e restituisce un punteggio di
+pertinenza (più alto = migliore) per l'ordinamento 'relevance'. Ogni parola
+cercata è un prefisso e devono esserci tutte, come nella ricerca "mentre si
+scrive" di bacheca.js. Senza indice (migrazione non eseguita, SQLite senza
+FTS5) si torna al vecchio ILIKE '%testo%' in OR sulle tre colonne, senza
+punteggio.
+"""
+import re
+import threading
+import time
+
+from sqlalchemy import Double, cast, func, literal_column, or_, table, column, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.poem import CONFIGURAZIONE_FTS_POSTGRES, Poem, db
+
+# Parole usate al massimo (le altre vengono ignorate)
+MAX_TERMINI_RICERCA = 8
+
+# Ogni quanto ricontrollare se l'indice esiste (dopo una migrazione a caldo)
+INTERVALLO_VERIFICA_INDICE = 300
+
+# Pesi bm25 delle colonne di poems_fts (title, author, content)
+PESI_FTS_SQLITE = (10.0, 5.0, 1.0)
+
+_PAROLA_RE = re.compile(r'[^\W_]+')
+_poems_fts = table('poems_fts', column('rowid'))
+
+_stato_indice = {'disponibile': None, 'verificato': 0.0}
+_stato_lock = threading.Lock()
+
+
+def termini_ricerca(testo):
+    """Parole (lettere e cifre) del testo cercato, in minuscolo"""
+    return _PAROLA_RE.findall((testo or '').lower())[:MAX_TERMINI_RICERCA]
+
+
+def _verifica_indice():
+    dialetto = db.engine.dialect.name
+    if dialetto == 'postgresql':
+        sql = ("SELECT 1 FROM information_schema.columns "
+               "WHERE table_name = 'poems' AND column_name = 'search_vector'")
+    elif dialetto == 'sqlite':
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'poems_fts'"
+    else:
+        return False
+    with db.engine.connect() as conn:
+        return conn.execute(text(sql)).first() is not None
+
+
+def indice_disponibile():
+    """True se l'indice full-text esiste (verifica memorizzata per qualche minuto)"""
+    adesso = time.monotonic()
+    with _stato_lock:
+        if _stato_indice['disponibile'] is not None and adesso - _stato_indice['verificato'] < INTERVALLO_VERIFICA_INDICE:
+            return _stato_indice['disponibile']
+    try:
+        disponibile = _verifica_indice()
+    except SQLAlchemyError as e:
+        print(f"Verifica indice full-text fallita: {e}")
+        disponibile = False
+    with _stato_lock:
+        _stato_indice.update(disponibile=disponibile, verificato=adesso)
+    return disponibile
+
+
+def segna_indice_non_disponibile():
+    """Dopo un errore della query full-text: LIKE fino alla prossima verifica"""
+    with _stato_lock:
+        _stato_indice.update(disponibile=False, verificato=time.monotonic())
+
+
+def filtro_like(query, testo):
+    """Il filtro storico: ILIKE '%testo%' (jolly come letterali) su titolo, testo o autore"""
+    # Escapa i caratteri jolly di LIKE per trattarli come letterali
+    # Usa backslash come escape char e specifica escape='\\'
+    like_input = testo.replace('\\', '\\\\').replace('%', r'\%').replace('_', r'\_')
+    search_pattern = f"%{like_input}%"
+    return query.filter(
+        or_(
+            Poem.title.ilike(search_pattern, escape='\\'),
+            Poem.content.ilike(search_pattern, escape='\\'),
+            Poem.author.ilike(search_pattern, escape='\\')
+        )
+    )
+
+
+def filtro_full_text(query, testo):
+    """(query filtrata, punteggio) con l'indice full-text; None se l'indice non
+    è disponibile o il testo non contiene parole"""
+    termini = termini_ricerca(testo)
+    if not termini or not indice_disponibile():
+        return None
+
+    if db.engine.dialect.name == 'postgresql':
+        tsquery = func.to_tsquery(CONFIGURAZIONE_FTS_POSTGRES, ' & '.join(f'{t}:*' for t in termini))
+        vettore = literal_column('poems.search_vector')
+        # double precision: il valore torna identico nel cursore (real no)
+        punteggio = cast(func.ts_rank(vettore, tsquery), Double)
+        return query.filter(vettore.op('@@')(tsquery)), punteggio
+
+    # FTS5: frasi tra virgolette con prefisso, tutte richieste (AND implicito)
+    match = ' '.join(f'"{t}"*' for t in termini)
+    tabella = literal_column('poems_fts')
+    # bm25 è negativo e più basso = più pertinente
+    punteggio = -func.bm25(tabella, *PESI_FTS_SQLITE)
+    query = query.join(_poems_fts, _poems_fts.c.rowid == Poem.id).filter(tabella.op('MATCH')(match))
+    return query, punteggio
+
+
+def filtro_ricerca(query, testo):
+    """(query filtrata, punteggio o None): full-text se possibile, altrimenti LIKE"""
+    risultato = filtro_full_text(query, testo)
+    if risultato is None:
+        return filtro_like(query, testo), None
+    return risultato
@@ -0,0 +1,168 @@
+"""Lessico precompilato di forme italiane (sillabe + chiave di rima) su file mmap.
+
+Formato (little endian):
+    header   : magic b'AHLX', versione u16, riservato u16, n_slot u32, n_voci u32
+    slot     : n_slot x (offset_parola u32, offset_rima u32,
+                         len_parola u8, len_rima u8, sillabe u8, riservato u8)
+    stringhe : parole e chiavi di rima in UTF-8, concatenate
+
+La tabella è ad indirizzamento aperto (sondaggio lineare, n_slot potenza di 2,
+fattore di carico <= 0.5) con hash crc32 stabile tra processi: il file viene
+aperto con mmap in sola lettura, quindi tutti i worker gunicorn condividono le
+stesse pagine e l'avvio non deve interpretare nessun dizionario Python.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+MAGIC = b'AHLX'
+VERSIONE = 1
+_HEADER = struct.Struct('<4sHHII')
+_SLOT = struct.Struct('<IIBBBB')
+
+PERCORSO_PREDEFINITO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'lessico.bin'
+)
+
+
+class Lessico:
+    """Vista in sola lettura su un file di lessico mappato in memoria"""
+
+    def __init__(self, percorso):
+        self.percorso = percorso
+        with open(percorso, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._verifica_header()
+        except (ValueError, struct.error):
+            self._mm.close()
+            raise ValueError(f"File lessico non valido: {percorso}")
+        self._maschera = self.n_slot - 1
+
+    def _verifica_header(self):
+        """Header e dimensione coerenti: un file troncato non deve arrivare a cerca()"""
+        magic, versione, _, self.n_slot, self.n_voci = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or versione != VERSIONE:
+            raise ValueError("magic o versione errati")
+        # n_slot potenza di 2 con almeno uno slot vuoto (altrimenti il sondaggio non termina)
+        if self.n_slot < 2 or self.n_slot & (self.n_slot - 1) or self.n_voci >= self.n_slot:
+            raise ValueError("numero di slot non valido")
+        if len(self._mm) < _HEADER.size + self.n_slot * _SLOT.size:
+            raise ValueError("file troncato")
+
+    def cerca(self, parola):
+        """Restituisce (sillabe, chiave_rima) oppure None se la parola non è nota"""
+        chiave = parola.encode('utf-8')
+        mm = self._mm
+        i = zlib.crc32(chiave) & self._maschera
+        while True:
+            off_parola, off_rima, len_parola, len_rima, sillabe, _ = _SLOT.unpack_from(
+                mm, _HEADER.size + i * _SLOT.size
+            )
+            if not len_parola:
+                return None
+            if len_parola == len(chiave) and mm[off_parola:off_parola + len_parola] == chiave:
+                return sillabe, mm[off_rima:off_rima + len_rima].decode('utf-8')
+            i = (i + 1) & self._maschera
+
+    def sillabe(self, parola):
+        voce = self.cerca(parola)
+        return voce[0] if voce else None
+
+    def voci(self):
+        """Itera tutte le voci come (parola, sillabe, chiave_rima)"""
+        mm = self._mm
+        for i in range(self.n_slot):
+            off_parola, off_rima, len_parola, len_rima, sillabe, _ = _SLOT.unpack_from(
+                mm, _HEADER.size + i * _SLOT.size
+            )
+            if len_parola:
+                yield (
+                    mm[off_parola:off_parola + len_parola].decode('utf-8'),
+                    sillabe,
+                    mm[off_rima:off_rima + len_rima].decode('utf-8'),
+                )
+
+    def __len__(self):
+        return self.n_voci
+
+    def close(self):
+        self._mm.close()
+
+
+def scrivi_lessico(voci, percorso):
+    """Scrive il file binario a partire da un iterabile di (parola, sillabe, rima)"""
+    unici = {}
+    for parola, sillabe, rima in voci:
+        p = parola.encode('utf-8')
+        r = rima.encode('utf-8')
+        if not p or len(p) > 255 or len(r) > 255 or not 0 < sillabe < 256:
+            continue
+        unici[p] = (sillabe, r)
+
+    n_slot = 2
+    while n_slot < 2 * len(unici):
+        n_slot *= 2
+    maschera = n_slot - 1
+    slot = [None] * n_slot
+
+    stringhe = bytearray()
+    base = _HEADER.size + n_slot * _SLOT.size
+    for p, (sillabe, r) in sorted(unici.items()):
+        off_parola = base + len(stringhe)
+        stringhe += p
+        off_rima = base + len(stringhe)
+        stringhe += r
+        i = zlib.crc32(p) & maschera
+        while slot[i] is not None:
+            i = (i + 1) & maschera
+        slot[i] = (off_parola, off_rima, len(p), len(r), sillabe, 0)
+
+    tmp = percorso + '.tmp'
+    os.makedirs(os.path.dirname(os.path.abspath(percorso)), exist_ok=True)
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSIONE, 0, n_slot, len(unici)))
+        vuoto = _SLOT.pack(0, 0, 0, 0, 0, 0)
+        f.write(b''.join(_SLOT.pack(*s) if s else vuoto for s in slot))
+        f.write(stringhe)
+    # Sostituzione atomica: i worker che hanno già mappato il vecchio file non vedono scritture parziali
+    os.replace(tmp, percorso)
+    return len(unici)
+
+
+_lessico = None
+_caricato = False
+_lock = threading.Lock()
+
+
+def get_lessico():
+    """Apre pigramente il lessico configurato (LEXICON_PATH); None se assente"""
+    global _lessico, _caricato
+    if _caricato:
+        return _lessico
+    with _lock:
+        if not _caricato:
+            percorso = os.environ.get('LEXICON_PATH', PERCORSO_PREDEFINITO)
+            try:
+                _lessico = Lessico(percorso) if os.path.exists(percorso) else None
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Lessico non caricato ({percorso}): {e}")
+                _lessico = None
+            _caricato = True
+    return _lessico
+
+
+def carica_lessico(percorso):
+    """Sostituisce il lessico attivo (None per disattivarlo)"""
+    global _lessico, _caricato
+    from services.syllable_analyzer import invalida_cache_sillabe
+    with _lock:
+        _lessico = Lessico(percorso) if percorso else None
+        _caricato = True
+    invalida_cache_sillabe()
+    # Il lessico sostituito non viene chiuso: altri thread possono averlo appena
+    # letto da get_lessico e stare cercando una parola. La mappa viene rilasciata
+    # dal garbage collector quando nessuno lo usa più
+    return _lessico
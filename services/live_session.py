@@ -0,0 +1,200 @@
+"""Stato incrementale per l'analisi live dell'analizzatore (/api/live).
+
+Il client apre un canale SSE e invia solo le righe modificate del textarea;
+ogni SessioneLive tiene le righe correnti con la loro analisi per verso
+(VersoAnalizzato, dalla cache dei versi) e a ogni delta ricalcola solo le
+righe cambiate più schema rime e classificazione. Gli aggiornamenti sono
+messi in coda per lo stream SSE della sessione.
+
+Le sessioni vivono nel processo che le ha create: con più worker gunicorn un
+delta può arrivare a un worker senza la sessione (il client allora la
+ricrea con reset) o senza lo stream (l'aggiornamento torna nella risposta).
+
+Ogni stream SSE occupa un thread del worker gthread: gli stream aperti
+contemporaneamente in un processo sono al più MAX_STREAM_LIVE, oltre il
+client lavora con le sole risposte ai POST.
+"""
+import os
+import queue
+import secrets
+import threading
+from typing import NamedTuple
+
+from utils.cache import LRUCache
+from services.poetry_analyzer import analizza_verso, componi_analisi
+
+# Stessi limiti di /api/analyze
+MAX_RIGHE_LIVE = 200
+MAX_CARATTERI_LIVE = 2000
+
+# Aggiornamenti non ancora letti dallo stream: oltre si scartano i più vecchi
+MAX_CODA_LIVE = 16
+
+# Stream SSE contemporanei per processo (default: un quarto dei thread gthread)
+MAX_STREAM_LIVE = max(1, int(os.environ.get(
+    'LIVE_MAX_STREAMS', int(os.environ.get('GUNICORN_THREADS', 8)) // 4
+)))
+_posti_stream = threading.BoundedSemaphore(MAX_STREAM_LIVE)
+
+
+class AggiornamentoLive(NamedTuple):
+    versione: int
+    num_righe: int
+    righe_cambiate: tuple     # indici di riga ricalcolati (anche quelli ora vuoti)
+    righe_versi: tuple        # indice di riga di ciascun verso non vuoto
+    versi: tuple              # VersoAnalizzato per ciascun verso non vuoto
+    analisi: dict             # come analizza_poesia_completa
+    tipo: str
+    use_tolerance: bool
+
+
+class SessioneLive:
+    """Righe correnti di un textarea con la loro analisi per verso"""
+
+    def __init__(self, id_sessione):
+        self.id = id_sessione
+        self.righe = []
+        self.analisi_righe = []   # VersoAnalizzato o None per le righe vuote
+        self.righe_versi = ()
+        self.tipo = ''
+        self.use_tolerance = False
+        self.versione = 0
+        self.coda = queue.Queue(maxsize=MAX_CODA_LIVE)
+        self.stream_attivi = 0
+        self._lock = threading.Lock()
+
+    def applica(self, righe, num_righe=None, reset=False, tipo=None, use_tolerance=None):
+        """Applica un delta e restituisce un AggiornamentoLive.
+
+        righe: {indice: testo} con le sole righe modificate, oppure (con reset)
+        la lista completa. num_righe tronca/estende il testo. Solleva
+        ValueError se il delta non è valido o supera i limiti.
+        """
+        if reset:
+            if not isinstance(righe, list):
+                raise ValueError("Con reset 'lines' deve essere la lista completa delle righe")
+            modifiche = dict(enumerate(righe))
+            num_righe = len(righe)
+        else:
+            if not isinstance(righe, dict):
+                raise ValueError("'lines' deve essere un oggetto {indice: testo}")
+            try:
+                modifiche = {int(i): t for i, t in righe.items()}
+            except (TypeError, ValueError):
+                raise ValueError("Indici di riga non validi")
+        if not all(isinstance(t, str) for t in modifiche.values()):
+            raise ValueError("Il testo delle righe deve essere una stringa")
+
+        with self._lock:
+            try:
+                n = len(self.righe) if num_righe is None else int(num_righe)
+            except (TypeError, ValueError):
+                raise ValueError("Numero di righe non valido")
+            if not 0 <= n <= MAX_RIGHE_LIVE:
+                raise ValueError(f"Numero di righe non valido (max {MAX_RIGHE_LIVE})")
+            if any(not 0 <= i < n for i in modifiche):
+                raise ValueError("Indice di riga fuori dal testo")
+
+            nuove = (self.righe + [''] * n)[:n] if not reset else [''] * n
+            for i, testo in modifiche.items():
+                nuove[i] = testo
+            if sum(len(r) + 1 for r in nuove) - 1 > MAX_CARATTERI_LIVE:
+                raise ValueError(f"Il testo è troppo lungo (max {MAX_CARATTERI_LIVE} caratteri).")
+
+            cambia_tipo = (
+                (tipo is not None and tipo != self.tipo)
+                or (use_tolerance is not None and bool(use_tolerance) != self.use_tolerance)
+            )
+            if tipo is not None:
+                self.tipo = tipo
+            if use_tolerance is not None:
+                self.use_tolerance = bool(use_tolerance)
+
+            vecchie = self.analisi_righe
+            analisi_righe = []
+            cambiate = set()
+            for i, testo in enumerate(nuove):
+                if i < len(self.righe) and self.righe[i] == testo and not reset:
+                    analisi_righe.append(vecchie[i])
+                    continue
+                analisi_righe.append(analizza_verso(testo) if testo.strip() else None)
+                cambiate.add(i)
+
+            righe_versi = tuple(i for i, a in enumerate(analisi_righe) if a is not None)
+            if cambia_tipo:
+                cambiate = set(range(n))
+            else:
+                # Un verso che cambia numero (righe svuotate/riempite prima) cambia target
+                precedenti = dict(zip(self.righe_versi, range(len(self.righe_versi))))
+                cambiate.update(i for v, i in enumerate(righe_versi) if precedenti.get(i) != v)
+
+            versi = tuple(analisi_righe[i] for i in righe_versi)
+            self.righe = nuove
+            self.analisi_righe = analisi_righe
+            self.righe_versi = righe_versi
+            self.versione += 1
+
+            return AggiornamentoLive(
+                versione=self.versione,
+                num_righe=n,
+                righe_cambiate=tuple(sorted(cambiate)),
+                righe_versi=righe_versi,
+                versi=versi,
+                analisi=componi_analisi(list(versi), self.use_tolerance),
+                tipo=self.tipo,
+                use_tolerance=self.use_tolerance,
+            )
+
+    def collega_stream(self):
+        with self._lock:
+            self.stream_attivi += 1
+
+    def scollega_stream(self):
+        with self._lock:
+            self.stream_attivi -= 1
+
+    def pubblica(self, evento):
+        """Mette un evento in coda per lo stream; False se nessuno stream è attivo"""
+        if not self.stream_attivi:
+            return False
+        while True:
+            try:
+                self.coda.put_nowait(evento)
+                return True
+            except queue.Full:
+                try:
+                    self.coda.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+# Sessioni del processo: scadono dopo LIVE_SESSION_TTL secondi senza delta
+sessioni_live = LRUCache(
+    int(os.environ.get('LIVE_SESSION_MAX', 1000)),
+    ttl=float(os.environ.get('LIVE_SESSION_TTL', 1800)),
+)
+
+
+def occupa_stream_live():
+    """Riserva un posto per uno stream SSE; False se sono tutti occupati"""
+    return _posti_stream.acquire(blocking=False)
+
+
+def libera_stream_live():
+    """Restituisce il posto riservato con occupa_stream_live"""
+    _posti_stream.release()
+
+
+def nuova_sessione_live(id_sessione=None):
+    """Crea e registra una sessione (id casuale se non fornito)"""
+    sessione = SessioneLive(id_sessione or secrets.token_urlsafe(16))
+    sessioni_live.set(sessione.id, sessione)
+    return sessione
+
+
+def get_sessione_live(id_sessione):
+    """Sessione registrata in questo processo, rinnovandone la scadenza; None se assente"""
+    sessione = sessioni_live.get(id_sessione)
+    if sessione is not None:
+        sessioni_live.set(id_sessione, sessione)
+    return sessione
@@ -0,0 +1,198 @@
+"""Paginazione a cursore (keyset) per la bacheca.
+
+query.paginate esegue un COUNT(*) sull'insieme filtrato e un OFFSET n a ogni
+pagina, quindi le pagine profonde costano sempre di più. Qui ogni ordinamento
+è una colonna più l'id come spareggio e la pagina successiva riparte
+dall'ultima riga vista: WHERE (colonna, id) < (valore, id) ORDER BY colonna, id
+LIMIT per_page + 1, a costo costante con un indice su (colonna, id).
+
+L'ordinamento per pertinenza ('relevance') usa al posto della colonna il
+punteggio della ricerca full-text (services.full_text), più alto = migliore.
+
+next_cursor è un token opaco (JSON in base64 url-safe con ordinamento, valore
+e id dell'ultima riga). Il totale è facoltativo e memorizzato per insieme di
+filtri con un TTL breve (BACHECA_COUNT_TTL), azzerato a ogni pubblicazione.
+"""
+import base64
+import binascii
+import json
+import os
+from datetime import datetime
+from typing import NamedTuple
+
+from sqlalchemy import and_, tuple_
+
+from models.poem import Poem
+from utils.cache import LRUCache
+
+ORDINAMENTO_PREDEFINITO = 'recent'
+ORDINAMENTO_PERTINENZA = 'relevance'
+
+# ordinamento -> (colonna di Poem, discendente)
+ORDINAMENTI = {
+    'recent': ('created_at', True),
+    'oldest': ('created_at', False),
+    'title': ('title', False),
+    'author': ('author', False),
+    'type': ('poem_type', False),
+}
+
+cache_totali = LRUCache(256, ttl=float(os.environ.get('BACHECA_COUNT_TTL', 60)))
+
+
+class PaginaKeyset(NamedTuple):
+    items: list
+    per_page: int
+    has_next: bool
+    next_cursor: str | None
+    total: int | None = None
+
+
+def normalizza_ordinamento(ordinamento, pertinenza=False):
+    """Ordinamento valido (quello predefinito per valori sconosciuti);
+    'relevance' solo se c'è un punteggio di ricerca (pertinenza=True)"""
+    if ordinamento in ORDINAMENTI or (pertinenza and ordinamento == ORDINAMENTO_PERTINENZA):
+        return ordinamento
+    return ORDINAMENTO_PREDEFINITO
+
+
+def codifica_cursore(ordinamento, valore, id_riga):
+    if isinstance(valore, datetime):
+        valore = valore.isoformat()
+    dati = json.dumps([ordinamento, valore, id_riga], separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(dati.encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def decodifica_cursore(cursore, ordinamento):
+    """(valore, id) dell'ultima riga vista; ValueError se il cursore non è valido
+    o appartiene a un altro ordinamento"""
+    try:
+        grezzo = base64.urlsafe_b64decode(cursore + '=' * (-len(cursore) % 4))
+        nome, valore, id_riga = json.loads(grezzo.decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise ValueError("Cursore non valido")
+    if nome != ordinamento or type(id_riga) is not int:
+        raise ValueError("Cursore non valido per questo ordinamento")
+
+    if ordinamento == ORDINAMENTO_PERTINENZA:
+        if type(valore) not in (int, float):
+            raise ValueError("Cursore non valido")
+        return float(valore), id_riga
+
+    colonna, _ = ORDINAMENTI[ordinamento]
+    if valore is not None:
+        if not isinstance(valore, str):
+            raise ValueError("Cursore non valido")
+        if colonna == 'created_at':
+            valore = datetime.fromisoformat(valore)
+    elif not getattr(Poem, colonna).nullable:
+        raise ValueError("Cursore non valido")
+    return valore, id_riga
+
+
+class _Chiave(NamedTuple):
+    espressione: object   # colonna di Poem o punteggio di ricerca
+    discendente: bool
+    nullable: bool
+
+
+def _chiave(ordinamento, punteggio):
+    if ordinamento == ORDINAMENTO_PERTINENZA:
+        return _Chiave(punteggio, True, False)
+    nome_colonna, discendente = ORDINAMENTI[ordinamento]
+    colonna = getattr(Poem, nome_colonna)
+    return _Chiave(colonna, discendente, bool(colonna.nullable))
+
+
+def _ordine(chiave):
+    """ORDER BY chiave, id nella stessa direzione (NULL sempre in fondo)"""
+    if chiave.discendente:
+        ordine = [chiave.espressione.desc(), Poem.id.desc()]
+    else:
+        ordine = [chiave.espressione.asc(), Poem.id.asc()]
+    if chiave.nullable:
+        ordine[0] = ordine[0].nulls_last()
+    return ordine
+
+
+def _dopo(chiave, valore, id_riga):
+    """Righe non NULL che seguono (valore, id_riga) nell'ordine di _ordine.
+
+    Un solo confronto tra tuple, così il database parte dal cursore con una
+    ricerca nell'indice (un OR con "IS NULL" lo costringerebbe a scorrere
+    l'indice dall'inizio): le righe NULL, in fondo, le aggiunge pagina_keyset.
+    """
+    if valore is None:
+        # Siamo già tra i NULL: resta solo lo spareggio sull'id
+        segue_id = Poem.id < id_riga if chiave.discendente else Poem.id > id_riga
+        return and_(chiave.espressione.is_(None), segue_id)
+    tupla = tuple_(chiave.espressione, Poem.id)
+    return tupla < tuple_(valore, id_riga) if chiave.discendente else tupla > tuple_(valore, id_riga)
+
+
+def query_keyset(query, ordinamento=ORDINAMENTO_PREDEFINITO, cursore=None, per_page=12, punteggio=None):
+    """`query` ordinata e limitata a per_page + 1 righe dopo `cursore`.
+
+    Solleva ValueError se il cursore non è valido. Con un cursore su un
+    valore non NULL di una colonna nullable restituisce solo le righe non
+    NULL (vedi _dopo). Con 'relevance' ogni riga è (Poem, punteggio).
+    """
+    ordinamento = normalizza_ordinamento(ordinamento, punteggio is not None)
+    chiave = _chiave(ordinamento, punteggio)
+    if ordinamento == ORDINAMENTO_PERTINENZA:
+        query = query.add_columns(punteggio)
+    if cursore:
+        valore, id_riga = decodifica_cursore(cursore, ordinamento)
+        query = query.filter(_dopo(chiave, valore, id_riga))
+    return query.order_by(*_ordine(chiave)).limit(per_page + 1)
+
+
+def pagina_keyset(query, ordinamento=ORDINAMENTO_PREDEFINITO, cursore=None, per_page=12, punteggio=None):
+    """Una pagina di `query` (già filtrata) dopo `cursore`.
+
+    punteggio è l'espressione di pertinenza della ricerca, se c'è (abilita
+    'relevance'). Solleva ValueError se il cursore non è valido; total resta
+    None (vedi conta_totale).
+    """
+    ordinamento = normalizza_ordinamento(ordinamento, punteggio is not None)
+    chiave = _chiave(ordinamento, punteggio)
+
+    righe = query_keyset(query, ordinamento, cursore, per_page, punteggio).all()
+    valori = None
+    if ordinamento == ORDINAMENTO_PERTINENZA:
+        valori = [valore for _, valore in righe]
+        righe = [poem for poem, _ in righe]
+    elif cursore and chiave.nullable and len(righe) <= per_page:
+        valore, _ = decodifica_cursore(cursore, ordinamento)
+        if valore is not None:
+            # Finite le righe non NULL dopo il cursore: si prosegue con i NULL in fondo
+            ordine_id = Poem.id.desc() if chiave.discendente else Poem.id.asc()
+            righe += (query.filter(chiave.espressione.is_(None))
+                      .order_by(ordine_id).limit(per_page + 1 - len(righe)).all())
+
+    items = righe[:per_page]
+    has_next = len(righe) > per_page
+    next_cursor = None
+    if has_next:
+        ultima = items[-1]
+        if valori is not None:
+            valore = valori[per_page - 1]
+        else:
+            valore = getattr(ultima, ORDINAMENTI[ordinamento][0])
+        next_cursor = codifica_cursore(ordinamento, valore, ultima.id)
+    return PaginaKeyset(items=items, per_page=per_page, has_next=has_next, next_cursor=next_cursor)
+
+
+def conta_totale(query, chiave_filtri):
+    """COUNT(*) di `query`, memorizzato per chiave_filtri (tupla dei filtri applicati)"""
+    chiave = repr(chiave_filtri)
+    totale = cache_totali.get(chiave)
+    if totale is None:
+        totale = query.order_by(None).count()
+        cache_totali.set(chiave, totale)
+    return totale
+
+
+def invalida_totali_bacheca():
+    """Da chiamare dopo l'inserimento o la cancellazione di una poesia"""
+    cache_totali.clear()
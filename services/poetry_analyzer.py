@@ -1,42 +1,172 @@
-from services.syllable_analyzer import conta_sillabe
-from services.rhyme_analyzer import analizza_rime, identifica_schema_poetico
-from config.constants import SCHEMI_POESIA
+import hashlib
+import os
+from typing import NamedTuple
+
+from utils.cache import SingleFlight
+from utils.shared_cache import crea_cache
+from services.syllable_analyzer import (
+    conta_sillabe, conta_sillabe_verso, conta_sillabe_parti, registra_cache_dipendente,
+)
+from services.rhyme_analyzer import analizza_rime, analizza_rime_suoni, identifica_schema_poetico, rhyme_key
+from services.tokenizer import VersoTokenizzato, tokenizza_verso, tokenizza_testo
+from services.form_registry import (
+    FORME, DETTAGLI_METRICA, DETTAGLI_NON_DEFINITI, MIN_ENDECASILLABI_SONETTO,
+    OTTAVE_SONETTO, classifica,
+)
+
+class VersoAnalizzato(NamedTuple):
+    tokens: object            # VersoTokenizzato
+    sillabe: int
+    suono_finale: str
+
+# Cache dei versi già analizzati (VERSE_CACHE_SIZE=0 la disabilita): mentre si
+# scrive una poesia cambia di solito un verso alla volta, gli altri sono hit.
+# Con CACHE_BACKEND=sqlite è condivisa tra i worker (utils.shared_cache)
+def _verso_in_json(analisi):
+    return [list(analisi.tokens), analisi.sillabe, analisi.suono_finale]
+
+def _verso_da_json(dati):
+    (testo, parole, parti, parola_finale, finale_rima), sillabe, suono_finale = dati
+    tokens = VersoTokenizzato(testo, tuple(parole), tuple(tuple(p) for p in parti), parola_finale, finale_rima)
+    return VersoAnalizzato(tokens, sillabe, suono_finale)
+
+cache_versi = crea_cache(
+    'versi',
+    int(os.environ.get('VERSE_CACHE_SIZE', 5000)),
+    codifica=_verso_in_json,
+    decodifica=_verso_da_json,
+)
+registra_cache_dipendente(cache_versi)
+
+def chiave_verso(verso):
+    """Digest del verso normalizzato (strip), usato come chiave di cache_versi"""
+    return hashlib.blake2b(verso.strip().encode('utf-8'), digest_size=16).digest()
+
+def analizza_verso(verso):
+    """Sillabe, suono finale e token di un verso, dalla cache se già visto"""
+    chiave = chiave_verso(verso)
+    analisi = cache_versi.get(chiave)
+    if analisi is None:
+        tokens = tokenizza_verso(verso)
+        analisi = VersoAnalizzato(tokens, conta_sillabe_verso(tokens), rhyme_key(tokens.finale_rima))
+        cache_versi.set(chiave, analisi)
+    return analisi
+
+def statistiche_cache_versi():
+    """Contatori hit/miss/eviction della cache dei versi"""
+    return cache_versi.stats()
+
+# Cache delle analisi complete, condivisa dalle route (analisi e poi
+# pubblicazione dello stesso testo): ANALYSIS_CACHE_SIZE=0 la disabilita
+cache_analisi = crea_cache(
+    'analisi',
+    int(os.environ.get('ANALYSIS_CACHE_SIZE', 1000)),
+    ttl=float(os.environ.get('ANALYSIS_CACHE_TTL', 600)),
+)
+registra_cache_dipendente(cache_analisi)
+
+# Richieste concorrenti per lo stesso (testo, tolleranza) attendono un'unica analisi
+volo_analisi = SingleFlight()
+
+def normalizza_testo(testo):
+    """Testo ridotto ai soli versi non vuoti (strip), come li vede l'analisi"""
+    return '\n'.join(v.strip() for v in testo.strip().split('\n') if v.strip())
+
+def chiave_analisi(testo, use_tolerance=False):
+    """Digest del testo normalizzato più il flag di tolleranza"""
+    digest = hashlib.blake2b(normalizza_testo(testo).encode('utf-8'), digest_size=16).hexdigest()
+    return f"{digest}:{1 if use_tolerance else 0}"
+
+def analizza_poesia(testo, use_tolerance=False):
+    """Come analizza_poesia_completa, passando da cache_analisi.
+
+    Il dizionario restituito è condiviso tra le richieste: da trattare in sola lettura.
+    """
+    if not testo or not testo.strip():
+        return analizza_poesia_completa(testo, use_tolerance)
+    
+    chiave = chiave_analisi(testo, use_tolerance)
+    analisi = cache_analisi.get(chiave)
+    if analisi is None:
+        analisi = volo_analisi.do(chiave, lambda: _analizza_e_memorizza(chiave, testo, use_tolerance))
+    return analisi
+
+def _analizza_e_memorizza(chiave, testo, use_tolerance):
+    analisi = analizza_poesia_completa(testo, use_tolerance)
+    if 'errore' not in analisi:
+        # La classifica delle forme viaggia con l'analisi: sui hit non si ricalcola
+        analisi['forme_vicine'] = forme_vicine(analisi, use_tolerance)
+        cache_analisi.set(chiave, analisi)
+    return analisi
+
+def forme_vicine(analisi, use_tolerance=False):
+    """Le 3 forme più vicine all'analisi (services.form_ranking)"""
+    # Import locale: form_ranking importa verifica_metrica da questo modulo
+    from services.form_ranking import classifica_forme
+    return classifica_forme(analisi['sillabe_per_verso'], analisi['schema_rime'],
+                            top_k=3, use_tolerance=use_tolerance)
+
+def statistiche_cache_analisi():
+    """Contatori hit/miss/eviction/scadenze della cache delle analisi"""
+    return cache_analisi.stats()
+
+def statistiche_coalescenza():
+    """Analisi eseguite e richieste accodate a un'analisi già in corso"""
+    return volo_analisi.stats()
+
+def _analisi_vuota(errore):
+    """Risultato di analisi per input senza versi"""
+    return {
+        'errore': errore,
+        'num_versi': 0,
+        'sillabe_per_verso': [],
+        'sillabe_totali': 0,
+        'schema_rime': '',
+        'tipo_riconosciuto': 'sconosciuto',
+        'rispetta_metrica': False
+    }
 
 def analizza_poesia_completa(testo, use_tolerance=False):
     """Analisi completa di una poesia"""
     if not testo or not testo.strip():
-        return {
-            'errore': 'Testo non fornito o vuoto',
-            'num_versi': 0,
-            'sillabe_per_verso': [],
-            'sillabe_totali': 0,
-            'schema_rime': '',
-            'tipo_riconosciuto': 'sconosciuto',
-            'rispetta_metrica': False
-        }
-    
-    # Dividi in versi
-    versi = [verso.strip() for verso in testo.strip().split('\n') if verso.strip()]
+        return _analisi_vuota('Testo non fornito o vuoto')
     
-    if not versi:
-        return {
-            'errore': 'Nessun verso trovato',
-            'num_versi': 0,
-            'sillabe_per_verso': [],
-            'sillabe_totali': 0,
-            'schema_rime': '',
-            'tipo_riconosciuto': 'sconosciuto',
-            'rispetta_metrica': False
-        }
+    # Solo i versi mai visti vengono tokenizzati e contati; schema e
+    # classificazione sono ricalcolati sempre (costano poco)
+    versi = [analizza_verso(verso) for verso in testo.strip().split('\n') if verso.strip()]
+    return componi_analisi(versi, use_tolerance)
+
+def analizza_poesie_batch(testi, use_tolerance=False):
+    """Analisi di più poesie: ogni parola distinta del batch viene contata una volta.
+
+    Restituisce i risultati nello stesso ordine e con lo stesso schema di
+    analizza_poesia_completa.
+    """
+    tokenizzati = [tokenizza_testo(t) if t and t.strip() else None for t in testi]
+    conteggi = conta_sillabe_parti(v for versi_tok in tokenizzati if versi_tok for v in versi_tok)
+    return [
+        analizza_versi_tokenizzati(versi_tok, use_tolerance, conteggi)
+        if versi_tok is not None else _analisi_vuota('Testo non fornito o vuoto')
+        for versi_tok in tokenizzati
+    ]
+
+def analizza_versi_tokenizzati(versi_tok, use_tolerance=False, conteggi=None):
+    """Analisi completa a partire dai versi tokenizzati (services.tokenizer)"""
+    return componi_analisi([
+        VersoAnalizzato(v, conta_sillabe_verso(v, conteggi), rhyme_key(v.finale_rima))
+        for v in versi_tok
+    ], use_tolerance)
+
+def componi_analisi(versi_analizzati, use_tolerance=False):
+    """Schema rime, classificazione e metrica a partire dai versi già analizzati"""
+    if not versi_analizzati:
+        return _analisi_vuota('Nessun verso trovato')
     
-    # Conta sillabe per ogni verso
-    sillabe_per_verso = []
-    for verso in versi:
-        sillabe = conta_sillabe(verso)
-        sillabe_per_verso.append(sillabe)
+    versi = [v.tokens.testo for v in versi_analizzati]
+    sillabe_per_verso = [v.sillabe for v in versi_analizzati]
     
     # Analizza le rime
-    analisi_rime = analizza_rime(versi)
+    analisi_rime = analizza_rime_suoni([v.suono_finale for v in versi_analizzati])
     schema_rime = analisi_rime['schema']
     
     # Identifica il tipo di poesia
@@ -58,119 +188,18 @@ def analizza_poesia_completa(testo, use_tolerance=False):
     }
 
 def identifica_tipo_poesia(num_versi, sillabe_per_verso, schema_rime, use_tolerance=False):
-    """Identifica il tipo di poesia basandosi su versi, sillabe e rime"""
-    
-    # Haiku: 3 versi, schema 5-7-5 sillabe (tolleranza ±1 se abilitata)
-    if num_versi == 3 and len(sillabe_per_verso) == 3:
-        tolerance = 1 if use_tolerance else 0
-        if (abs(sillabe_per_verso[0] - 5) <= tolerance and 
-            abs(sillabe_per_verso[1] - 7) <= tolerance and 
-            abs(sillabe_per_verso[2] - 5) <= tolerance):
-            return 'haiku'
-    
-    # Tanka: 5 versi, schema 5-7-5-7-7 sillabe (tolleranza ±1 se abilitata)
-    if num_versi == 5 and len(sillabe_per_verso) == 5:
-        target = [5, 7, 5, 7, 7]
-        tolerance = 1 if use_tolerance else 0
-        if all(abs(sillabe_per_verso[i] - target[i]) <= tolerance for i in range(5)):
-            return 'tanka'
-
-    # Cinquain: 5 versi, schema 2-4-6-8-2 (nessuna rima specifica)
-    if num_versi == 5 and len(sillabe_per_verso) == 5:
-        target = [2, 4, 6, 8, 2]
-        tolerance = 1 if use_tolerance else 0
-        if all(abs(sillabe_per_verso[i] - target[i]) <= tolerance for i in range(5)):
-            return 'cinquain'
-    
-    # Limerick: 5 versi, schema AABBA
-    if num_versi == 5 and schema_rime == 'AABBA':
-        return 'limerick'
-
-    # Stornello: 3 versi [5,11,11] con rima ABA
-    if num_versi == 3 and len(sillabe_per_verso) == 3 and schema_rime == 'ABA':
-        tol_first = 1 if use_tolerance else 0
-        tol_ende = 2 if use_tolerance else 0
-        if (abs(sillabe_per_verso[0] - 5) <= tol_first and
-            abs(sillabe_per_verso[1] - 11) <= tol_ende and
-            abs(sillabe_per_verso[2] - 11) <= tol_ende):
-            return 'stornello'
-
-    # Ballad: 4 versi [8,6,8,6] con rima ABCB
-    if num_versi == 4 and len(sillabe_per_verso) == 4 and schema_rime == 'ABCB':
-        target = [8, 6, 8, 6]
-        tolerance = 1 if use_tolerance else 0
-        if all(abs(sillabe_per_verso[i] - target[i]) <= tolerance for i in range(4)):
-            return 'ballad'
+    """Identifica il tipo di poesia basandosi su versi, sillabe e rime.
 
-    # Clerihew: 4 versi ~8 sillabe ciascuno con rima AABB
-    if num_versi == 4 and len(sillabe_per_verso) == 4 and schema_rime == 'AABB':
-        target = [8, 8, 8, 8]
-        tolerance = 2 if use_tolerance else 0
-        if all(abs(sillabe_per_verso[i] - target[i]) <= tolerance for i in range(4)):
-            return 'clerihew'
-    
-    # Quartina - riconosce anche con tolleranza sulle sillabe se abilitata
-    if num_versi == 4:
-        # Controlla se ha sillabe simili agli endecasillabi (tolleranza opzionale)
-        tolerance = 2 if use_tolerance else 0
-        if all(abs(s - 11) <= tolerance for s in sillabe_per_verso):
-            if schema_rime == 'AABB':
-                return 'quartina'  # Usa il tipo base per compatibilità
-            elif schema_rime == 'ABAB':
-                return 'quartina'  # Usa il tipo base per compatibilità
-            elif schema_rime == 'ABBA':
-                return 'quartina'  # Usa il tipo base per compatibilità
-            else:
-                return 'quartina'  # Comunque una quartina
-        else:
-            # Se le sillabe sono molto diverse, potrebbe essere verso libero
-            return 'versi_liberi'  # Usa nome compatibile con SCHEMI_POESIA
-
-    # Ottava rima: 8 versi endecasillabi con schema ABABABCC
-    if num_versi == 8 and len(sillabe_per_verso) == 8 and schema_rime == 'ABABABCC':
-        tolerance = 2 if use_tolerance else 0
-        if all(abs(s - 11) <= tolerance for s in sillabe_per_verso):
-            return 'ottava_rima'
-    
-    # Terzina - riconosce anche con tolleranza sulle sillabe se abilitata
-    if num_versi == 3:
-        # Controlla se ha sillabe simili agli endecasillabi (tolleranza opzionale)
-        tolerance = 2 if use_tolerance else 0
-        if all(abs(s - 11) <= tolerance for s in sillabe_per_verso):
-            return 'terzina_dantesca'  # Usa nome compatibile
-        else:
-            return 'versi_liberi'  # Usa nome compatibile con SCHEMI_POESIA
-    
-    # Sonetto: 14 versi con schema specifico e sillabe vicine a 11 (tolleranza opzionale)
-    if num_versi == 14:
-        tolerance = 2 if use_tolerance else 1
-        within = sum(1 for s in sillabe_per_verso if abs(s - 11) <= tolerance)
-        # Considera sonetto se la maggioranza dei versi è endecasillabo e lo schema inizia con ABAB/ABBA
-        if within >= 12 and (schema_rime.startswith('ABAB') or schema_rime.startswith('ABBA')):
-            return 'sonetto'
-    
-    # Distici
-    if num_versi == 2:
-        if schema_rime == 'AA':
-            return 'distico (rima baciata)'
-        else:
-            return 'distico'
-    
-    # Altre forme
-    if num_versi == 6:
-        return 'sestina'
-    elif num_versi == 8:
-        return 'ottava'
-    elif num_versi == 1:
-        return 'monostico'
-    
-    return 'versi_liberi'  # Usa nome compatibile con SCHEMI_POESIA
+    Le regole (ordine, target, tolleranze e schemi richiesti) sono compilate in
+    services.form_registry: vengono valutate solo quelle per num_versi.
+    """
+    return classifica(num_versi, sillabe_per_verso, schema_rime, use_tolerance)
 
 def verifica_metrica(tipo_poesia, num_versi, sillabe_per_verso, schema_rime, use_tolerance=False):
     """Verifica se la poesia rispetta la metrica del tipo identificato"""
     
     # Per i versi liberi, sempre valido
-    if tipo_poesia in ['verso libero', 'versi_liberi']:
+    if tipo_poesia in ('verso libero', 'versi_liberi'):
         return True
 
     # Regola speciale: Sonetto
@@ -180,10 +209,10 @@ def verifica_metrica(tipo_poesia, num_versi, sillabe_per_verso, schema_rime, use
     if tipo_poesia == 'sonetto':
         if len(sillabe_per_verso) != 14:
             return False
-        tol = 2 if use_tolerance else 0
         if use_tolerance:
+            tol = FORME['sonetto'].tolleranza
             within = sum(1 for s in sillabe_per_verso if abs(s - 11) <= tol)
-            if within < 12:
+            if within < MIN_ENDECASILLABI_SONETTO:
                 return False
         else:
             if any(s != 11 for s in sillabe_per_verso):
@@ -191,82 +220,40 @@ def verifica_metrica(tipo_poesia, num_versi, sillabe_per_verso, schema_rime, use
 
         if not schema_rime or len(schema_rime) != 14:
             return False
-        prefix8 = schema_rime[:8]
-        if prefix8 in ('ABBAABBA', 'ABABABAB'):
-            # Non imponiamo schema rigido sulle terzine per includere le varianti comuni
-            return True
-        return False
+        # Non imponiamo schema rigido sulle terzine per includere le varianti comuni
+        return schema_rime[:8] in OTTAVE_SONETTO
     
-    if tipo_poesia not in SCHEMI_POESIA:
+    forma = FORME.get(tipo_poesia)
+    if forma is None:
         # Se il tipo non è negli schemi, ma è una variante riconosciuta, cerca il tipo base
-        tipo_base = None
         if 'quartina' in tipo_poesia:
-            tipo_base = 'quartina'
+            forma = FORME.get('quartina')
         elif 'terzina' in tipo_poesia:
-            tipo_base = 'terzina_dantesca'
+            forma = FORME.get('terzina_dantesca')
         elif 'distico' in tipo_poesia:
             return True  # I distici sono sempre validi
         
-        if tipo_base and tipo_base in SCHEMI_POESIA:
-            tipo_poesia = tipo_base
-        else:
+        if forma is None:
             return False  # Tipo non riconosciuto
     
-    schema = SCHEMI_POESIA[tipo_poesia]
-    
-    # Verifica sillabe per verso (se specificato) - con tolleranza opzionale
-    if 'sillabe' in schema and schema['sillabe']:
+    # Verifica sillabe per verso (se specificato) - con tolleranza opzionale:
+    # ±1 sillaba per haiku/tanka/katauta/choka/sedoka, ±2 per forme complesse,
+    # precisione assoluta senza tolleranza
+    if forma.sillabe:
         # Il numero di versi deve corrispondere alla lunghezza dello schema sillabe
-        if len(sillabe_per_verso) != len(schema['sillabe']):
+        if len(sillabe_per_verso) != len(forma.sillabe):
             return False
         
-        # Applica tolleranza solo se richiesta dall'utente
-        for i, sillabe_attese in enumerate(schema['sillabe']):
-            sillabe_effettive = sillabe_per_verso[i]
-            if use_tolerance:
-                # Con tolleranza: ±1 sillaba per haiku/tanka, ±2 per forme complesse
-                if tipo_poesia in ['haiku', 'tanka', 'katauta', 'choka', 'sedoka']:
-                    tolleranza = 1
-                else:
-                    tolleranza = 2
-                    
-                if abs(sillabe_effettive - sillabe_attese) > tolleranza:
-                    return False
-            else:
-                # Senza tolleranza: precisione assoluta
-                if sillabe_effettive != sillabe_attese:
-                    return False
+        tolleranza = forma.tolleranza if use_tolerance else 0
+        if any(abs(s - t) > tolleranza for s, t in zip(sillabe_per_verso, forma.sillabe)):
+            return False
     
-    # Verifica schema rime (se specificato) - più flessibile
-    if 'rima' in schema and schema['rima']:
-        schema_atteso = ''.join(schema['rima'])
-        if schema_rime != schema_atteso:
-            # Per alcuni tipi, accetta varianti comuni
-            if tipo_poesia == 'quartina':
-                # Accetta ABAB, AABB, ABBA per quartine
-                if schema_rime not in ['ABAB', 'AABB', 'ABBA']:
-                    return False
-            else:
-                return False
+    # Verifica schema rime (se specificato) - più flessibile per le varianti comuni
+    if forma.schema and schema_rime not in forma.schemi_accettati:
+        return False
     
     return True
 
 def get_dettagli_metrica(tipo_poesia):
     """Restituisce i dettagli della metrica per un tipo di poesia"""
-    if tipo_poesia not in SCHEMI_POESIA:
-        return {
-            'descrizione': 'Schema non definito o verso libero',
-            'versi': None,
-            'sillabe': None,
-            'rime': None
-        }
-    
-    schema = SCHEMI_POESIA[tipo_poesia]
-    num_versi = len(schema.get('sillabe', [])) if schema.get('sillabe') else None
-    
-    return {
-        'descrizione': schema.get('descrizione', f'Schema per {tipo_poesia}'),
-        'versi': num_versi,
-        'sillabe': schema.get('sillabe'),
-        'rime': schema.get('rima')
-    }
+    return DETTAGLI_METRICA.get(tipo_poesia, DETTAGLI_NON_DEFINITI)
@@ -1,46 +1,54 @@
-from config.constants import *
+import os
 import string
 
+from config.constants import *
+from utils.cache import LRUCache
+
+# Punteggiatura (ASCII) e alcune virgolette/tipografici comuni, rimossi con str.translate
+_RIMUOVI_PUNTEGGIATURA = str.maketrans('', '', string.punctuation + '«»“”‘’…')
+
+# Cache per-processo parola -> suono finale (RHYME_CACHE_SIZE=0 la disabilita)
+cache_rime = LRUCache(int(os.environ.get('RHYME_CACHE_SIZE', 20000)))
+
 def normalizza_per_rima(parola):
     """Normalizza una parola per l'analisi delle rime"""
     if not parola:
         return ""
     
-    parola = parola.lower().strip()
-
-    # Rimuovi punteggiatura (ASCII) e alcune virgolette/tipografici comuni
-    chars_to_remove = set(string.punctuation) | set('«»“”‘’…')
-    parola = ''.join(ch for ch in parola if ch not in chars_to_remove)
-    
-    return parola
+    return parola.lower().strip().translate(_RIMUOVI_PUNTEGGIATURA)
 
 def estrai_suono_finale(parola):
     """Estrae il suono finale di una parola per l'analisi delle rime"""
-    parola_norm = normalizza_per_rima(parola)
-    
+    return suono_finale_normalizzato(normalizza_per_rima(parola))
+
+def suono_finale_normalizzato(parola_norm):
+    """Come estrai_suono_finale, per una parola già passata da normalizza_per_rima"""
     if len(parola_norm) < 2:
         return parola_norm
     
     # Per le rime italiane, tipicamente si considera l'accento sulla penultima sillaba
-    # Quindi prendiamo dalla penultima vocale alla fine, o dall'ultima se è l'unica
-    
-    # Trova tutte le vocali
-    vocali_pos = []
-    for i, char in enumerate(parola_norm):
-        if char in VOCALI:
-            vocali_pos.append(i)
-    
-    if not vocali_pos:
-        return parola_norm[-2:]  # Fallback
-    
-    # Se c'è solo una vocale, prendi da lì alla fine
-    if len(vocali_pos) == 1:
-        return parola_norm[vocali_pos[0]:]
-    
-    # Se ci sono 2 o più vocali, prendi dalla penultima alla fine
-    # Questo cattura la sillaba tonica + eventuale atona finale
-    start_pos = vocali_pos[-2]
-    return parola_norm[start_pos:]
+    # Quindi prendiamo dalla penultima vocale alla fine, o dall'ultima se è l'unica.
+    # Scansione dalla fine: ci si ferma appena trovate le ultime due vocali
+    ultima = -1
+    for i in range(len(parola_norm) - 1, -1, -1):
+        if parola_norm[i] in VOCALI:
+            if ultima >= 0:
+                return parola_norm[i:]
+            ultima = i
+    
+    if ultima < 0:
+        return parola_norm[-2:]  # Fallback: nessuna vocale
+    
+    # Una sola vocale: da lì alla fine
+    return parola_norm[ultima:]
+
+def rhyme_key(parola):
+    """Suono finale di una parola (come estrai_suono_finale) con cache limitata"""
+    suono = cache_rime.get(parola)
+    if suono is None:
+        suono = estrai_suono_finale(parola)
+        cache_rime.set(parola, suono)
+    return suono
 
 def analizza_rime(versi):
     """Analizza le rime tra i versi"""
@@ -61,32 +69,45 @@ def analizza_rime(versi):
             parole_finali.append("")
     
     # Estrai i suoni finali
-    suoni_finali = [estrai_suono_finale(parola) for parola in parole_finali]
+    return raggruppa_rime([rhyme_key(parola) for parola in parole_finali])
+
+def analizza_rime_versi(versi_tok):
+    """Come analizza_rime, per versi già tokenizzati (services.tokenizer)"""
+    return analizza_rime_suoni([rhyme_key(v.finale_rima) for v in versi_tok] if versi_tok else [])
+
+def analizza_rime_suoni(suoni_finali):
+    """Come analizza_rime, a partire dai suoni finali già estratti"""
+    if len(suoni_finali) < 2:
+        return {"schema": "", "rime": []}
     
-    # Raggruppa le rime
+    return raggruppa_rime(suoni_finali)
+
+def raggruppa_rime(suoni_finali):
+    """Assegna le lettere dello schema ai suoni finali"""
+    # Raggruppa le rime: ogni gruppo è indicizzato dalla sua chiave_rima,
+    # così ogni verso viene assegnato con una sola lookup
     gruppi_rime = {}
+    lettere_per_chiave = {}
     schema_lettere = []
     lettera_corrente = 'A'
     
-    for i, suono in enumerate(suoni_finali):
+    for suono in suoni_finali:
         if not suono:
             schema_lettere.append('-')
             continue
             
         # Cerca se questo suono rima con uno precedente
-        trovato = False
-        for lettera, gruppo_suoni in gruppi_rime.items():
-            if any(suoni_rimano(suono, s) for s in gruppo_suoni):
-                schema_lettere.append(lettera)
-                gruppo_suoni.append(suono)
-                trovato = True
-                break
-        
-        if not trovato:
+        chiave = chiave_rima(suono)
+        lettera = lettere_per_chiave.get(chiave)
+        if lettera is not None:
+            gruppi_rime[lettera].append(suono)
+        else:
             # Nuovo gruppo di rime
-            gruppi_rime[lettera_corrente] = [suono]
-            schema_lettere.append(lettera_corrente)
+            lettera = lettera_corrente
+            lettere_per_chiave[chiave] = lettera
+            gruppi_rime[lettera] = [suono]
             lettera_corrente = chr(ord(lettera_corrente) + 1)
+        schema_lettere.append(lettera)
     
     return {
         "schema": "".join(schema_lettere),
@@ -94,6 +115,12 @@ def analizza_rime(versi):
         "suoni_finali": suoni_finali
     }
 
+def chiave_rima(suono):
+    """Classe di equivalenza di suoni_rimano: due suoni non vuoti rimano
+    se e solo se hanno la stessa chiave (ultimi due caratteri, o il suono
+    stesso se di un solo carattere)"""
+    return suono[-2:]
+
 def suoni_rimano(suono1, suono2):
     """Verifica se due suoni rimano"""
     if not suono1 or not suono2:
@@ -0,0 +1,80 @@
+"""Indice delle rime per il dizionario "cosa rima con X".
+
+Le parole vengono indicizzate per suono finale (lo stesso di
+estrai_suono_finale / rhyme_key). I suoni sono tenuti anche in una lista
+ordinata di chiavi invertite: tutti i suoni che rimano secondo suoni_rimano
+(stessi ultimi due caratteri) sono quindi un intervallo contiguo trovato con
+bisect, senza scandire il vocabolario.
+"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+
+from services.rhyme_analyzer import rhyme_key, chiave_rima
+from services.tokenizer import tokenizza_testo
+
+
+class IndiceRime:
+    """Indice in memoria suono finale -> {parola: occorrenze}"""
+
+    def __init__(self):
+        self._parole = {}
+        self._suoni_invertiti = []
+        self._lock = threading.Lock()
+        self.ultimo_id = 0  # id dell'ultima poesia indicizzata
+        self.num_poesie = 0  # poesie indicizzate (per accorgersi di quelle cancellate)
+
+    def aggiungi_parola(self, parola, occorrenze=1, suono=None):
+        """Registra una parola; suono può essere passato se già noto (es. dal lessico)"""
+        suono = suono or rhyme_key(parola)
+        if not suono:
+            return
+        with self._lock:
+            parole = self._parole.get(suono)
+            if parole is None:
+                parole = self._parole[suono] = {}
+                insort(self._suoni_invertiti, suono[::-1])
+            parole[parola] = parole.get(parola, 0) + occorrenze
+
+    def aggiungi_testo(self, testo):
+        """Indicizza tutte le parole di un testo (le elisioni contano per parte)"""
+        for verso in tokenizza_testo(testo or ''):
+            for parti in verso.parti:
+                for parte in parti:
+                    if "'" not in parte and len(parte) > 1:
+                        self.aggiungi_parola(parte)
+
+    def _suoni_in_rima(self, suono):
+        """Suoni con la stessa chiave_rima (intervallo sulle chiavi invertite)"""
+        prefisso = chiave_rima(suono)[::-1]
+        i = bisect_left(self._suoni_invertiti, prefisso)
+        while i < len(self._suoni_invertiti) and self._suoni_invertiti[i].startswith(prefisso):
+            invertito = self._suoni_invertiti[i]
+            # Suoni di un carattere rimano solo con se stessi
+            if len(prefisso) > 1 or len(invertito) == 1:
+                yield invertito[::-1]
+            i += 1
+
+    def cerca(self, parola, limit=20, min_count=1):
+        """Parole che rimano con parola: prima le rime perfette, poi per frequenza"""
+        parola = (parola or '').strip().lower()
+        suono = rhyme_key(parola)
+        if not suono:
+            return suono, []
+
+        candidati = []
+        with self._lock:
+            for s in self._suoni_in_rima(suono):
+                perfetta = s == suono
+                for p, n in self._parole[s].items():
+                    if n >= min_count and p != parola:
+                        candidati.append((not perfetta, -n, p, s))
+
+        migliori = heapq.nsmallest(limit, candidati)
+        return suono, [
+            {'word': p, 'count': -n, 'sound': s, 'perfect': not imperfetta}
+            for imperfetta, n, p, s in migliori
+        ]
+
+    def __len__(self):
+        return sum(len(p) for p in self._parole.values())
@@ -0,0 +1,126 @@
+"""Indice metrico per suggerire parole per numero di sillabe e chiave di rima.
+
+Il file (costruito offline con utils.build_suggest_index) contiene una riga
+per parola, ordinata per byte:
+
+    <rima>\t<sillabe:02d>\t<parola>\t<occorrenze>\n
+
+con le parole di ogni sezione (rima, sillabe) in ordine di frequenza
+decrescente. Viene aperto con mmap e interrogato con ricerca binaria sulle
+righe: una query "2-3 sillabe, rima -ore" legge solo le sezioni
+(ore, 02) e (ore, 03), senza ricalcolare sillabe.
+"""
+import heapq
+import mmap
+import os
+import threading
+
+PERCORSO_PREDEFINITO = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'suggerimenti.tsv'
+)
+MAX_SILLABE = 99
+
+
+class IndiceMetrico:
+    """Vista in sola lettura sul file dell'indice metrico"""
+
+    def __init__(self, percorso):
+        self.percorso = percorso
+        with open(percorso, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _prima_riga_da(self, chiave):
+        """Offset della prima riga >= chiave (byte)"""
+        mm = self._mm
+        lo, hi = 0, len(mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            # Inizio della riga che contiene mid (lo è sempre un inizio riga)
+            inizio = mm.rfind(b'\n', lo, mid) + 1
+            if inizio == 0:
+                inizio = lo
+            fine = mm.find(b'\n', inizio)
+            if fine < 0:
+                fine = len(mm)
+            if mm[inizio:fine] < chiave:
+                lo = fine + 1
+            else:
+                hi = inizio
+        return lo
+
+    def sezione(self, rima, sillabe, limit):
+        """Le prime `limit` parole (più frequenti) per (rima, sillabe)"""
+        mm = self._mm
+        chiave = f"{rima}\t{sillabe:02d}\t".encode('utf-8')
+        pos = self._prima_riga_da(chiave)
+        risultati = []
+        while pos < len(mm) and len(risultati) < limit:
+            fine = mm.find(b'\n', pos)
+            if fine < 0:
+                fine = len(mm)
+            riga = mm[pos:fine]
+            if not riga.startswith(chiave):
+                break
+            parola, occorrenze = riga[len(chiave):].decode('utf-8').split('\t')
+            risultati.append((parola, int(occorrenze)))
+            pos = fine + 1
+        return risultati
+
+    def suggerisci(self, rima, min_sillabe, max_sillabe, limit=20):
+        """Parole con rima data e sillabe in [min_sillabe, max_sillabe], per frequenza"""
+        candidati = []
+        for sillabe in range(max(1, min_sillabe), min(max_sillabe, MAX_SILLABE) + 1):
+            for parola, occorrenze in self.sezione(rima, sillabe, limit):
+                candidati.append((-occorrenze, sillabe, parola))
+        return [
+            {'word': parola, 'syllables': sillabe, 'count': -n}
+            for n, sillabe, parola in heapq.nsmallest(limit, candidati)
+        ]
+
+    def close(self):
+        self._mm.close()
+
+
+def scrivi_indice_metrico(conteggi, percorso):
+    """Scrive il file a partire da {parola: occorrenze}; sillabe e rima calcolate qui"""
+    from services.syllable_analyzer import conta_sillabe_singola
+    from services.rhyme_analyzer import rhyme_key
+
+    righe = []
+    for parola, occorrenze in conteggi.items():
+        rima = rhyme_key(parola)
+        sillabe = conta_sillabe_singola(parola)
+        if not rima or '\t' in parola or not 0 < sillabe <= MAX_SILLABE:
+            continue
+        righe.append((rima.encode('utf-8'), sillabe, -occorrenze, parola))
+    righe.sort()
+
+    tmp = percorso + '.tmp'
+    os.makedirs(os.path.dirname(os.path.abspath(percorso)), exist_ok=True)
+    with open(tmp, 'w', encoding='utf-8', newline='\n') as f:
+        for rima, sillabe, n, parola in righe:
+            f.write(f"{rima.decode('utf-8')}\t{sillabe:02d}\t{parola}\t{-n}\n")
+    os.replace(tmp, percorso)
+    return len(righe)
+
+
+_indice = None
+_caricato = False
+_lock = threading.Lock()
+
+
+def get_indice_metrico():
+    """Apre pigramente l'indice configurato (SUGGEST_INDEX_PATH); None se assente"""
+    global _indice, _caricato
+    if _caricato:
+        return _indice
+    with _lock:
+        if not _caricato:
+            percorso = os.environ.get('SUGGEST_INDEX_PATH', PERCORSO_PREDEFINITO)
+            try:
+                _indice = IndiceMetrico(percorso) if os.path.exists(percorso) else None
+            except (OSError, ValueError) as e:
+                print(f"Indice metrico non caricato ({percorso}): {e}")
+                _indice = None
+            _caricato = True
+    return _indice
@@ -1,16 +1,50 @@
+import os
+import re
+
 from config.constants import *
 from utils.text_processing import *
+from utils.shared_cache import crea_cache
+from services.lexicon import get_lessico
+from services.tokenizer import tokenizza_verso
+
+# Cache dei conteggi per parola (SYLLABLE_CACHE_SIZE=0 la disabilita); con
+# CACHE_BACKEND=sqlite è condivisa tra i worker come le altre (utils.shared_cache)
+cache_sillabe = crea_cache('sillabe', int(os.environ.get('SYLLABLE_CACHE_SIZE', 20000)))
+
+# Cache costruite sopra i conteggi per parola (es. cache dei versi in
+# poetry_analyzer): vengono svuotate insieme a cache_sillabe
+_cache_dipendenti = []
 
 def conta_sillabe(testo):
     """Funzione principale per contare le sillabe"""
     if not testo or not testo.strip():
         return 0
     
-    testo_pulito_temp = pulisci_testo(testo)
-    if ' ' not in testo_pulito_temp and testo_pulito_temp.lower() in ECCEZIONI:
-        return ECCEZIONI[testo_pulito_temp.lower()]
+    return conta_sillabe_verso(tokenizza_verso(testo))
+
+def conta_sillabe_verso(verso_tok, conteggi=None):
+    """Conta le sillabe di un verso già tokenizzato (services.tokenizer).
+
+    conteggi è un eventuale dizionario parte -> sillabe già calcolato
+    (vedi conta_sillabe_parti), usato al posto di conta_sillabe_singola.
+    """
+    parole = verso_tok.parole
+    if len(parole) == 1 and parole[0] in ECCEZIONI:
+        return ECCEZIONI[parole[0]]
     
-    return conta_sillabe_parola_composta(testo)
+    conta = conteggi.__getitem__ if conteggi is not None else conta_sillabe_singola
+    return sum(conta(parte) for parti in verso_tok.parti for parte in parti)
+
+def conta_sillabe_parti(versi_tok):
+    """Conta una sola volta ogni parte di parola distinta in un insieme di versi"""
+    uniche = {parte for v in versi_tok for parti in v.parti for parte in parti}
+    return {parte: conta_sillabe_singola(parte) for parte in uniche}
+
+def conta_sillabe_batch(testi):
+    """Versione batch di conta_sillabe: risultati nello stesso ordine dell'input"""
+    versi_tok = [tokenizza_verso(t) if t and t.strip() else None for t in testi]
+    conteggi = conta_sillabe_parti(v for v in versi_tok if v is not None)
+    return [conta_sillabe_verso(v, conteggi) if v is not None else 0 for v in versi_tok]
 
 def conta_sillabe_parola_composta(testo):
     """Conta le sillabe di un testo con più parole"""
@@ -38,12 +72,41 @@ def conta_sillabe_singola(parola):
         return 0
         
     parola_clean = parola.strip().lower()
+
+    sillabe = cache_sillabe.get(parola_clean)
+    if sillabe is not None:
+        return sillabe
     
-    # Controlla nelle eccezioni PRIMA di tutto
-    if parola_clean in ECCEZIONI:
-        return ECCEZIONI[parola_clean]
-    
-    return conta_sillabe_algoritmo(parola_clean)
+    # Controlla nelle eccezioni PRIMA di tutto, poi il lessico precompilato
+    sillabe = ECCEZIONI.get(parola_clean)
+    if sillabe is None:
+        lessico = get_lessico()
+        if lessico is not None:
+            sillabe = lessico.sillabe(parola_clean)
+    if sillabe is None:
+        sillabe = conta_sillabe_motore(parola_clean)
+
+    cache_sillabe.set(parola_clean, sillabe)
+    return sillabe
+
+def invalida_cache_sillabe():
+    """Svuota la cache delle parole (da chiamare se cambiano ECCEZIONI o motore)"""
+    cache_sillabe.clear()
+    for cache in _cache_dipendenti:
+        cache.clear()
+
+def registra_cache_dipendente(cache):
+    """Registra una cache da invalidare insieme a quella delle parole"""
+    _cache_dipendenti.append(cache)
+
+def aggiorna_eccezioni(nuove_eccezioni):
+    """Aggiunge/sovrascrive eccezioni al conteggio e invalida la cache"""
+    ECCEZIONI.update({k.strip().lower(): int(v) for k, v in nuove_eccezioni.items()})
+    invalida_cache_sillabe()
+
+def statistiche_cache_sillabe():
+    """Contatori hit/miss/eviction della cache delle parole"""
+    return cache_sillabe.stats()
 
 def conta_sillabe_algoritmo(parola):
     """Algoritmo di conteggio sillabe con gestione prefissi"""
@@ -74,6 +137,91 @@ def conta_sillabe_algoritmo(parola):
     
     return max(1, count)
 
+def _compila_nuclei():
+    """Compila una sola volta le tabelle di config.constants in una regex.
+
+    L'alternanza rispetta la stessa priorità del ciclo di
+    conta_sillabe_algoritmo: trigrammi e digrammi vengono consumati senza
+    contare, poi trittongo > dittongo > vocale singola. Solo i nuclei
+    vocalici finiscono nel gruppo catturato.
+    """
+    deboli = 'iìuù'
+    trittonghi = set(TRITTONGHI) | {
+        a + b + c for a in deboli for b in VOCALI for c in deboli
+    }
+    dittonghi = {d for d in DITTONGHI if not is_iato(d[0], d[1])}
+
+    def alternanza(gruppo):
+        # Emette la regex da un trie: i prefissi comuni vengono fattorizzati
+        # e a parità di posizione il match più lungo ha la precedenza
+        trie = {}
+        for g in gruppo:
+            nodo = trie
+            for c in g:
+                nodo = nodo.setdefault(c, {})
+            nodo[''] = {}
+
+        def emetti(nodo):
+            rami = sorted(c for c in nodo if c)
+            foglie = [c for c in rami if list(nodo[c]) == ['']]
+            parti = [re.escape(c) + emetti(nodo[c]) for c in rami if c not in foglie]
+            if len(foglie) == 1:
+                parti.append(re.escape(foglie[0]))
+            elif foglie:
+                parti.append('[' + ''.join(re.escape(c) for c in foglie) + ']')
+            if '' in nodo:
+                return f"(?:{'|'.join(parti)})?" if parti else ''
+            return parti[0] if len(parti) == 1 else f"(?:{'|'.join(parti)})"
+
+        return emetti(trie)
+
+    consonanti = alternanza(set(TRIGRAMMI) | set(DIGRAMMI))
+    nuclei = '|'.join([
+        alternanza(trittonghi),
+        alternanza(dittonghi),
+        f"[{re.escape(VOCALI)}]",
+    ])
+    return re.compile(f"(?:{consonanti})|({nuclei})")
+
+
+_NUCLEI_RE = _compila_nuclei()
+
+def conta_sillabe_compilato(parola):
+    """Conteggio sillabe con la regex precompilata (stesso risultato dell'algoritmo)"""
+    if not parola:
+        return 0
+
+    # findall restituisce '' per i gruppi consonantici consumati
+    trovati = _NUCLEI_RE.findall(gestisci_prefissi_vocalici(parola))
+    return max(1, len(trovati) - trovati.count(''))
+
+# Motori di conteggio selezionabili (SYLLABLE_ENGINE=algoritmo per il ciclo originale)
+MOTORI_SILLABE = {
+    'algoritmo': conta_sillabe_algoritmo,
+    'compilato': conta_sillabe_compilato,
+}
+MOTORE_PREDEFINITO = 'compilato'
+
+def _motore_da_ambiente():
+    """SYLLABLE_ENGINE validato una volta all'import (un refuso è un errore, non l'algoritmo)"""
+    nome = os.environ.get('SYLLABLE_ENGINE', MOTORE_PREDEFINITO).strip().lower()
+    if nome not in MOTORI_SILLABE:
+        raise ValueError(f"SYLLABLE_ENGINE non valido: {nome!r} ({', '.join(MOTORI_SILLABE)})")
+    return nome
+
+MOTORE_SILLABE = _motore_da_ambiente()
+# Funzione del motore selezionato, usata da conta_sillabe_singola
+conta_sillabe_motore = MOTORI_SILLABE[MOTORE_SILLABE]
+
+def imposta_motore_sillabe(nome):
+    """Seleziona il motore usato da conta_sillabe_singola"""
+    global MOTORE_SILLABE, conta_sillabe_motore
+    if nome not in MOTORI_SILLABE:
+        raise ValueError(f"Motore sillabe sconosciuto: {nome}")
+    MOTORE_SILLABE = nome
+    conta_sillabe_motore = MOTORI_SILLABE[nome]
+    invalida_cache_sillabe()
+
 def is_dittongo(c1, c2):
     """Verifica se due caratteri formano un dittongo"""
     if c1 == '|' or c2 == '|':
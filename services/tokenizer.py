@@ -0,0 +1,48 @@
+"""Tokenizzazione condivisa dei versi per l'analisi di sillabe e rime.
+
+Ogni verso viene portato in minuscolo, pulito e diviso una sola volta; la
+struttura risultante è consumata sia da syllable_analyzer sia da
+rhyme_analyzer.
+"""
+from typing import NamedTuple
+
+from utils.text_processing import pulisci_testo_minuscolo, gestisci_apostrofi
+from services.rhyme_analyzer import normalizza_per_rima
+
+
+class VersoTokenizzato(NamedTuple):
+    testo: str                # verso originale (strip)
+    parole: tuple             # parole pulite, come pulisci_testo(verso).split()
+    parti: tuple              # per ogni parola, le parti dopo gestisci_apostrofi
+    parola_finale: str        # ultima parola grezza (minuscola), usata per la rima
+    finale_rima: str          # parola_finale normalizzata con normalizza_per_rima
+
+
+def tokenizza_verso(verso):
+    """Costruisce la struttura di token di un singolo verso"""
+    testo = verso.strip()
+    minuscolo = testo.lower()
+    parole = tuple(pulisci_testo_minuscolo(minuscolo).split())
+
+    parti = tuple(
+        tuple(p for p in (parte.strip() for parte in gestisci_apostrofi(parola)) if p)
+        for parola in parole
+    )
+
+    # La rima considera l'ultima parola "grezza" (punteggiatura rimossa dopo),
+    # come faceva analizza_rime dividendo il verso sugli spazi
+    grezze = minuscolo.split()
+    parola_finale = grezze[-1] if grezze else ''
+
+    return VersoTokenizzato(
+        testo=testo,
+        parole=parole,
+        parti=parti,
+        parola_finale=parola_finale,
+        finale_rima=normalizza_per_rima(parola_finale),
+    )
+
+
+def tokenizza_testo(testo):
+    """Divide il testo in versi non vuoti e li tokenizza"""
+    return [tokenizza_verso(verso) for verso in testo.strip().split('\n') if verso.strip()]
@@ -1,7 +1,7 @@
 /**
  * Bacheca delle Poesie - JavaScript Module
  * Gestisce l'interfaccia interattiva della bacheca poetica
- * @version 1.11 - Hardening ricerca: sanificazione input e limiti
+ * @version 1.13 - Autori del filtro caricati su richiesta da /api/authors
  */
 
 // Sanificazione input lato client (riuso utilità condivisa)
@@ -16,9 +16,11 @@ class BachecaManager {
         };
         
         this.currentSort = 'recent';
-        this.currentPage = 1;
-        this.totalPages = 1;
+        this.nextCursor = null;   // next_cursor della pagina già mostrata (null = fine)
+        this.totalCount = null;
         this.isLoading = false;
+        this.isLoadingMore = false;
+        this.scrollObserver = null;
         
         // Cache elementi DOM
         this.elements = {};
@@ -26,13 +28,20 @@ class BachecaManager {
         
         // Debounce timers
         this.searchTimeout = null;
+        this.authorSuggestTimeout = null;
+        this.authorSuggestController = null;
+        this.authorSuggestionsLoaded = false;
         
         // Configurazione
         this.config = {
             searchDelay: 500,
+            authorSuggestDelay: 200,
+            authorSuggestLimit: 20,
             maxSearchLength: 120,
             animationDuration: 300,
             loadingTimeout: 10000,
+            // Anticipo con cui caricare la pagina successiva prima di arrivare in fondo
+            infiniteScrollMargin: '600px',
             share: {
                 origin: typeof window !== 'undefined' ? window.location.origin : '',
                 // Future-proof: modify here if permalink pattern changes
@@ -63,7 +72,7 @@ class BachecaManager {
      */
     init() {
         this.cacheElements();
-        this.syncPaginationState();
+        this.syncCursorState();
         this.initializeEventListeners();
         this.initializeToasts();
     this.initializeSharePopup();
@@ -82,6 +91,7 @@ class BachecaManager {
             searchText: document.getElementById('searchText'),
             typeFilter: document.getElementById('typeFilter'),
             authorFilter: document.getElementById('authorFilter'),
+            authorOptions: document.getElementById('authorOptions'),
             applyFilters: document.getElementById('applyFilters'),
             clearFilters: document.getElementById('clearFilters'),
             clearAllFilters: document.getElementById('clearAllFilters'),
@@ -98,8 +108,8 @@ class BachecaManager {
             // Ordinamento
             sortButtons: document.querySelectorAll('[data-sort]'),
             
-            // Paginazione
-            goToPage: document.getElementById('goToPage'),
+            // Paginazione (link "Carica altre" con il cursore successivo)
+            loadMore: document.getElementById('loadMorePoems'),
             
             // Modal
             expandedModal: document.getElementById('expandedPoemModal'),
@@ -129,8 +139,8 @@ class BachecaManager {
         // Ordinamento
         this.setupSortListeners();
         
-        // Paginazione
-        this.setupPaginationListeners();
+        // Scroll infinito
+        this.setupInfiniteScroll();
         
         // Tasti di scelta rapida
         this.setupKeyboardShortcuts();
@@ -178,8 +188,27 @@ class BachecaManager {
 
         // Filtro autore
         if (this.elements.authorFilter) {
-            this.elements.authorFilter.addEventListener('change', (e) => {
-                this.currentFilters.author = e.target.value;
+            const authorFilter = this.elements.authorFilter;
+            // Suggerimenti caricati solo quando il campo viene usato
+            authorFilter.addEventListener('focus', () => {
+                if (!this.authorSuggestionsLoaded) {
+                    this.loadAuthorSuggestions(authorFilter.value);
+                }
+            });
+            authorFilter.addEventListener('input', (e) => {
+                clearTimeout(this.authorSuggestTimeout);
+                // Scelta di un suggerimento: niente InputEvent di digitazione
+                const picked = !(e instanceof InputEvent) || e.inputType === 'insertReplacementText';
+                if (picked && this.isAuthorSuggestion(authorFilter.value)) {
+                    authorFilter.blur();  // il 'change' applica il filtro
+                    return;
+                }
+                this.authorSuggestTimeout = setTimeout(() => {
+                    this.loadAuthorSuggestions(authorFilter.value);
+                }, this.config.authorSuggestDelay);
+            });
+            authorFilter.addEventListener('change', (e) => {
+                this.currentFilters.author = e.target.value.trim() || 'all';
                 this.applyFilters();
             });
         }
@@ -298,27 +327,101 @@ class BachecaManager {
     }
 
     /**
-     * Setup listeners per la paginazione
+     * Setup scroll infinito: il link "Carica altre" resta un normale link
+     * (?cursor=...) senza JavaScript; qui carica le card successive in pagina
      */
-    setupPaginationListeners() {
-        // Input field
-        if (this.elements.goToPage) {
-            this.elements.goToPage.addEventListener('keypress', (e) => {
-                if (e.key === 'Enter') {
-                    this.goToSpecificPage();
+    setupInfiniteScroll() {
+        const loadMore = this.elements.loadMore;
+        if (!loadMore) return;
+
+        loadMore.addEventListener('click', (e) => {
+            e.preventDefault();
+            this.loadMorePoems();
+        });
+
+        if ('IntersectionObserver' in window) {
+            this.scrollObserver = new IntersectionObserver((entries) => {
+                if (entries.some(entry => entry.isIntersecting)) {
+                    this.loadMorePoems();
                 }
-            });
+            }, { rootMargin: this.config.infiniteScrollMargin });
+            this.scrollObserver.observe(loadMore);
         }
+    }
 
-        // Pulsante vai alla pagina
-        const goToPageBtn = document.getElementById('goToPageBtn');
-        if (goToPageBtn) {
-            goToPageBtn.addEventListener('click', () => {
-                this.goToSpecificPage();
+    /**
+     * Carica la pagina successiva (frammento HTML) e la accoda alle card
+     */
+    async loadMorePoems() {
+        if (this.isLoadingMore || !this.nextCursor || !this.elements.poemsContainer) return;
+        this.isLoadingMore = true;
+
+        const loadMore = this.elements.loadMore;
+        loadMore?.classList.add('disabled');
+        loadMore?.setAttribute('aria-disabled', 'true');
+
+        try {
+            const params = new URLSearchParams(window.location.search);
+            params.set('cursor', this.nextCursor);
+            params.set('fragment', '1');
+            const baseUrl = window.BACHECA_CONFIG?.baseUrl || window.location.pathname;
+            const response = await fetch(`${baseUrl}?${params.toString()}`, {
+                headers: { 'X-Requested-With': 'XMLHttpRequest' }
             });
+            if (!response.ok) throw new Error('HTTP ' + response.status);
+            const data = await response.json();
+
+            // HTML generato dal template del server (già con escape)
+            const template = document.createElement('template');
+            template.innerHTML = data.html || '';
+            const fragment = template.content;
+            if (typeof window.syncHeartLikeStatus === 'function') {
+                window.syncHeartLikeStatus(fragment);
+            }
+            // Cursore scartato dal server (es. ricerca ripiegata sul LIKE): è
+            // di nuovo la prima pagina, quindi sostituisce le card già mostrate
+            if (data.reset) {
+                this.elements.poemsContainer.replaceChildren();
+                if (Number.isFinite(data.total)) this.totalCount = data.total;
+            }
+            this.elements.poemsContainer.appendChild(fragment);
+
+            this.nextCursor = data.has_next ? data.next_cursor : null;
+            this.updateLoadMore();
+            this.updatePoemCount();
+            if (this.expandedState.isOpen) {
+                this.buildExpandedIds();
+                this.updateExpandedNavButtons();
+            }
+        } catch (error) {
+            console.error('Errore nel caricamento di altre poesie:', error);
+            this.showToast('error', 'Impossibile caricare altre poesie');
+            // Niente tentativi a raffica dall'observer: si riprova col pulsante
+            this.scrollObserver?.disconnect();
+        } finally {
+            this.isLoadingMore = false;
+            loadMore?.classList.remove('disabled');
+            loadMore?.removeAttribute('aria-disabled');
         }
     }
 
+    /**
+     * Aggiorna (o nasconde a fine elenco) il link "Carica altre"
+     */
+    updateLoadMore() {
+        const loadMore = this.elements.loadMore;
+        if (!loadMore) return;
+        if (!this.nextCursor) {
+            this.scrollObserver?.disconnect();
+            loadMore.remove();
+            this.elements.loadMore = null;
+            return;
+        }
+        const url = new URL(loadMore.href, window.location.href);
+        url.searchParams.set('cursor', this.nextCursor);
+        loadMore.href = url.toString();
+    }
+
     /**
      * Setup scorciatoie da tastiera
      */
@@ -336,15 +439,10 @@ class BachecaManager {
                 this.clearFilters();
             }
             
-            // Frecce per navigazione pagine
-            if (e.ctrlKey) {
-                if (e.key === 'ArrowLeft' && this.currentPage > 1) {
-                    e.preventDefault();
-                    this.goToPage(this.currentPage - 1);
-                } else if (e.key === 'ArrowRight' && this.currentPage < this.totalPages) {
-                    e.preventDefault();
-                    this.goToPage(this.currentPage + 1);
-                }
+            // Ctrl+freccia giù per caricare altre poesie
+            if (e.ctrlKey && e.key === 'ArrowDown' && this.nextCursor && !this.expandedState.isOpen) {
+                e.preventDefault();
+                this.loadMorePoems();
             }
 
             // Navigazione poesie dentro modal espansa (senza Ctrl)
@@ -431,11 +529,55 @@ class BachecaManager {
             this.elements.typeFilter.value = this.currentFilters.type;
         }
         if (this.elements.authorFilter) {
-            this.elements.authorFilter.value = this.currentFilters.author;
+            const author = this.currentFilters.author;
+            this.elements.authorFilter.value = author === 'all' ? '' : author;
         }
         // (solo valide) rimosso
     }
 
+    /**
+     * Carica da /api/authors gli autori che iniziano con prefix nel datalist del filtro
+     */
+    async loadAuthorSuggestions(prefix = '') {
+        const list = this.elements.authorOptions;
+        if (!list) return;
+
+        // Vale solo l'ultima richiesta
+        this.authorSuggestController?.abort();
+        const controller = new AbortController();
+        this.authorSuggestController = controller;
+
+        try {
+            const params = new URLSearchParams({
+                prefix: String(prefix || '').trim(),
+                limit: String(this.config.authorSuggestLimit)
+            });
+            const response = await fetch(`/api/authors?${params.toString()}`, { signal: controller.signal });
+            if (!response.ok) throw new Error('HTTP ' + response.status);
+            const data = await response.json();
+
+            const options = (data.authors || []).map((name) => {
+                const option = document.createElement('option');
+                option.value = name;
+                return option;
+            });
+            list.replaceChildren(...options);
+            this.authorSuggestionsLoaded = true;
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                console.warn('Suggerimenti autori non disponibili:', error);
+            }
+        }
+    }
+
+    /**
+     * True se value è uno degli autori suggeriti
+     */
+    isAuthorSuggestion(value) {
+        const list = this.elements.authorOptions;
+        return !!list && Array.from(list.options).some((option) => option.value === value);
+    }
+
     /**
      * Applica i filtri correnti
      */
@@ -465,8 +607,6 @@ class BachecaManager {
                 params.append('sort', this.currentSort);
             }
             
-            params.append('page', '1'); // Reset alla prima pagina
-            
             // Naviga alla nuova URL
             const newUrl = `${window.location.pathname}?${params.toString()}`;
             
@@ -474,8 +614,7 @@ class BachecaManager {
             history.pushState({
                 bacheca: true,
                 filters: this.currentFilters,
-                sort: this.currentSort,
-                page: 1
+                sort: this.currentSort
             }, '', newUrl);
             
             // Ricarica pagina con nuovi parametri
@@ -513,8 +652,7 @@ class BachecaManager {
         history.pushState({
             bacheca: true,
             filters: this.currentFilters,
-            sort: 'recent',
-            page: 1
+            sort: 'recent'
         }, '', window.location.pathname);
         
         window.location.href = window.location.pathname;
@@ -1241,44 +1379,7 @@ class BachecaManager {
         
         const params = new URLSearchParams(window.location.search);
         params.set('sort', sortBy);
-        params.set('page', '1'); // Reset alla prima pagina
-        
-        const newUrl = `${window.location.pathname}?${params.toString()}`;
-        
-        // Aggiorna history
-        history.pushState({
-            bacheca: true,
-            filters: this.currentFilters,
-            sort: sortBy,
-            page: 1
-        }, '', newUrl);
-        
-        window.location.href = newUrl;
-    }
-
-    /**
-     * Va a una pagina specifica
-     */
-    goToSpecificPage() {
-        if (!this.elements.goToPage) return;
-        
-        const pageNumber = parseInt(this.elements.goToPage.value);
-        
-        if (pageNumber >= 1 && pageNumber <= this.totalPages) {
-            this.goToPage(pageNumber);
-        } else {
-            this.showToast('error', 
-                `Numero pagina non valido. Inserisci un valore tra 1 e ${this.totalPages}`);
-            this.elements.goToPage.value = this.currentPage;
-        }
-    }
-
-    /**
-     * Naviga a una pagina
-     */
-    goToPage(pageNumber) {
-        const params = new URLSearchParams(window.location.search);
-        params.set('page', pageNumber);
+        params.delete('cursor'); // Un cursore vale solo per il suo ordinamento
         
         const newUrl = `${window.location.pathname}?${params.toString()}`;
         
@@ -1286,8 +1387,7 @@ class BachecaManager {
         history.pushState({
             bacheca: true,
             filters: this.currentFilters,
-            sort: this.currentSort,
-            page: pageNumber
+            sort: sortBy
         }, '', newUrl);
         
         window.location.href = newUrl;
@@ -1400,9 +1500,6 @@ class BachecaManager {
         if (state.sort) {
             this.currentSort = state.sort;
         }
-        if (state.page) {
-            this.currentPage = state.page;
-        }
         
         this.syncFiltersToUI();
     }
@@ -1413,7 +1510,7 @@ class BachecaManager {
     updateUI() {
         // Aggiorna contatori, stato, ecc.
         this.updatePoemCount();
-        this.setupCurrentPageIndicators();
+        this.updateLoadMore();
     }
 
     /**
@@ -1421,53 +1518,20 @@ class BachecaManager {
      */
     updatePoemCount() {
         if (this.elements.poemCount) {
+            // Totale dal server (memorizzato); in mancanza le card già caricate
             const visiblePoems = document.querySelectorAll('.poem-card-wrapper').length;
-            this.elements.poemCount.textContent = visiblePoems;
+            this.elements.poemCount.textContent = Number.isFinite(this.totalCount) ? this.totalCount : visiblePoems;
         }
     }
 
     /**
-     * Setup indicatori pagina corrente
-     */
-    setupCurrentPageIndicators() {
-        // Evidenzia pagina corrente nei controlli di paginazione
-        document.querySelectorAll('.bacheca-pagination .page-item').forEach(item => {
-            const link = item.querySelector('.page-link');
-            const pageNum = link ? parseInt(link.textContent.trim(), 10) : NaN;
-            if (Number.isFinite(pageNum) && pageNum === this.currentPage) {
-                item.classList.add('active');
-                item.setAttribute('aria-current', 'page');
-            } else {
-                item.classList.remove('active');
-                item.removeAttribute('aria-current');
-            }
-        });
-    }
-
-    /**
-     * Sincronizza lo stato paginazione dalla pagina corrente (URL/config/UI)
+     * Sincronizza lo stato del cursore dalla configurazione della pagina
      */
-    syncPaginationState() {
-        let pageFromUrl = null;
-        try {
-            const params = new URLSearchParams(window.location.search);
-            pageFromUrl = parseInt(params.get('page') || '', 10);
-        } catch (e) {
-            pageFromUrl = null;
-        }
-
-        const pageFromConfig = parseInt(window.BACHECA_CONFIG?.currentPage || '', 10);
-        const pageFromInput = parseInt(this.elements.goToPage?.value || '', 10);
-        const totalFromConfig = parseInt(window.BACHECA_CONFIG?.totalPages || '', 10);
-        const totalFromInputMax = parseInt(this.elements.goToPage?.max || '', 10);
-
-        const detectedPage = [pageFromUrl, pageFromConfig, pageFromInput]
-            .find((value) => Number.isFinite(value) && value > 0);
-        const detectedTotal = [totalFromConfig, totalFromInputMax]
-            .find((value) => Number.isFinite(value) && value > 0);
-
-        this.currentPage = detectedPage || 1;
-        this.totalPages = detectedTotal || 1;
+    syncCursorState() {
+        const config = window.BACHECA_CONFIG || {};
+        this.nextCursor = typeof config.nextCursor === 'string' && config.nextCursor ? config.nextCursor : null;
+        const total = parseInt(config.totalCount ?? '', 10);
+        this.totalCount = Number.isFinite(total) && total >= 0 ? total : null;
     }
 
     /**
@@ -1476,6 +1540,7 @@ class BachecaManager {
     destroy() {
         // Rimuovi event listeners se necessario
         clearTimeout(this.searchTimeout);
+        this.scrollObserver?.disconnect();
         
         // Pulisci cache
         this.elements = {};
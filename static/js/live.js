@@ -0,0 +1,222 @@
+/**
+ * @fileoverview Analisi live mentre si scrive: canale SSE + delta delle righe modificate
+ * @author Poetry Analyzer App
+ *
+ * Il client apre una volta /api/live (EventSource) e riceve l'id di sessione;
+ * a ogni pausa di scrittura invia a /api/live/<id> solo le righe cambiate.
+ * Il server risponde con i versi ricalcolati sullo stream (202) oppure
+ * direttamente nella risposta (200), ad esempio senza EventSource o se la
+ * richiesta arriva a un worker diverso da quello dello stream.
+ */
+
+const DEBOUNCE_MS = 250;
+
+const state = {
+    sessionId: null,
+    source: null,
+    sentLines: null,      // righe già note al server (null = serve un reset)
+    sentType: null,
+    sentTolerance: null,
+    lastVersion: 0,
+    verses: new Map(),    // indice di riga -> { verse, syllables, target, correct }
+    summary: null,
+    timer: null,
+    inFlight: false,
+    pending: false
+};
+
+let elements = null;
+
+/**
+ * Genera un id di sessione lato client (usato solo senza EventSource)
+ * @returns {string}
+ */
+function randomSessionId() {
+    const bytes = new Uint8Array(16);
+    (window.crypto || window.msCrypto).getRandomValues(bytes);
+    return Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+}
+
+/**
+ * Imposta una nuova sessione: il prossimo invio sarà un reset completo
+ * @param {string} sessionId
+ */
+function startSession(sessionId) {
+    state.sessionId = sessionId;
+    state.sentLines = null;
+    state.lastVersion = 0;
+    state.verses.clear();
+}
+
+/**
+ * Apre il canale SSE; in assenza di EventSource si lavora solo con le risposte POST
+ */
+function openStream() {
+    if (typeof window.EventSource !== 'function') {
+        startSession(randomSessionId());
+        return;
+    }
+    // Lo stream dura pochi secondi: EventSource si riconnette da solo e,
+    // tramite Last-Event-ID, il server riprende la stessa sessione
+    const source = new EventSource('/api/live');
+    source.addEventListener('ready', (ev) => {
+        try {
+            const { session } = JSON.parse(ev.data);
+            if (session === state.sessionId) return;
+            // Nuova sessione (riconnessione su un altro worker): reinvia il testo completo
+            startSession(session);
+            scheduleDelta(0);
+        } catch (e) {
+            console.warn('Live: evento ready non valido', e);
+        }
+    });
+    source.addEventListener('error', () => {
+        // Chiuso per errore (es. 503 con tutti gli stream occupati): solo risposte POST
+        if (source.readyState !== EventSource.CLOSED) return;
+        state.source = null;
+        if (!state.sessionId) {
+            startSession(randomSessionId());
+            scheduleDelta(0);
+        }
+    });
+    source.addEventListener('update', (ev) => {
+        try {
+            applyUpdate(JSON.parse(ev.data));
+        } catch (e) {
+            console.warn('Live: aggiornamento non valido', e);
+        }
+    });
+    state.source = source;
+}
+
+/**
+ * Programma l'invio del delta dopo una pausa di scrittura
+ * @param {number} delay
+ */
+function scheduleDelta(delay = DEBOUNCE_MS) {
+    clearTimeout(state.timer);
+    state.timer = setTimeout(sendDelta, delay);
+}
+
+/**
+ * Calcola e invia le righe modificate rispetto all'ultimo invio
+ */
+async function sendDelta() {
+    if (!elements || !state.sessionId) return;
+    if (state.inFlight) {
+        state.pending = true;
+        return;
+    }
+
+    const lines = (elements.poemText.value || '').split('\n');
+    const type = elements.poemTypeSelect?.value || '';
+    const useTolerance = document.getElementById('useTolerance')?.checked || false;
+
+    let body;
+    if (state.sentLines === null) {
+        body = { reset: true, lines, type, use_tolerance: useTolerance };
+    } else {
+        const changed = {};
+        lines.forEach((line, i) => {
+            if (state.sentLines[i] !== line) changed[i] = line;
+        });
+        const sameShape = lines.length === state.sentLines.length;
+        if (!Object.keys(changed).length && sameShape && type === state.sentType && useTolerance === state.sentTolerance) {
+            return;
+        }
+        body = { lines: changed, count: lines.length, type, use_tolerance: useTolerance };
+    }
+
+    state.inFlight = true;
+    try {
+        const response = await fetch(`/api/live/${encodeURIComponent(state.sessionId)}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest' },
+            body: JSON.stringify(body)
+        });
+        if (response.status === 409) {
+            // Sessione sconosciuta a questo worker: la ricrea (versioni da capo) con un reset
+            startSession(state.sessionId);
+            state.pending = true;
+            return;
+        }
+        if (!response.ok) {
+            // Input non valido o limite superato: la validazione classica resta attiva
+            state.sentLines = null;
+            renderLiveFeedback(null);
+            return;
+        }
+        state.sentLines = lines;
+        state.sentType = type;
+        state.sentTolerance = useTolerance;
+        if (response.status === 200) {
+            applyUpdate(await response.json());
+        }
+    } catch (e) {
+        // Offline o rete instabile: al prossimo input si riparte da un reset
+        state.sentLines = null;
+    } finally {
+        state.inFlight = false;
+        if (state.pending) {
+            state.pending = false;
+            scheduleDelta(0);
+        }
+    }
+}
+
+/**
+ * Integra un aggiornamento del server nel modello locale
+ * @param {Object} update - Payload di /api/live
+ */
+function applyUpdate(update) {
+    if (!update || update.error || update.version <= state.lastVersion) return;
+    state.lastVersion = update.version;
+
+    for (const line of Array.from(state.verses.keys())) {
+        if (line >= update.lines) state.verses.delete(line);
+    }
+    (update.cleared || []).forEach(line => state.verses.delete(line));
+    (update.verses || []).forEach(v => state.verses.set(v.line, v));
+
+    state.summary = update;
+    renderLiveFeedback(update);
+}
+
+/**
+ * Mostra un badge per verso (sillabe/target e lettera di rima)
+ * @param {Object|null} summary
+ */
+function renderLiveFeedback(summary) {
+    const container = document.getElementById('liveFeedback');
+    if (!container) return;
+    container.textContent = '';
+    if (!summary || !summary.verse_lines?.length) return;
+
+    summary.verse_lines.forEach((line, i) => {
+        const verse = state.verses.get(line);
+        if (!verse) return;
+        const badge = document.createElement('span');
+        const ok = verse.correct;
+        badge.className = `badge me-1 mb-1 ${ok ? 'bg-success' : 'bg-warning text-dark'}`;
+        const rhyme = summary.rhyme_scheme?.[i];
+        const target = verse.target ? `/${verse.target}` : '';
+        badge.textContent = `${i + 1}: ${verse.syllables}${target}${rhyme && rhyme !== '-' ? ` · ${rhyme}` : ''}`;
+        badge.title = `Verso ${i + 1}: ${verse.syllables} sillabe`;
+        container.appendChild(badge);
+    });
+}
+
+/**
+ * Avvia l'analisi live sul textarea dell'analizzatore
+ * @param {Object} els - { poemText, poemTypeSelect }
+ */
+export function initLiveAnalysis(els) {
+    if (!els?.poemText || typeof window.fetch !== 'function') return;
+    elements = els;
+    openStream();
+
+    els.poemText.addEventListener('input', () => scheduleDelta());
+    els.poemTypeSelect?.addEventListener('change', () => scheduleDelta(0));
+    document.getElementById('useTolerance')?.addEventListener('change', () => scheduleDelta(0));
+    window.addEventListener('pagehide', () => state.source?.close());
+}
@@ -17,6 +17,7 @@ import { validateCurrentInput, renderIssues, markAnalysisCompleted, attachValida
 export const APP_VERSION = '1.3.8';
 import { handlePublishToggle } from './publish.js?v=1.3.8';
 import { handleFormSubmit, showResults, handlePoemTextInput } from './form.js?v=1.3.8';
+import { initLiveAnalysis } from './live.js?v=1.3.8';
     console.log(`🚀 Inizializzazione app.js modulare v${APP_VERSION}`);
 
 console.log(`📚 Poetry Analyzer App - Versione modulare caricata (v${APP_VERSION})`);
@@ -141,6 +142,9 @@ function setupEventListeners(elements) {
         poemText.addEventListener('input', (e) => {
             handlePoemTextInput(e, poemTypeSelect);
         });
+
+        // Feedback live per verso (SSE + delta delle righe modificate)
+        initLiveAnalysis({ poemText, poemTypeSelect });
     }
     
     // Event listener per checkbox pubblicazione
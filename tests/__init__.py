@@ -0,0 +1,5 @@
+"""Test di regressione (python -m pytest -q oppure python -m unittest)"""
+import os
+
+# Database SQLite in memoria e niente rate limiting (config.app_config.TestingConfig)
+os.environ.setdefault('APP_CONFIG', 'testing')
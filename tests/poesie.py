@@ -0,0 +1,25 @@
+"""Richieste di esempio per /api/analyze e le sue varianti batch e stream"""
+
+HAIKU = "Vecchio stagno\nuna rana si tuffa\nrumore d'acqua"
+SONETTO_BREVE = ("Tanto gentile e tanto onesta pare\n"
+                 "la donna mia quand'ella altrui saluta,\n"
+                 "ch'ogne lingua devén tremando muta,\n"
+                 "e li occhi no l'ardiscon di guardare.")
+LIBERA = "M'illumino\nd'immenso"
+
+RICHIESTE = [
+    {'text': HAIKU},
+    {'text': HAIKU, 'type': 'haiku'},
+    {'text': HAIKU, 'type': 'Haiku ', 'use_tolerance': True},
+    {'text': HAIKU, 'type': 'sonetto'},
+    {'text': SONETTO_BREVE},
+    {'text': SONETTO_BREVE, 'type': 'quartina'},
+    {'text': LIBERA, 'type': 'versi_liberi'},
+    {'text': LIBERA + '\n\n\n' + HAIKU},
+    {'text': 'Verso unico, senza rima'},
+    {'text': ''},
+    {'text': '   \n  '},
+    {'text': '<b>grassetto</b>'},
+    {'text': 'a' * 2001},
+    {'type': 'haiku'},
+]
@@ -0,0 +1,69 @@
+"""Analisi e poi pubblicazione dello stesso testo: una sola analisi, voce in cache intatta"""
+import copy
+import unittest
+from unittest import mock
+
+import routes.api as api
+from app import app
+from models.poem import Poem, db
+from services import poetry_analyzer
+from services.poetry_analyzer import cache_analisi, chiave_analisi
+from tests.poesie import HAIKU, LIBERA
+
+
+class TestAnalisiPoiPubblicazione(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def setUp(self):
+        cache_analisi.clear()
+        api._indice_rime = None
+
+    def tearDown(self):
+        with app.app_context():
+            Poem.query.delete()
+            db.session.commit()
+
+    def analizza_e_pubblica(self, percorso, pubblicazione, testo, use_tolerance):
+        risposta = self.client.post('/api/analyze', json={'text': testo, 'use_tolerance': use_tolerance})
+        self.assertEqual(risposta.status_code, 200)
+        chiave = chiave_analisi(testo, use_tolerance)
+        voce = cache_analisi.get(chiave)
+        self.assertIsNotNone(voce)
+        prima = copy.deepcopy(voce)
+
+        with mock.patch.object(poetry_analyzer, 'analizza_poesia_completa',
+                               wraps=poetry_analyzer.analizza_poesia_completa) as analisi_completa:
+            hits = cache_analisi.stats()['hits']
+            risposta = self.client.post(percorso, json={**pubblicazione, 'use_tolerance': use_tolerance})
+        self.assertEqual(risposta.status_code, 200, risposta.get_data(as_text=True))
+        self.assertTrue(risposta.get_json()['success'])
+
+        self.assertEqual(analisi_completa.call_count, 0)
+        self.assertEqual(cache_analisi.stats()['hits'], hits + 1)
+        self.assertEqual(cache_analisi.get(chiave), prima)
+        return risposta.get_json()
+
+    def test_pubblica(self):
+        dati = self.analizza_e_pubblica(
+            '/api/pubblica', {'testo': HAIKU, 'autore': 'Basho', 'tipo': 'haiku'}, HAIKU, True)
+        with app.app_context():
+            poesia = db.session.get(Poem, dati['id'])
+            self.assertEqual((poesia.poem_type, poesia.verse_count), ('haiku', 3))
+
+    def test_poems(self):
+        self.analizza_e_pubblica(
+            '/api/poems', {'text': LIBERA, 'author': 'Ungaretti', 'poem_type': 'versi_liberi'}, LIBERA, False)
+
+    def test_spazi_diversi_stessa_voce(self):
+        testo = '  ' + HAIKU.replace('\n', '  \n\n') + '\n'
+        self.analizza_e_pubblica(
+            '/api/pubblica', {'testo': testo, 'autore': 'Basho', 'tipo': 'haiku'}, HAIKU, True)
+
+
+if __name__ == '__main__':
+    unittest.main()
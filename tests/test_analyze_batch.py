@@ -0,0 +1,85 @@
+"""/api/analyze/batch deve restituire, elemento per elemento, quello di /api/analyze"""
+import unittest
+from unittest import mock
+
+import routes.api as api
+from app import app
+from routes.api import MAX_BATCH_ANALISI
+from services.poetry_analyzer import analizza_poesie_batch, cache_analisi, cache_versi
+from tests.poesie import HAIKU, RICHIESTE
+
+
+class TestAnalisiBatch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = app.test_client()
+
+    def analisi_singola(self, richiesta):
+        risposta = self.client.post('/api/analyze', json=richiesta)
+        return {**risposta.get_json(), 'status': risposta.status_code}
+
+    def batch(self, corpo):
+        risposta = self.client.post('/api/analyze/batch', json=corpo)
+        self.assertEqual(risposta.status_code, 200, risposta.get_data(as_text=True))
+        return risposta.get_json()
+
+    def test_uguale_ad_analyze(self):
+        dati = self.batch(RICHIESTE)
+        self.assertFalse(dati['error'])
+        self.assertEqual(dati['count'], len(RICHIESTE))
+        for richiesta, risultato in zip(RICHIESTE, dati['results']):
+            with self.subTest(richiesta=richiesta):
+                self.assertEqual(risultato, self.analisi_singola(richiesta))
+
+    def test_forma_con_items(self):
+        self.assertEqual(self.batch({'items': RICHIESTE})['results'], self.batch(RICHIESTE)['results'])
+
+    def test_duplicati_analizzati_una_volta(self):
+        richieste = [{'text': HAIKU}, {'text': HAIKU, 'type': ''}, {'text': HAIKU, 'type': 'haiku'},
+                     {'text': HAIKU}]
+        dati = self.batch(richieste)
+        self.assertEqual((dati['count'], dati['unique']), (4, 2))
+        for richiesta, risultato in zip(richieste, dati['results']):
+            self.assertEqual(risultato, self.analisi_singola(richiesta))
+
+    def test_elementi_non_validi(self):
+        dati = self.batch([HAIKU, None, {'text': HAIKU}])
+        self.assertEqual([r['status'] for r in dati['results']], [400, 400, 200])
+        self.assertTrue(dati['results'][0]['error'])
+        self.assertFalse(dati['results'][2]['error'])
+
+    def test_corpo_non_valido(self):
+        for corpo in ([], {}, {'items': 'testo'}, 'testo'):
+            with self.subTest(corpo=corpo):
+                self.assertEqual(self.client.post('/api/analyze/batch', json=corpo).status_code, 400)
+
+    def test_senza_cache_analisi(self):
+        cache_analisi.clear()
+        cache_versi.clear()
+        prima = cache_analisi.stats()
+        self.batch(RICHIESTE)
+        dopo = cache_analisi.stats()
+        self.assertEqual((dopo['hits'], dopo['misses'], dopo['size']), (prima['hits'], prima['misses'], 0))
+        self.assertEqual(len(cache_versi), 0)
+
+    def test_errore_confinato(self):
+        def batch_finto(testi, use_tolerance=False):
+            if any('rana' in testo for testo in testi):
+                raise ValueError('guasto')
+            return analizza_poesie_batch(testi, use_tolerance)
+
+        with mock.patch.object(api, 'analizza_poesie_batch', side_effect=batch_finto):
+            dati = self.batch([{'text': HAIKU}, {'text': 'Verso unico, senza rima'}])
+        self.assertEqual([r['status'] for r in dati['results']], [500, 200])
+        self.assertIn('guasto', dati['results'][0]['message'])
+        self.assertEqual(dati['results'][1], self.analisi_singola({'text': 'Verso unico, senza rima'}))
+
+    def test_troppe_poesie(self):
+        risposta = self.client.post('/api/analyze/batch', json=[{'text': HAIKU}] * (MAX_BATCH_ANALISI + 1))
+        self.assertEqual(risposta.status_code, 413)
+        self.assertEqual(risposta.get_json()['error_type'], 'too_many_items')
+
+
+if __name__ == '__main__':
+    unittest.main()
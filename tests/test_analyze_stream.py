@@ -0,0 +1,87 @@
+"""/api/analyze/stream deve restituire, riga per riga, quello di /api/analyze"""
+import json
+import unittest
+
+from app import app
+from routes.api import MAX_BYTES_RIGA_STREAM
+from services.poetry_analyzer import cache_analisi, cache_versi
+from tests.poesie import HAIKU, LIBERA, RICHIESTE, SONETTO_BREVE
+
+
+class TestAnalisiStream(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = app.test_client()
+
+    def analisi_singola(self, richiesta):
+        risposta = self.client.post('/api/analyze', json=richiesta)
+        return {**risposta.get_json(), 'status': risposta.status_code}
+
+    def stream(self, corpo, content_type='application/x-ndjson', query=''):
+        risposta = self.client.post('/api/analyze/stream' + query, data=corpo.encode('utf-8'),
+                                    content_type=content_type)
+        self.assertEqual(risposta.status_code, 200)
+        self.assertEqual(risposta.mimetype, 'application/x-ndjson')
+        righe = [json.loads(riga) for riga in risposta.get_data(as_text=True).splitlines()]
+        self.assertEqual([r.pop('index') for r in righe], list(range(len(righe))))
+        return righe
+
+    def test_ndjson_uguale_ad_analyze(self):
+        corpo = '\n'.join(json.dumps(r, ensure_ascii=False) for r in RICHIESTE) + '\n'
+        righe = self.stream(corpo)
+        self.assertEqual(len(righe), len(RICHIESTE))
+        for richiesta, riga in zip(RICHIESTE, righe):
+            with self.subTest(richiesta=richiesta):
+                self.assertEqual(riga, self.analisi_singola(richiesta))
+
+    def test_ndjson_stringhe_e_righe_vuote(self):
+        righe = self.stream(f'\n{json.dumps(HAIKU)}\r\n\n{json.dumps(LIBERA)}')
+        self.assertEqual(righe, [self.analisi_singola({'text': HAIKU}),
+                                 self.analisi_singola({'text': LIBERA})])
+
+    def test_ndjson_righe_non_valide(self):
+        corpo = '\n'.join(['{non json', '42', json.dumps({'text': HAIKU}),
+                           json.dumps({'text': 'x' * MAX_BYTES_RIGA_STREAM}), json.dumps(LIBERA)])
+        righe = self.stream(corpo)
+        self.assertEqual([r['status'] for r in righe], [400, 400, 200, 400, 200])
+        self.assertEqual(righe[0]['error_type'], 'invalid_json')
+        self.assertEqual(righe[3]['error_type'], 'too_long')
+        self.assertEqual(righe[2], self.analisi_singola({'text': HAIKU}))
+
+    def test_testo_uguale_ad_analyze(self):
+        poesie = [HAIKU, SONETTO_BREVE, LIBERA]
+        corpo = '\n\n'.join(poesie) + '\n\n\n'
+        for query, opzioni in [('', {}),
+                               ('?type=haiku', {'type': 'haiku'}),
+                               ('?type=haiku&use_tolerance=true', {'type': 'haiku', 'use_tolerance': True})]:
+            with self.subTest(query=query):
+                righe = self.stream(corpo, 'text/plain', query)
+                self.assertEqual(righe, [self.analisi_singola({**opzioni, 'text': p}) for p in poesie])
+
+    def test_testo_lunghezza_massima(self):
+        # Il limite è sul testo unito da '\n', come per /api/analyze
+        for lunghezza in (2000, 2001):
+            with self.subTest(lunghezza=lunghezza):
+                testo = '\n'.join(['a' * 99] * 19 + ['b' * (lunghezza - 1900)])
+                self.assertEqual(len(testo), lunghezza)
+                righe = self.stream(testo + '\n\n' + HAIKU, 'text/plain')
+                self.assertEqual(righe, [self.analisi_singola({'text': testo}),
+                                         self.analisi_singola({'text': HAIKU})])
+
+    def test_senza_cache_analisi(self):
+        cache_analisi.clear()
+        cache_versi.clear()
+        prima = cache_analisi.stats()
+        self.stream('\n\n'.join([HAIKU, SONETTO_BREVE, LIBERA]), content_type='text/plain')
+        dopo = cache_analisi.stats()
+        self.assertEqual((dopo['hits'], dopo['misses'], dopo['size']), (prima['hits'], prima['misses'], 0))
+        self.assertEqual(len(cache_versi), 0)
+
+    def test_formato_non_supportato(self):
+        risposta = self.client.post('/api/analyze/stream?format=csv', data=HAIKU)
+        self.assertEqual(risposta.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
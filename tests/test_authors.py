@@ -0,0 +1,127 @@
+"""Autori della bacheca (services.authors): IndiceAutori, /api/authors e filtro per autore"""
+import unittest
+
+import routes.api as api
+from app import app
+from models.poem import Poem, db
+from services import authors
+from services.authors import IndiceAutori, MAX_AUTORI_SUGGERITI, invalida_indice_autori
+from services.pagination import invalida_totali_bacheca
+from tests.poesie import HAIKU
+
+AUTORI = ['Dante Alighieri', 'Alda Merini', 'Giacomo Leopardi', 'Eugenio Montale',
+          'Alessandro Manzoni', 'Umberto Saba', 'Saba', '100% Anonimo']
+
+
+class TestIndiceAutori(unittest.TestCase):
+
+    def setUp(self):
+        self.indice = IndiceAutori(AUTORI + ['Alda Merini'])
+
+    def test_senza_prefisso(self):
+        self.assertEqual(len(self.indice), len(AUTORI))
+        self.assertEqual(self.indice.cerca(''), sorted(AUTORI, key=str.casefold))
+        self.assertEqual(self.indice.cerca('  ', limit=2), ['100% Anonimo', 'Alda Merini'])
+
+    def test_prefisso_del_nome(self):
+        self.assertEqual(self.indice.cerca('dan'), ['Dante Alighieri'])
+        self.assertEqual(self.indice.cerca('DANTE A'), ['Dante Alighieri'])
+
+    def test_prefisso_di_una_parola(self):
+        # Prima chi inizia con il prefisso, poi le altre parole, in ordine alfabetico
+        self.assertEqual(self.indice.cerca('al'), ['Alda Merini', 'Alessandro Manzoni', 'Dante Alighieri'])
+        self.assertEqual(self.indice.cerca('saba'), ['Saba', 'Umberto Saba'])
+        self.assertEqual(self.indice.cerca('mon'), ['Eugenio Montale'])
+
+    def test_non_a_metà_parola(self):
+        self.assertEqual(self.indice.cerca('ghieri'), [])
+        self.assertEqual(self.indice.cerca('xyz'), [])
+
+    def test_limite(self):
+        self.assertEqual(self.indice.cerca('al', limit=1), ['Alda Merini'])
+
+
+class TestApiAutori(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def setUp(self):
+        api._indice_rime = None
+        with app.app_context():
+            for autore in AUTORI + ['Alda Merini', '']:
+                db.session.add(Poem(title='Titolo', content='verso', author=autore,
+                                    verse_count=1, syllable_counts='2'))
+            db.session.commit()
+        invalida_indice_autori()
+        invalida_totali_bacheca()
+
+    def tearDown(self):
+        with app.app_context():
+            Poem.query.delete()
+            db.session.commit()
+        invalida_indice_autori()
+        invalida_totali_bacheca()
+
+    def autori(self, **parametri):
+        risposta = self.client.get('/api/authors', query_string=parametri)
+        self.assertEqual(risposta.status_code, 200)
+        dati = risposta.get_json()
+        self.assertFalse(dati['error'])
+        return dati['authors']
+
+    def test_prefisso_e_parole_interne(self):
+        self.assertEqual(self.autori(prefix='alda'), ['Alda Merini'])
+        self.assertEqual(self.autori(prefix='ali'), ['Dante Alighieri'])
+        self.assertEqual(self.autori(prefix=' al '), ['Alda Merini', 'Alessandro Manzoni', 'Dante Alighieri'])
+        self.assertEqual(self.autori(prefix='100%'), ['100% Anonimo'])
+        self.assertEqual(self.autori(prefix='ghieri'), [])
+
+    def test_senza_prefisso_e_limite(self):
+        tutti = self.autori()
+        self.assertEqual(tutti, sorted(AUTORI, key=str.casefold))
+        self.assertNotIn('', tutti)
+        self.assertEqual(self.autori(limit=2), tutti[:2])
+        self.assertEqual(len(self.autori(limit=0)), 1)
+        self.assertEqual(len(self.autori(limit=10**6)), min(len(AUTORI), MAX_AUTORI_SUGGERITI))
+
+    def test_prefisso_troppo_lungo(self):
+        risposta = self.client.get('/api/authors', query_string={'prefix': 'a' * 101})
+        self.assertEqual(risposta.status_code, 400)
+
+    def test_pubblicazione_invalida_l_indice(self):
+        self.assertEqual(self.autori(prefix='zan'), [])
+        risposta = self.client.post('/api/pubblica', json={
+            'testo': HAIKU, 'autore': 'Andrea Zanzotto', 'tipo': 'haiku', 'use_tolerance': True,
+        })
+        self.assertTrue(risposta.get_json()['success'], risposta.get_data(as_text=True))
+        self.assertEqual(self.autori(prefix='zan'), ['Andrea Zanzotto'])
+        self.assertEqual(self.autori(prefix='andrea'), ['Andrea Zanzotto'])
+
+    def test_senza_invalidazione_resta_indietro(self):
+        self.assertEqual(self.autori(prefix='zan'), [])
+        with app.app_context():
+            db.session.add(Poem(title='Titolo', content='verso', author='Andrea Zanzotto',
+                                verse_count=1, syllable_counts='2'))
+            db.session.commit()
+        # Un altro worker: l'indice in memoria lo vede solo dopo INTERVALLO_SYNC_AUTORI
+        self.assertEqual(self.autori(prefix='zan'), [])
+        authors._indice_autori_sync -= authors.INTERVALLO_SYNC_AUTORI + 1
+        self.assertEqual(self.autori(prefix='zan'), ['Andrea Zanzotto'])
+
+    def test_filtro_bacheca_per_sottostringa(self):
+        def filtrati(autore):
+            dati = self.client.get('/api/bacheca', query_string={'autore': autore, 'per_page': 50}).get_json()
+            return sorted({p['author'] for p in dati['poesie']})
+
+        self.assertEqual(filtrati('ghieri'), ['Dante Alighieri'])
+        self.assertEqual(filtrati('SABA'), ['Saba', 'Umberto Saba'])
+        self.assertEqual(filtrati('0%'), ['100% Anonimo'])
+        self.assertEqual(filtrati('_'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Frammenti di /bacheca per lo scroll infinito: cursore scartato -> reset delle card"""
+import re
+import unittest
+from unittest import mock
+
+from sqlalchemy.exc import OperationalError
+
+import routes.web as web
+from app import app
+from models.poem import Poem, db
+from services import full_text
+from services.pagination import invalida_totali_bacheca, pagina_keyset
+
+NUM_POESIE = 30
+PER_PAGE = 12
+
+
+def pagina_senza_full_text(query, ordinamento, cursore, per_page, punteggio=None):
+    """pagina_keyset con l'indice full-text rotto (es. tabella FTS mancante)"""
+    if punteggio is not None:
+        raise OperationalError('SELECT ...', {}, Exception('no such table: poems_fts'))
+    return pagina_keyset(query, ordinamento, cursore, per_page, punteggio)
+
+
+class TestFrammentiBacheca(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def setUp(self):
+        with app.app_context():
+            for i in range(NUM_POESIE):
+                db.session.add(Poem(title=f'Marina {i}', content=f'onde del mare {i}', author='Autore',
+                                    verse_count=1, syllable_counts='5'))
+            db.session.commit()
+        invalida_totali_bacheca()
+
+    def tearDown(self):
+        with app.app_context():
+            Poem.query.delete()
+            db.session.commit()
+        invalida_totali_bacheca()
+        full_text._stato_indice.update(disponibile=None, verificato=0.0)
+
+    def frammento(self, **parametri):
+        risposta = self.client.get('/bacheca', query_string={'search': 'mare', 'fragment': '1', **parametri})
+        self.assertEqual(risposta.status_code, 200)
+        return risposta.get_json()
+
+    def id_card(self, dati):
+        return re.findall(r'data-poem-id="(\d+)"', dati['html'])
+
+    def test_pagine_successive_senza_reset(self):
+        prima = self.frammento()
+        seconda = self.frammento(cursor=prima['next_cursor'])
+        self.assertEqual((prima['count'], seconda['count']), (PER_PAGE, PER_PAGE))
+        self.assertNotIn('reset', seconda)
+        self.assertFalse(set(self.id_card(prima)) & set(self.id_card(seconda)))
+
+    def test_ripiego_sul_like_durante_lo_scorrimento(self):
+        prima = self.frammento()
+        with mock.patch.object(web, 'pagina_keyset', side_effect=pagina_senza_full_text), \
+                mock.patch('builtins.print'):
+            dati = self.frammento(cursor=prima['next_cursor'])
+        self.assertFalse(full_text.indice_disponibile())
+        self.assertTrue(dati['reset'])
+        self.assertEqual((dati['count'], dati['total']), (PER_PAGE, NUM_POESIE))
+        self.assertTrue(dati['has_next'])
+
+        # Il cursore restituito è del LIKE: lo scorrimento prosegue senza duplicati
+        seconda = self.frammento(cursor=dati['next_cursor'])
+        self.assertNotIn('reset', seconda)
+        self.assertFalse(set(self.id_card(dati)) & set(self.id_card(seconda)))
+
+    def test_cursore_non_valido(self):
+        with mock.patch('builtins.print'):
+            dati = self.frammento(cursor='non-un-cursore')
+        self.assertTrue(dati['reset'])
+        self.assertEqual((dati['count'], dati['total']), (PER_PAGE, NUM_POESIE))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+"""Cache LRU in-process e coalescenza delle chiamate (utils.cache)"""
+import threading
+import time
+import unittest
+from unittest import mock
+
+from config.constants import ECCEZIONI
+from services import syllable_analyzer
+from services.syllable_analyzer import aggiorna_eccezioni, conta_sillabe_singola, registra_cache_dipendente
+from utils.cache import LRUCache, SingleFlight
+
+
+class OrologioFinto:
+    """time.monotonic controllato dal test"""
+
+    def __init__(self):
+        self.adesso = 1000.0
+
+    def __call__(self):
+        return self.adesso
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_ordine_di_eviction(self):
+        cache = LRUCache(3)
+        for chiave in 'abc':
+            cache.set(chiave, chiave.upper())
+        self.assertEqual(cache.get('a'), 'A')   # 'a' diventa la più recente
+        cache.set('d', 'D')                      # esce 'b', la meno recente
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual([cache.get(k) for k in 'acd'], ['A', 'C', 'D'])
+        cache.set('c', 'C2')                     # aggiornare rinfresca la voce
+        cache.set('e', 'E')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.get('c'), cache.get('e')), ('C2', 'E'))
+        self.assertEqual(cache.evictions, 2)
+        self.assertEqual(len(cache), 3)
+
+    def test_default_e_valori_falsi(self):
+        cache = LRUCache(2)
+        cache.set('zero', 0)
+        cache.set('nessuno', None)
+        self.assertEqual(cache.get('zero', 5), 0)
+        self.assertEqual(cache.get('assente', 5), 5)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_scadenza(self):
+        orologio = OrologioFinto()
+        with mock.patch('utils.cache.time.monotonic', orologio):
+            cache = LRUCache(10, ttl=5)
+            cache.set('a', 1)
+            orologio.adesso += 4.9
+            self.assertEqual(cache.get('a'), 1)
+            cache.set('b', 2)
+            orologio.adesso += 0.1
+            # 'a' scade a 5 s dall'inserimento: conta come miss ed è rimossa
+            self.assertIsNone(cache.get('a'))
+            self.assertEqual(cache.get('b'), 2)
+            self.assertEqual((cache.hits, cache.misses, cache.expirations), (2, 1, 1))
+            self.assertEqual(len(cache), 1)
+            orologio.adesso += 10
+            self.assertEqual(cache.get('b', 'scaduta'), 'scaduta')
+            self.assertEqual(cache.expirations, 2)
+
+    def test_maxsize_zero(self):
+        cache = LRUCache(0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats()['misses'], 1)
+        self.assertEqual(LRUCache(-5).maxsize, 0)
+
+    def test_resize_e_clear(self):
+        cache = LRUCache(4)
+        for i in range(4):
+            cache.set(i, i)
+        cache.get(0)
+        cache.resize(2)
+        self.assertEqual([cache.get(i) for i in range(4)], [0, None, None, 3])
+        self.assertEqual(cache.evictions, 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        # I contatori sopravvivono a clear
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    def test_statistiche(self):
+        cache = LRUCache(1, ttl=60)
+        self.assertEqual(cache.stats(), {
+            'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+            'size': 0, 'maxsize': 1, 'ttl': 60.0, 'hit_rate': 0.0,
+        })
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+        cache.get('a')
+        cache.set('b', 2)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['size']), (2, 1, 1, 1))
+        self.assertEqual(stats['hit_rate'], round(2 / 3, 4))
+        self.assertIsNone(LRUCache(1).stats()['ttl'])
+
+
+class TestInvalidazione(unittest.TestCase):
+
+    def setUp(self):
+        self.dipendente = LRUCache(10)
+        registra_cache_dipendente(self.dipendente)
+        self.addCleanup(syllable_analyzer._cache_dipendenti.remove, self.dipendente)
+
+    def test_aggiorna_eccezioni_svuota_le_cache(self):
+        parola = 'sillabazione'
+        originale = conta_sillabe_singola(parola)
+        self.dipendente.set('verso', 'analisi')
+
+        def ripristina():
+            ECCEZIONI.pop(parola, None)
+            syllable_analyzer.invalida_cache_sillabe()
+        self.addCleanup(ripristina)
+
+        aggiorna_eccezioni({' Sillabazione ': originale + 3})
+        self.assertEqual(len(self.dipendente), 0)
+        self.assertEqual(len(syllable_analyzer.cache_sillabe), 0)
+        # Il conteggio in cache non maschera la nuova eccezione
+        self.assertEqual(conta_sillabe_singola(parola), originale + 3)
+
+
+class TestSingleFlight(unittest.TestCase):
+    NUM_THREAD = 8
+
+    def chiama_in_parallelo(self, voli, funzione, chiave='k'):
+        """NUM_THREAD chiamate concorrenti; la funzione termina solo quando
+        tutti i thread sono in attesa sulla stessa chiamata"""
+        via = threading.Event()
+        esecuzioni = []
+
+        def lenta():
+            esecuzioni.append(threading.get_ident())
+            self.assertTrue(via.wait(5))
+            return funzione()
+
+        esiti = [None] * self.NUM_THREAD
+
+        def lavora(i):
+            try:
+                esiti[i] = ('ok', voli.do(chiave, lenta))
+            except Exception as e:
+                esiti[i] = ('errore', e)
+
+        thread = [threading.Thread(target=lavora, args=(i,)) for i in range(self.NUM_THREAD)]
+        for t in thread:
+            t.start()
+        scadenza = time.monotonic() + 5
+        while voli.stats()['coalesced'] < self.NUM_THREAD - 1 and time.monotonic() < scadenza:
+            time.sleep(0.001)
+        self.assertEqual(voli.stats()['in_flight'], 1)
+        via.set()
+        for t in thread:
+            t.join(5)
+        return esiti, esecuzioni
+
+    def test_una_sola_esecuzione(self):
+        voli = SingleFlight()
+        risultato = {'valore': 42}
+        esiti, esecuzioni = self.chiama_in_parallelo(voli, lambda: risultato)
+        self.assertEqual(len(esecuzioni), 1)
+        self.assertTrue(all(tipo == 'ok' and valore is risultato for tipo, valore in esiti))
+        self.assertEqual(voli.stats(), {'executions': 1, 'coalesced': self.NUM_THREAD - 1, 'in_flight': 0})
+
+    def test_eccezione_condivisa(self):
+        voli = SingleFlight()
+        errore = RuntimeError('analisi fallita')
+
+        def fallisce():
+            raise errore
+
+        esiti, esecuzioni = self.chiama_in_parallelo(voli, fallisce)
+        self.assertEqual(len(esecuzioni), 1)
+        self.assertTrue(all(tipo == 'errore' and e is errore for tipo, e in esiti))
+        # La chiave è libera: la chiamata successiva esegue di nuovo
+        self.assertEqual(voli.do('k', lambda: 'ancora'), 'ancora')
+        self.assertEqual(voli.stats()['executions'], 2)
+
+    def test_chiavi_diverse_non_coalescono(self):
+        voli = SingleFlight()
+        self.assertEqual([voli.do(i, lambda i=i: i * 2) for i in range(3)], [0, 2, 4])
+        self.assertEqual(voli.do(0, lambda: 'nuovo'), 'nuovo')
+        self.assertEqual(voli.stats(), {'executions': 4, 'coalesced': 0, 'in_flight': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
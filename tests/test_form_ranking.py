@@ -0,0 +1,86 @@
+"""Classifica delle forme più vicine (services.form_ranking) e campo closest_forms di /api/analyze"""
+import unittest
+from unittest import mock
+
+from app import app
+from services import form_ranking
+from services.form_ranking import classifica_forme
+from services.poetry_analyzer import cache_analisi
+from tests.poesie import HAIKU, SONETTO_BREVE
+
+CAMPI = {'tipo', 'punteggio', 'distanza_sillabe', 'differenza_versi', 'errori_rima',
+         'tolleranza_minima', 'rispetta_metrica'}
+
+
+class TestClassificaForme(unittest.TestCase):
+
+    def test_haiku_esatto(self):
+        forme = classifica_forme([5, 7, 5], 'ABC')
+        self.assertEqual([f['tipo'] for f in forme], ['haiku', 'katauta', 'stornello'])
+        self.assertEqual(forme[0], {
+            'tipo': 'haiku', 'punteggio': 0, 'distanza_sillabe': 0, 'differenza_versi': 0,
+            'errori_rima': 0, 'tolleranza_minima': 0, 'rispetta_metrica': True,
+        })
+
+    def test_ordinata_per_punteggio(self):
+        forme = classifica_forme([11] * 4, 'ABBA', top_k=10)
+        self.assertEqual(len(forme), 10)
+        punteggi = [f['punteggio'] for f in forme]
+        self.assertEqual(punteggi, sorted(punteggi))
+
+    def test_versi_diversi(self):
+        forme = classifica_forme([5, 7, 5], 'ABC', top_k=len(form_ranking._NOMI))
+        for forma in forme:
+            if forma['differenza_versi']:
+                self.assertIsNone(forma['tolleranza_minima'])
+                self.assertFalse(forma['rispetta_metrica'])
+
+    def test_python_uguale_a_numpy(self):
+        if not form_ranking.NUMPY_AVAILABLE:
+            self.skipTest('NumPy non installato')
+        for sillabe in ([], [5, 7, 5], [11] * 14, [7] * 30):
+            with self.subTest(sillabe=sillabe):
+                self.assertEqual(form_ranking._distanze_numpy(sillabe), form_ranking._distanze_python(sillabe))
+
+
+class TestClosestFormsApi(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = app.test_client()
+
+    def setUp(self):
+        cache_analisi.clear()
+
+    def analizza(self, **richiesta):
+        risposta = self.client.post('/api/analyze', json=richiesta)
+        self.assertEqual(risposta.status_code, 200)
+        return risposta.get_json()
+
+    def test_forma_risposta(self):
+        forme = self.analizza(text=HAIKU)['closest_forms']
+        self.assertEqual([f['tipo'] for f in forme], ['haiku', 'katauta', 'stornello'])
+        for forma in forme:
+            self.assertEqual(set(forma), CAMPI)
+        self.assertEqual(forme[0]['tolleranza_minima'], 1)
+        self.assertFalse(forme[0]['rispetta_metrica'])
+
+    def test_tolleranza(self):
+        forme = self.analizza(text=HAIKU, use_tolerance=True)['closest_forms']
+        self.assertEqual(forme[0]['tipo'], 'haiku')
+        self.assertTrue(forme[0]['rispetta_metrica'])
+
+    def test_quartina(self):
+        forme = self.analizza(text=SONETTO_BREVE)['closest_forms']
+        self.assertEqual([f['tipo'] for f in forme], ['quartina', 'terzina_dantesca', 'clerihew'])
+
+    def test_calcolata_una_volta(self):
+        with mock.patch.object(form_ranking, 'classifica_forme', wraps=classifica_forme) as classifica:
+            prima = self.analizza(text=HAIKU)['closest_forms']
+            seconda = self.analizza(text=HAIKU, type='haiku')['closest_forms']
+        self.assertEqual(classifica.call_count, 1)
+        self.assertEqual(prima, seconda)
+
+
+if __name__ == '__main__':
+    unittest.main()
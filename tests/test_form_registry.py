@@ -0,0 +1,417 @@
+"""Il registro compilato delle forme (services.form_registry) deve dare gli
+stessi risultati del codice che leggeva SCHEMI_POESIA a ogni chiamata"""
+import json
+import random
+import unittest
+
+from config.constants import SCHEMI_POESIA
+from routes.api import (
+    convert_rhyme_scheme_to_frontend, get_expected_rhyme_scheme, get_syllable_pattern, get_target_sillabe,
+)
+from services.poetry_analyzer import (
+    analizza_poesia_completa, get_dettagli_metrica, identifica_tipo_poesia, verifica_metrica,
+)
+from tests.poesie import RICHIESTE
+
+# --- Implementazione precedente (prima del registro), come riferimento ---
+
+def identifica_tipo_storico(num_versi, sillabe_per_verso, schema_rime, use_tolerance=False):
+    """Identifica il tipo di poesia basandosi su versi, sillabe e rime"""
+
+    # Haiku: 3 versi, schema 5-7-5 sillabe (tolleranza ±1 se abilitata)
+    if num_versi == 3 and len(sillabe_per_verso) == 3:
+        tolerance = 1 if use_tolerance else 0
+        if (abs(sillabe_per_verso[0] - 5) <= tolerance and
+            abs(sillabe_per_verso[1] - 7) <= tolerance and
+            abs(sillabe_per_verso[2] - 5) <= tolerance):
+            return 'haiku'
+
+    # Tanka: 5 versi, schema 5-7-5-7-7 sillabe (tolleranza ±1 se abilitata)
+    if num_versi == 5 and len(sillabe_per_verso) == 5:
+        target = [5, 7, 5, 7, 7]
+        tolerance = 1 if use_tolerance else 0
+        if all(abs(sillabe_per_verso[i] - target[i]) <= tolerance for i in range(5)):
+            return 'tanka'
+
+    # Cinquain: 5 versi, schema 2-4-6-8-2 (nessuna rima specifica)
+    if num_versi == 5 and len(sillabe_per_verso) == 5:
+        target = [2, 4, 6, 8, 2]
+        tolerance = 1 if use_tolerance else 0
+        if all(abs(sillabe_per_verso[i] - target[i]) <= tolerance for i in range(5)):
+            return 'cinquain'
+
+    # Limerick: 5 versi, schema AABBA
+    if num_versi == 5 and schema_rime == 'AABBA':
+        return 'limerick'
+
+    # Stornello: 3 versi [5,11,11] con rima ABA
+    if num_versi == 3 and len(sillabe_per_verso) == 3 and schema_rime == 'ABA':
+        tol_first = 1 if use_tolerance else 0
+        tol_ende = 2 if use_tolerance else 0
+        if (abs(sillabe_per_verso[0] - 5) <= tol_first and
+            abs(sillabe_per_verso[1] - 11) <= tol_ende and
+            abs(sillabe_per_verso[2] - 11) <= tol_ende):
+            return 'stornello'
+
+    # Ballad: 4 versi [8,6,8,6] con rima ABCB
+    if num_versi == 4 and len(sillabe_per_verso) == 4 and schema_rime == 'ABCB':
+        target = [8, 6, 8, 6]
+        tolerance = 1 if use_tolerance else 0
+        if all(abs(sillabe_per_verso[i] - target[i]) <= tolerance for i in range(4)):
+            return 'ballad'
+
+    # Clerihew: 4 versi ~8 sillabe ciascuno con rima AABB
+    if num_versi == 4 and len(sillabe_per_verso) == 4 and schema_rime == 'AABB':
+        target = [8, 8, 8, 8]
+        tolerance = 2 if use_tolerance else 0
+        if all(abs(sillabe_per_verso[i] - target[i]) <= tolerance for i in range(4)):
+            return 'clerihew'
+
+    # Quartina - riconosce anche con tolleranza sulle sillabe se abilitata
+    if num_versi == 4:
+        # Controlla se ha sillabe simili agli endecasillabi (tolleranza opzionale)
+        tolerance = 2 if use_tolerance else 0
+        if all(abs(s - 11) <= tolerance for s in sillabe_per_verso):
+            if schema_rime == 'AABB':
+                return 'quartina'  # Usa il tipo base per compatibilità
+            elif schema_rime == 'ABAB':
+                return 'quartina'  # Usa il tipo base per compatibilità
+            elif schema_rime == 'ABBA':
+                return 'quartina'  # Usa il tipo base per compatibilità
+            else:
+                return 'quartina'  # Comunque una quartina
+        else:
+            # Se le sillabe sono molto diverse, potrebbe essere verso libero
+            return 'versi_liberi'  # Usa nome compatibile con SCHEMI_POESIA
+
+    # Ottava rima: 8 versi endecasillabi con schema ABABABCC
+    if num_versi == 8 and len(sillabe_per_verso) == 8 and schema_rime == 'ABABABCC':
+        tolerance = 2 if use_tolerance else 0
+        if all(abs(s - 11) <= tolerance for s in sillabe_per_verso):
+            return 'ottava_rima'
+
+    # Terzina - riconosce anche con tolleranza sulle sillabe se abilitata
+    if num_versi == 3:
+        # Controlla se ha sillabe simili agli endecasillabi (tolleranza opzionale)
+        tolerance = 2 if use_tolerance else 0
+        if all(abs(s - 11) <= tolerance for s in sillabe_per_verso):
+            return 'terzina_dantesca'  # Usa nome compatibile
+        else:
+            return 'versi_liberi'  # Usa nome compatibile con SCHEMI_POESIA
+
+    # Sonetto: 14 versi con schema specifico e sillabe vicine a 11 (tolleranza opzionale)
+    if num_versi == 14:
+        tolerance = 2 if use_tolerance else 1
+        within = sum(1 for s in sillabe_per_verso if abs(s - 11) <= tolerance)
+        # Considera sonetto se la maggioranza dei versi è endecasillabo e lo schema inizia con ABAB/ABBA
+        if within >= 12 and (schema_rime.startswith('ABAB') or schema_rime.startswith('ABBA')):
+            return 'sonetto'
+
+    # Distici
+    if num_versi == 2:
+        if schema_rime == 'AA':
+            return 'distico (rima baciata)'
+        else:
+            return 'distico'
+
+    # Altre forme
+    if num_versi == 6:
+        return 'sestina'
+    elif num_versi == 8:
+        return 'ottava'
+    elif num_versi == 1:
+        return 'monostico'
+
+    return 'versi_liberi'  # Usa nome compatibile con SCHEMI_POESIA
+
+
+def verifica_metrica_storica(tipo_poesia, num_versi, sillabe_per_verso, schema_rime, use_tolerance=False):
+    """Verifica se la poesia rispetta la metrica del tipo identificato"""
+
+    # Per i versi liberi, sempre valido
+    if tipo_poesia in ['verso libero', 'versi_liberi']:
+        return True
+
+    # Regola speciale: Sonetto
+    # - 14 versi
+    # - sillabe tendenzialmente endecasillabi (tolleranza opzionale)
+    # - ottave iniziali ABBA ABBA (o variante ABAB ABAB); terzine accettano varianti comuni (CDC DCD, CDE CDE, CDE DCE, CDC EDE, ecc.)
+    if tipo_poesia == 'sonetto':
+        if len(sillabe_per_verso) != 14:
+            return False
+        tol = 2 if use_tolerance else 0
+        if use_tolerance:
+            within = sum(1 for s in sillabe_per_verso if abs(s - 11) <= tol)
+            if within < 12:
+                return False
+        else:
+            if any(s != 11 for s in sillabe_per_verso):
+                return False
+
+        if not schema_rime or len(schema_rime) != 14:
+            return False
+        prefix8 = schema_rime[:8]
+        if prefix8 in ('ABBAABBA', 'ABABABAB'):
+            # Non imponiamo schema rigido sulle terzine per includere le varianti comuni
+            return True
+        return False
+
+    if tipo_poesia not in SCHEMI_POESIA:
+        # Se il tipo non è negli schemi, ma è una variante riconosciuta, cerca il tipo base
+        tipo_base = None
+        if 'quartina' in tipo_poesia:
+            tipo_base = 'quartina'
+        elif 'terzina' in tipo_poesia:
+            tipo_base = 'terzina_dantesca'
+        elif 'distico' in tipo_poesia:
+            return True  # I distici sono sempre validi
+
+        if tipo_base and tipo_base in SCHEMI_POESIA:
+            tipo_poesia = tipo_base
+        else:
+            return False  # Tipo non riconosciuto
+
+    schema = SCHEMI_POESIA[tipo_poesia]
+
+    # Verifica sillabe per verso (se specificato) - con tolleranza opzionale
+    if 'sillabe' in schema and schema['sillabe']:
+        # Il numero di versi deve corrispondere alla lunghezza dello schema sillabe
+        if len(sillabe_per_verso) != len(schema['sillabe']):
+            return False
+
+        # Applica tolleranza solo se richiesta dall'utente
+        for i, sillabe_attese in enumerate(schema['sillabe']):
+            sillabe_effettive = sillabe_per_verso[i]
+            if use_tolerance:
+                # Con tolleranza: ±1 sillaba per haiku/tanka, ±2 per forme complesse
+                if tipo_poesia in ['haiku', 'tanka', 'katauta', 'choka', 'sedoka']:
+                    tolleranza = 1
+                else:
+                    tolleranza = 2
+
+                if abs(sillabe_effettive - sillabe_attese) > tolleranza:
+                    return False
+            else:
+                # Senza tolleranza: precisione assoluta
+                if sillabe_effettive != sillabe_attese:
+                    return False
+
+    # Verifica schema rime (se specificato) - più flessibile
+    if 'rima' in schema and schema['rima']:
+        schema_atteso = ''.join(schema['rima'])
+        if schema_rime != schema_atteso:
+            # Per alcuni tipi, accetta varianti comuni
+            if tipo_poesia == 'quartina':
+                # Accetta ABAB, AABB, ABBA per quartine
+                if schema_rime not in ['ABAB', 'AABB', 'ABBA']:
+                    return False
+            else:
+                return False
+
+    return True
+
+
+def dettagli_metrica_storici(tipo_poesia):
+    """Restituisce i dettagli della metrica per un tipo di poesia"""
+    if tipo_poesia not in SCHEMI_POESIA:
+        return {
+            'descrizione': 'Schema non definito o verso libero',
+            'versi': None,
+            'sillabe': None,
+            'rime': None
+        }
+
+    schema = SCHEMI_POESIA[tipo_poesia]
+    num_versi = len(schema.get('sillabe', [])) if schema.get('sillabe') else None
+
+    return {
+        'descrizione': schema.get('descrizione', f'Schema per {tipo_poesia}'),
+        'versi': num_versi,
+        'sillabe': schema.get('sillabe'),
+        'rime': schema.get('rima')
+    }
+
+
+def schema_atteso_storico(tipo_poesia):
+    """Restituisce lo schema rime atteso per un tipo di poesia"""
+    # Prima controlla negli schemi predefiniti
+    if tipo_poesia in SCHEMI_POESIA and 'rima' in SCHEMI_POESIA[tipo_poesia]:
+        schema_predefinito = SCHEMI_POESIA[tipo_poesia]['rima']
+        if schema_predefinito:
+            return schema_predefinito
+
+    # Schemi di default per tipi comuni
+    schemi_attesi = {
+        'sonetto': ['ABBA', 'ABBA', 'CDC', 'DCD'],
+        'quartina': ['ABAB'],  # Schema più comune
+        'quartina (rima alternata)': ['ABAB'],
+        'quartina (rima baciata)': ['AABB'],
+        'quartina (rima incrociata)': ['ABBA'],
+        'terzina_dantesca': ['ABA'],
+        'terzina (rima continua)': ['AAA'],
+        'limerick': ['AABBA'],
+        'ballad': ['ABCB'],
+        'clerihew': ['AABB'],
+        'stornello': ['ABA']
+    }
+
+    return schemi_attesi.get(tipo_poesia, [])
+
+
+def schema_frontend_storico(schema_string, tipo_poesia):
+    """Converte lo schema rime da stringa al formato array compatibile con frontend"""
+    if not schema_string or not schema_string.strip():
+        return []
+
+    # Se il tipo di poesia ha uno schema predefinito, usalo per dividere correttamente
+    if tipo_poesia in SCHEMI_POESIA and 'rima' in SCHEMI_POESIA[tipo_poesia]:
+        schema_predefinito = SCHEMI_POESIA[tipo_poesia]['rima']
+        if schema_predefinito:
+            return schema_predefinito
+
+    # Altrimenti, cerca di dividere in base a pattern comuni
+    schema = schema_string.strip()
+
+    # Per sonetti (14 versi): ABBAABBACDCDCD -> ["ABBA", "ABBA", "CDC", "DCD"]
+    if len(schema) == 14:
+        return [schema[0:4], schema[4:8], schema[8:11], schema[11:14]]
+
+    # Per quartine (4 versi): ABAB -> ["ABAB"]
+    if len(schema) == 4:
+        return [schema]
+
+    # Per terzine (3 versi): ABA -> ["ABA"]
+    if len(schema) == 3:
+        return [schema]
+
+    # Per limerick (5 versi): AABBA -> ["AABBA"]
+    if len(schema) == 5:
+        return [schema]
+
+    # Default: ogni 4 lettere un gruppo
+    groups = []
+    for i in range(0, len(schema), 4):
+        groups.append(schema[i:i+4])
+
+    return groups if groups else [schema]
+
+
+def pattern_sillabe_storico(tipo_poesia):
+    """Restituisce il pattern di sillabe per un tipo di poesia"""
+    patterns = {
+        'haiku': [5, 7, 5],
+        'tanka': [5, 7, 5, 7, 7],
+        'katauta': [5, 7, 7],
+        'choka': [5, 7, 5, 7, 5, 7, 5, 7, 7],
+        'sedoka': [5, 7, 7, 5, 7, 7],
+        'sonetto': [11] * 14,
+        'quartina': [11] * 4,
+        'stornello': [5, 11, 11],
+        'ottava_rima': [11] * 8,
+        'terzina_dantesca': [11, 11, 11],
+        'limerick': [8, 8, 5, 5, 8],
+        'ballad': [8, 6, 8, 6],
+        'clerihew': [8, 8, 8, 8],
+        'cinquain': [2, 4, 6, 8, 2],
+        'sestina': [11] * 6,
+        'versi_liberi': []
+    }
+    return patterns.get(tipo_poesia, [])
+
+
+def target_sillabe_storico(tipo_poesia, indice_verso):
+    """Restituisce il numero di sillabe atteso per un verso specifico"""
+    # Usa la stessa logica di get_syllable_pattern per mantenere coerenza
+    pattern = pattern_sillabe_storico(tipo_poesia)
+
+    if pattern and indice_verso < len(pattern):
+        return pattern[indice_verso]
+
+    return None  # Nessun target specifico (per versi liberi o fuori dal pattern)
+
+
+# --- Confronto ---
+
+SCHEMI = [
+    '', 'A', 'AA', 'AB', 'AAA', 'ABA', 'ABB', 'ABC', 'AABB', 'ABAB', 'ABBA', 'ABCB', 'AAAA', 'ABCD',
+    'AABBA', 'ABABA', 'ABCDE', 'ABCABC', 'ABABCC', 'ABABABCC', 'ABBAABBA', 'ABABABAB', 'AABBCCDD',
+    'ABBAABBACDCDCD', 'ABBAABBACDECDE', 'ABABABABCDCDCD', 'ABABCDCDEFEFGG', 'AABBCCDDEEFFGG',
+]
+TIPI = sorted(set(SCHEMI_POESIA) | {
+    'quartina (rima alternata)', 'quartina (rima baciata)', 'quartina (rima incrociata)',
+    'terzina (rima continua)', 'distico (rima baciata)', 'ottava', 'monostico', 'sconosciuto', 'libero', '',
+})
+TARGET = [2, 4, 5, 6, 7, 8, 11]
+
+
+def casi_casuali(quanti, seme=1301):
+    """(num_versi, sillabe, schema) vicini ai target delle forme, dove le regole si distinguono"""
+    rng = random.Random(seme)
+    for _ in range(quanti):
+        num_versi = rng.choice([1, 2, 3, 3, 4, 4, 5, 5, 6, 8, 8, 9, 14, 14, 15])
+        base = rng.choice(list(SCHEMI_POESIA.values()))['sillabe'] or [11] * num_versi
+        sillabe = [
+            (base[i] if i < len(base) else rng.choice(TARGET)) + rng.choice([0, 0, 0, -1, 1, -2, 2, -3, 3])
+            for i in range(num_versi)
+        ]
+        schemi = [s for s in SCHEMI if len(s) == num_versi] or ['']
+        schema = rng.choice(schemi + [rng.choice(SCHEMI)])
+        yield num_versi, sillabe, schema
+
+
+def normalizza(valore):
+    """Tuple e MappingProxyType del registro confrontati come liste e dizionari"""
+    return json.loads(json.dumps(valore, default=dict))
+
+
+class TestRegistroForme(unittest.TestCase):
+
+    def test_classificazione_e_metrica(self):
+        differenze = []
+        for num_versi, sillabe, schema in casi_casuali(5000):
+            for tolleranza in (False, True):
+                args = (num_versi, sillabe, schema, tolleranza)
+                if identifica_tipo_poesia(*args) != identifica_tipo_storico(*args):
+                    differenze.append(('tipo', args))
+                for tipo in TIPI:
+                    if verifica_metrica(tipo, *args) != verifica_metrica_storica(tipo, *args):
+                        differenze.append((tipo, args))
+        self.assertEqual(differenze[:10], [])
+
+    def test_poesie_di_esempio(self):
+        for richiesta in RICHIESTE:
+            testo = richiesta.get('text')
+            if not testo or not testo.strip():
+                continue
+            for tolleranza in (False, True):
+                with self.subTest(testo=testo[:30], tolleranza=tolleranza):
+                    analisi = analizza_poesia_completa(testo, tolleranza)
+                    args = (analisi['num_versi'], analisi['sillabe_per_verso'], analisi['schema_rime'], tolleranza)
+                    self.assertEqual(analisi['tipo_riconosciuto'], identifica_tipo_storico(*args))
+                    self.assertEqual(analisi['rispetta_metrica'],
+                                     verifica_metrica_storica(analisi['tipo_riconosciuto'], *args))
+
+    def test_conteggio_sillabe_diverso_dai_versi(self):
+        # verifica_metrica riceve num_versi e sillabe separati: la lunghezza può non coincidere
+        for sillabe in ([11] * 13, [11] * 15, [5, 7], [5, 7, 5, 7]):
+            for tipo in TIPI:
+                for tolleranza in (False, True):
+                    args = (3, sillabe, 'ABA', tolleranza)
+                    with self.subTest(tipo=tipo, sillabe=sillabe, tolleranza=tolleranza):
+                        self.assertEqual(verifica_metrica(tipo, *args), verifica_metrica_storica(tipo, *args))
+
+    def test_tabelle_per_tipo(self):
+        for tipo in TIPI:
+            with self.subTest(tipo=tipo):
+                self.assertEqual(normalizza(get_dettagli_metrica(tipo)), normalizza(dettagli_metrica_storici(tipo)))
+                self.assertEqual(list(get_syllable_pattern(tipo)), pattern_sillabe_storico(tipo))
+                self.assertEqual(list(get_expected_rhyme_scheme(tipo)), schema_atteso_storico(tipo))
+                for verso in range(16):
+                    self.assertEqual(get_target_sillabe(tipo, verso), target_sillabe_storico(tipo, verso))
+                for schema in SCHEMI + ['  ', 'ABCDEFGHI']:
+                    self.assertEqual(list(convert_rhyme_scheme_to_frontend(schema, tipo)),
+                                     schema_frontend_storico(schema, tipo))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Ricerca della bacheca (services.full_text): trigger FTS5 e ripiego sul LIKE"""
+import unittest
+from unittest import mock
+
+from sqlalchemy import text
+
+from app import app
+from models.poem import DDL_FTS_SQLITE, Poem, db
+from services import full_text
+from services.full_text import filtro_full_text, filtro_ricerca, segna_indice_non_disponibile, termini_ricerca
+
+
+class TestRicercaFullText(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with app.app_context():
+            db.create_all()
+
+    def setUp(self):
+        self.contesto = app.app_context()
+        self.contesto.push()
+        full_text._stato_indice.update(disponibile=None, verificato=0.0)
+        self.aggiungi('Vecchio stagno', "una rana si tuffa\nrumore d'acqua", 'Basho')
+        self.aggiungi('Perché', 'il mare e la sera', 'Anonimo')
+        self.aggiungi('Autunno', 'si sta come d\'autunno\nsugli alberi le foglie', 'Ungaretti')
+
+    def tearDown(self):
+        Poem.query.delete()
+        db.session.commit()
+        self.contesto.pop()
+        full_text._stato_indice.update(disponibile=None, verificato=0.0)
+
+    def aggiungi(self, titolo, testo, autore):
+        poesia = Poem(title=titolo, content=testo, author=autore, verse_count=1, syllable_counts='5')
+        db.session.add(poesia)
+        db.session.commit()
+        return poesia
+
+    def cerca(self, testo):
+        """Titoli trovati, i più pertinenti prima"""
+        risultato = filtro_full_text(Poem.query, testo)
+        self.assertIsNotNone(risultato)
+        query, punteggio = risultato
+        return [p.title for p in query.order_by(punteggio.desc(), Poem.id)]
+
+    def righe_indice(self):
+        return db.session.execute(text("SELECT count(*) FROM poems_fts")).scalar()
+
+    def test_indice_creato_con_la_tabella(self):
+        self.assertTrue(full_text.indice_disponibile())
+        self.assertEqual(self.righe_indice(), 3)
+
+    def test_inserimento(self):
+        self.assertEqual(self.cerca('cicala'), [])
+        self.aggiungi('Estate', 'canta la cicala', 'Anonimo')
+        self.assertEqual(self.cerca('cicala'), ['Estate'])
+
+    def test_cancellazione(self):
+        Poem.query.filter(Poem.title == 'Vecchio stagno').delete()
+        db.session.commit()
+        self.assertEqual(self.cerca('rana'), [])
+        self.assertEqual(self.righe_indice(), 2)
+
+    def test_modifica(self):
+        poesia = Poem.query.filter(Poem.title == 'Perché').one()
+        poesia.content = 'il vento e la notte'
+        db.session.commit()
+        self.assertEqual(self.cerca('mare'), [])
+        self.assertEqual(self.cerca('vento'), ['Perché'])
+
+    def test_prefissi_e_tutti_i_termini(self):
+        self.assertEqual(self.cerca('stag'), ['Vecchio stagno'])
+        self.assertEqual(self.cerca('rana acqua'), ['Vecchio stagno'])
+        self.assertEqual(self.cerca('rana foglie'), [])
+
+    def test_senza_accenti_e_maiuscole(self):
+        self.assertEqual(self.cerca('PERCHE'), ['Perché'])
+
+    def test_titolo_prima_del_testo(self):
+        self.aggiungi('Sera', 'le rondini', 'Anonimo')
+        self.assertEqual(self.cerca('sera'), ['Sera', 'Perché'])
+
+    def test_autore(self):
+        self.assertEqual(self.cerca('ungaretti'), ['Autunno'])
+
+    def test_testo_senza_parole(self):
+        self.assertEqual(termini_ricerca('!!! ---'), [])
+        self.assertIsNone(filtro_full_text(Poem.query, '!!! ---'))
+        query, punteggio = filtro_ricerca(Poem.query, '!!!')
+        self.assertIsNone(punteggio)
+        self.assertEqual(query.count(), 0)
+
+    def test_like_se_indice_non_disponibile(self):
+        segna_indice_non_disponibile()
+        self.assertIsNone(filtro_full_text(Poem.query, 'rana'))
+        query, punteggio = filtro_ricerca(Poem.query, 'rana si')
+        self.assertIsNone(punteggio)
+        self.assertEqual([p.title for p in query], ['Vecchio stagno'])
+        # Sottostringa, non prefisso di parola
+        query, _ = filtro_ricerca(Poem.query, 'tunn')
+        self.assertEqual([p.title for p in query], ['Autunno'])
+
+    def test_like_jolly_letterali(self):
+        segna_indice_non_disponibile()
+        self.aggiungi('Sconto', 'al 50% di sera', 'Anonimo')
+        query, _ = filtro_ricerca(Poem.query, '0%')
+        self.assertEqual([p.title for p in query], ['Sconto'])
+        query, _ = filtro_ricerca(Poem.query, 'r_n')
+        self.assertEqual(query.count(), 0)
+
+    def test_bacheca_ripiega_se_manca_la_tabella(self):
+        # Indice verificato prima che sparisca: la query full-text fallisce
+        self.assertTrue(full_text.indice_disponibile())
+        db.session.execute(text('DROP TABLE poems_fts'))
+        db.session.commit()
+        try:
+            client = app.test_client()
+            with mock.patch('builtins.print'):
+                risposta = client.get('/bacheca', query_string={'search': 'rana', 'fragment': '1'})
+            self.assertEqual(risposta.status_code, 200)
+            self.assertEqual(risposta.get_json()['count'], 1)
+            self.assertFalse(full_text.indice_disponibile())
+        finally:
+            self.ricrea_indice()
+
+    def ricrea_indice(self):
+        for trigger in ('poems_fts_ai', 'poems_fts_ad', 'poems_fts_au'):
+            db.session.execute(text(f'DROP TRIGGER IF EXISTS {trigger}'))
+        for ddl in DDL_FTS_SQLITE:
+            db.session.execute(text(ddl))
+        db.session.execute(text("INSERT INTO poems_fts(poems_fts) VALUES ('rebuild')"))
+        db.session.commit()
+
+
+if __name__ == '__main__':
+    unittest.main()
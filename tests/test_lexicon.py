@@ -0,0 +1,194 @@
+"""Lessico su file mmap (services.lexicon) e costruzione con utils.build_lexicon"""
+import gc
+import os
+import struct
+import tempfile
+import unittest
+
+import services.lexicon as lexicon
+from services.lexicon import _HEADER, _SLOT, MAGIC, VERSIONE, Lessico, carica_lessico, scrivi_lessico
+from services.rhyme_analyzer import estrai_suono_finale
+from services.syllable_analyzer import conta_sillabe_motore, conta_sillabe_singola
+from utils.build_lexicon import leggi_voci
+
+VOCI = [
+    ('amore', 3, 'ore'),
+    ('cuore', 2, 'ore'),
+    ('perché', 2, 'é'),
+    ('città', 2, 'à'),
+    ('aiuola', 3, 'ola'),
+    ('sole', 2, 'ole'),
+]
+
+
+class TestLessico(unittest.TestCase):
+
+    def setUp(self):
+        self.cartella = tempfile.TemporaryDirectory()
+        self.percorso = os.path.join(self.cartella.name, 'lessico.bin')
+
+    def tearDown(self):
+        gc.collect()
+        self.cartella.cleanup()
+
+    def scrivi(self, voci=VOCI):
+        return scrivi_lessico(voci, self.percorso)
+
+    def apri(self):
+        lessico = Lessico(self.percorso)
+        self.addCleanup(lessico.close)
+        return lessico
+
+    def test_scrittura_e_ricerca(self):
+        self.assertEqual(self.scrivi(), len(VOCI))
+        lessico = self.apri()
+        self.assertEqual(len(lessico), len(VOCI))
+        for parola, sillabe, rima in VOCI:
+            with self.subTest(parola=parola):
+                self.assertEqual(lessico.cerca(parola), (sillabe, rima))
+                self.assertEqual(lessico.sillabe(parola), sillabe)
+        self.assertIsNone(lessico.cerca('assente'))
+        self.assertIsNone(lessico.sillabe(''))
+        self.assertEqual(sorted(lessico.voci()), sorted(VOCI))
+        # Fattore di carico <= 0.5
+        self.assertGreaterEqual(lessico.n_slot, 2 * len(VOCI))
+
+    def test_molte_voci(self):
+        voci = [(f'parola{i}', i % 9 + 1, f'{i % 97}') for i in range(5000)]
+        self.scrivi(voci)
+        lessico = self.apri()
+        self.assertEqual(sorted(lessico.voci()), sorted(voci))
+        self.assertTrue(all(lessico.cerca(p) == (s, r) for p, s, r in voci))
+        self.assertIsNone(lessico.cerca('parola5000'))
+
+    def test_voci_scartate_e_duplicate(self):
+        voci = VOCI + [('', 1, 'x'), ('zero', 0, 'ero'), ('troppe', 256, 'oppe'),
+                       ('x' * 256, 3, 'x'), ('amore', 4, 'ore')]
+        self.assertEqual(self.scrivi(voci), len(VOCI))
+        # Per le parole ripetute vale l'ultima voce
+        self.assertEqual(self.apri().cerca('amore'), (4, 'ore'))
+
+    def test_lessico_vuoto(self):
+        self.assertEqual(self.scrivi([]), 0)
+        lessico = self.apri()
+        self.assertEqual(len(lessico), 0)
+        self.assertIsNone(lessico.cerca('amore'))
+
+    def test_scrittura_atomica(self):
+        self.scrivi()
+        self.assertEqual(os.listdir(self.cartella.name), ['lessico.bin'])
+
+    def corrompi(self, **campi):
+        """Riscrive l'header con i campi indicati (magic, versione, n_slot, n_voci)"""
+        with open(self.percorso, 'rb') as f:
+            dati = bytearray(f.read())
+        magic, versione, riservato, n_slot, n_voci = _HEADER.unpack_from(dati, 0)
+        valori = dict(magic=magic, versione=versione, n_slot=n_slot, n_voci=n_voci)
+        valori.update(campi)
+        _HEADER.pack_into(dati, 0, valori['magic'], valori['versione'], riservato,
+                          valori['n_slot'], valori['n_voci'])
+        with open(self.percorso, 'wb') as f:
+            f.write(dati)
+
+    def test_header_non_valido(self):
+        casi = {
+            'magic': dict(magic=b'XXXX'),
+            'versione': dict(versione=VERSIONE + 1),
+            'slot non potenza di 2': dict(n_slot=12),
+            'un solo slot': dict(n_slot=1, n_voci=0),
+            'nessuno slot vuoto': dict(n_slot=8, n_voci=8),
+            'slot oltre il file': dict(n_slot=1 << 20),
+        }
+        for descrizione, campi in casi.items():
+            with self.subTest(descrizione):
+                self.scrivi()
+                self.corrompi(**campi)
+                with self.assertRaises(ValueError):
+                    Lessico(self.percorso)
+
+    def test_file_troncato(self):
+        self.scrivi()
+        n_slot = _HEADER.unpack_from(open(self.percorso, 'rb').read(), 0)[3]
+        for lunghezza in (0, 3, _HEADER.size - 1, _HEADER.size + n_slot * _SLOT.size - 1):
+            with self.subTest(lunghezza=lunghezza):
+                self.scrivi()
+                with open(self.percorso, 'r+b') as f:
+                    f.truncate(lunghezza)
+                # Un file vuoto non è mappabile (OSError/ValueError da mmap)
+                with self.assertRaises((ValueError, OSError)):
+                    Lessico(self.percorso)
+
+    def test_header_minimo_valido(self):
+        with open(self.percorso, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSIONE, 0, 2, 0) + _SLOT.pack(0, 0, 0, 0, 0, 0) * 2)
+        self.assertIsNone(self.apri().cerca('amore'))
+
+
+class TestCostruzioneLessico(unittest.TestCase):
+
+    def setUp(self):
+        self.cartella = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cartella.cleanup)
+        self.sorgente = os.path.join(self.cartella.name, 'parole.txt')
+        with open(self.sorgente, 'w', encoding='utf-8') as f:
+            f.write("# commento\nAmore\ncuore 5\n\naiuola\tx\nperché\n")
+
+    def test_leggi_voci(self):
+        voci = list(leggi_voci([self.sorgente]))
+        self.assertEqual([v[0] for v in voci], ['amore', 'cuore', 'aiuola', 'perché'])
+        attese = {'amore': conta_sillabe_motore('amore'), 'cuore': 5,
+                  'aiuola': conta_sillabe_motore('aiuola'), 'perché': conta_sillabe_motore('perché')}
+        for parola, sillabe, rima in voci:
+            with self.subTest(parola=parola):
+                self.assertEqual(sillabe, attese[parola])
+                self.assertEqual(rima, estrai_suono_finale(parola))
+
+    def test_dal_sorgente_alla_ricerca(self):
+        percorso = os.path.join(self.cartella.name, 'lessico.bin')
+        voci = list(leggi_voci([self.sorgente]))
+        scrivi_lessico(voci, percorso)
+        lessico = Lessico(percorso)
+        try:
+            for parola, sillabe, rima in voci:
+                self.assertEqual(lessico.cerca(parola), (sillabe, rima))
+        finally:
+            lessico.close()
+
+
+class TestCaricaLessico(unittest.TestCase):
+
+    def setUp(self):
+        self.cartella = tempfile.TemporaryDirectory()
+        stato = (lexicon._lessico, lexicon._caricato)
+
+        def ripristina():
+            lexicon._lessico, lexicon._caricato = stato
+            from services.syllable_analyzer import invalida_cache_sillabe
+            invalida_cache_sillabe()
+            gc.collect()
+            self.cartella.cleanup()
+        self.addCleanup(ripristina)
+
+    def percorso(self, nome, voci):
+        percorso = os.path.join(self.cartella.name, nome)
+        scrivi_lessico(voci, percorso)
+        return percorso
+
+    def test_sostituzione(self):
+        primo = carica_lessico(self.percorso('a.bin', [('amore', 7, 'ore')]))
+        self.assertEqual(conta_sillabe_singola('amore'), 7)
+
+        secondo = carica_lessico(self.percorso('b.bin', [('amore', 8, 'ore')]))
+        self.assertIsNot(primo, secondo)
+        # La cache delle parole è invalidata: vale il nuovo lessico
+        self.assertEqual(conta_sillabe_singola('amore'), 8)
+        # Chi ha ancora il vecchio lessico (un altro thread) continua a leggerlo
+        self.assertEqual(primo.sillabe('amore'), 7)
+
+        self.assertIsNone(carica_lessico(None))
+        self.assertEqual(conta_sillabe_singola('amore'), conta_sillabe_motore('amore'))
+        self.assertEqual(secondo.sillabe('amore'), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
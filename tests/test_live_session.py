@@ -0,0 +1,158 @@
+"""Delta dell'analisi live (services.live_session.SessioneLive.applica)"""
+import unittest
+
+from services.live_session import (MAX_CARATTERI_LIVE, MAX_RIGHE_LIVE, MAX_STREAM_LIVE,
+                                   SessioneLive, libera_stream_live, occupa_stream_live)
+from services.poetry_analyzer import analizza_poesia_completa
+from tests.poesie import HAIKU, SONETTO_BREVE
+
+RIGHE = HAIKU.split('\n') + ['', 'rumore di foglie']
+
+
+class TestSessioneLive(unittest.TestCase):
+
+    def setUp(self):
+        self.sessione = SessioneLive('test')
+
+    def assert_come_analisi_completa(self, aggiornamento):
+        """Lo stato della sessione equivale ad analizzare da capo tutto il testo"""
+        testo = '\n'.join(self.sessione.righe)
+        self.assertEqual(aggiornamento.analisi,
+                         analizza_poesia_completa(testo, aggiornamento.use_tolerance))
+        self.assertEqual(aggiornamento.righe_versi,
+                         tuple(i for i, r in enumerate(self.sessione.righe) if r.strip()))
+        self.assertEqual(aggiornamento.num_righe, len(self.sessione.righe))
+
+    def test_reset(self):
+        aggiornamento = self.sessione.applica(RIGHE, reset=True)
+        self.assertEqual(aggiornamento.versione, 1)
+        self.assertEqual(self.sessione.righe, RIGHE)
+        self.assertEqual(aggiornamento.righe_cambiate, tuple(range(len(RIGHE))))
+        self.assertEqual(aggiornamento.righe_versi, (0, 1, 2, 4))
+        self.assert_come_analisi_completa(aggiornamento)
+
+    def test_delta_ricalcola_solo_le_righe_cambiate(self):
+        self.sessione.applica(RIGHE, reset=True)
+        prima = list(self.sessione.analisi_righe)
+        aggiornamento = self.sessione.applica({'1': 'una rana nel fosso'})
+        self.assertEqual(aggiornamento.versione, 2)
+        self.assertEqual(aggiornamento.righe_cambiate, (1,))
+        for i in (0, 2, 4):
+            self.assertIs(self.sessione.analisi_righe[i], prima[i])
+        self.assertIsNot(self.sessione.analisi_righe[1], prima[1])
+        self.assert_come_analisi_completa(aggiornamento)
+
+    def test_riga_invariata(self):
+        self.sessione.applica(RIGHE, reset=True)
+        aggiornamento = self.sessione.applica({0: RIGHE[0]})
+        self.assertEqual(aggiornamento.righe_cambiate, ())
+        self.assert_come_analisi_completa(aggiornamento)
+
+    def test_riga_riempita_rinumera_i_versi_successivi(self):
+        self.sessione.applica(RIGHE, reset=True)
+        aggiornamento = self.sessione.applica({3: 'verso nuovo'})
+        self.assertEqual(aggiornamento.righe_cambiate, (3, 4))
+        self.assertEqual(aggiornamento.righe_versi, (0, 1, 2, 3, 4))
+        self.assert_come_analisi_completa(aggiornamento)
+
+    def test_riga_svuotata(self):
+        self.sessione.applica(RIGHE, reset=True)
+        aggiornamento = self.sessione.applica({1: '   '})
+        # La riga 1 non è più un verso (da ripulire nel client), le successive cambiano numero
+        self.assertEqual(aggiornamento.righe_cambiate, (1, 2, 4))
+        self.assertEqual(aggiornamento.righe_versi, (0, 2, 4))
+        self.assert_come_analisi_completa(aggiornamento)
+
+    def test_troncamento_ed_estensione(self):
+        self.sessione.applica(RIGHE, reset=True)
+        aggiornamento = self.sessione.applica({}, num_righe=2)
+        self.assertEqual(self.sessione.righe, RIGHE[:2])
+        self.assertEqual(aggiornamento.righe_cambiate, ())
+        self.assert_come_analisi_completa(aggiornamento)
+
+        aggiornamento = self.sessione.applica({3: 'in fondo'}, num_righe=4)
+        self.assertEqual(self.sessione.righe, RIGHE[:2] + ['', 'in fondo'])
+        self.assertEqual(aggiornamento.righe_cambiate, (2, 3))
+        self.assert_come_analisi_completa(aggiornamento)
+
+        aggiornamento = self.sessione.applica({}, num_righe=0)
+        self.assertEqual(self.sessione.righe, [])
+        self.assertEqual(aggiornamento.versi, ())
+        self.assertIn('errore', aggiornamento.analisi)
+
+    def test_cambio_tipo_o_tolleranza_ricalcola_tutto(self):
+        self.sessione.applica(RIGHE, reset=True)
+        aggiornamento = self.sessione.applica({}, tipo='haiku')
+        self.assertEqual(aggiornamento.tipo, 'haiku')
+        self.assertEqual(aggiornamento.righe_cambiate, tuple(range(len(RIGHE))))
+        self.assertEqual(self.sessione.applica({}, tipo='haiku').righe_cambiate, ())
+
+        aggiornamento = self.sessione.applica({}, use_tolerance=True)
+        self.assertTrue(aggiornamento.use_tolerance)
+        self.assertEqual(aggiornamento.righe_cambiate, tuple(range(len(RIGHE))))
+        self.assert_come_analisi_completa(aggiornamento)
+
+    def test_sequenza_di_delta(self):
+        # Una serie di modifiche parziali porta allo stesso stato di un reset
+        righe = SONETTO_BREVE.split('\n')
+        self.sessione.applica([righe[0]], reset=True)
+        for i, riga in enumerate(righe[1:], start=1):
+            self.sessione.applica({i: riga[:5]}, num_righe=i + 1)
+            aggiornamento = self.sessione.applica({i: riga})
+            self.assertEqual(aggiornamento.righe_cambiate, (i,))
+        self.assertEqual(self.sessione.righe, righe)
+        self.assert_come_analisi_completa(aggiornamento)
+        self.assertEqual(aggiornamento.analisi, SessioneLive('altra').applica(righe, reset=True).analisi)
+
+    def test_delta_non_validi(self):
+        self.sessione.applica(RIGHE, reset=True)
+        delta_non_validi = {
+            'reset senza lista': dict(righe={0: 'a'}, reset=True),
+            'lista senza reset': dict(righe=['a']),
+            'indice non numerico': dict(righe={'uno': 'a'}),
+            'testo non stringa': dict(righe={0: 3}),
+            'indice fuori dal testo': dict(righe={len(RIGHE): 'a'}),
+            'indice negativo': dict(righe={-1: 'a'}),
+            'indice oltre il troncamento': dict(righe={3: 'a'}, num_righe=2),
+            'numero di righe non numerico': dict(righe={}, num_righe='tante'),
+            'numero di righe negativo': dict(righe={}, num_righe=-1),
+            'troppe righe': dict(righe={}, num_righe=MAX_RIGHE_LIVE + 1),
+            'testo troppo lungo': dict(righe={0: 'a' * MAX_CARATTERI_LIVE}),
+            'reset troppo lungo': dict(righe=['a' * 1000, 'b' * 1000], reset=True),
+        }
+        for descrizione, delta in delta_non_validi.items():
+            with self.subTest(descrizione):
+                with self.assertRaises(ValueError):
+                    self.sessione.applica(**delta)
+                # Un delta rifiutato non tocca lo stato
+                self.assertEqual(self.sessione.righe, RIGHE)
+                self.assertEqual(self.sessione.versione, 1)
+
+    def test_limiti_esatti(self):
+        self.sessione.applica(['a' * 999, 'b' * 1000], reset=True)
+        self.assertEqual(len('\n'.join(self.sessione.righe)), MAX_CARATTERI_LIVE)
+        # Anche le righe vuote contano un a capo, come nel testo di /api/analyze
+        with self.assertRaises(ValueError):
+            self.sessione.applica({}, num_righe=3)
+        aggiornamento = SessioneLive('altra').applica({}, num_righe=MAX_RIGHE_LIVE)
+        self.assertEqual(aggiornamento.num_righe, MAX_RIGHE_LIVE)
+
+
+class TestPostiStream(unittest.TestCase):
+
+    def test_posti_limitati(self):
+        occupati = 0
+        try:
+            while occupati < MAX_STREAM_LIVE and occupa_stream_live():
+                occupati += 1
+            self.assertEqual(occupati, MAX_STREAM_LIVE)
+            self.assertFalse(occupa_stream_live())
+        finally:
+            for _ in range(occupati):
+                libera_stream_live()
+        self.assertTrue(occupa_stream_live())
+        libera_stream_live()
+
+
+if __name__ == '__main__':
+    unittest.main()
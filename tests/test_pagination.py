@@ -0,0 +1,167 @@
+"""Paginazione a cursore di /api/bacheca (services.pagination)"""
+import base64
+import json
+import unittest
+from datetime import datetime, timedelta
+
+from app import app
+from models.poem import Poem, db
+from services.pagination import ORDINAMENTI, codifica_cursore, invalida_totali_bacheca
+
+NUM_POESIE = 53
+PER_PAGE = 7
+
+
+def cursore_grezzo(dati):
+    return base64.urlsafe_b64encode(json.dumps(dati).encode('utf-8')).rstrip(b'=').decode('ascii')
+
+
+def ordine_atteso(poesie, ordinamento):
+    """Id nell'ordine della bacheca: colonna, poi id nella stessa direzione, NULL in fondo"""
+    colonna, discendente = ORDINAMENTI[ordinamento]
+    valorizzate = [p for p in poesie if getattr(p, colonna) is not None]
+    nulle = [p for p in poesie if getattr(p, colonna) is None]
+    valorizzate.sort(key=lambda p: (getattr(p, colonna), p.id), reverse=discendente)
+    nulle.sort(key=lambda p: p.id, reverse=discendente)
+    return [p.id for p in valorizzate + nulle]
+
+
+class TestPaginazioneBacheca(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def setUp(self):
+        base = datetime(2024, 1, 1)
+        with app.app_context():
+            Poem.query.delete()
+            senza_data = []
+            for i in range(NUM_POESIE):
+                # Timestamp ripetuti (ogni 3), qualche NULL e tipi mancanti per lo spareggio
+                poesia = Poem(
+                    title=f"Titolo {i % 7}", content=f"verso {i}", author=f"Autore {i % 5}",
+                    verse_count=1, syllable_counts='3',
+                    poem_type='haiku' if i % 2 else (None if i % 4 else 'sonetto'),
+                    created_at=base + timedelta(minutes=i // 3),
+                    is_valid=bool(i % 3), likes=0)
+                db.session.add(poesia)
+                if i % 17 == 0:
+                    senza_data.append(poesia)
+            db.session.flush()
+            # Il default di created_at si applica anche a None: i NULL vanno scritti dopo
+            Poem.query.filter(Poem.id.in_([p.id for p in senza_data])).update(
+                {Poem.created_at: None}, synchronize_session=False)
+            db.session.commit()
+        invalida_totali_bacheca()
+
+    def tearDown(self):
+        with app.app_context():
+            Poem.query.delete()
+            db.session.commit()
+        invalida_totali_bacheca()
+
+    def poesie(self, **filtri):
+        with app.app_context():
+            return Poem.query.filter_by(**filtri).all()
+
+    def scorri(self, ordinamento, extra=''):
+        """Id di tutte le pagine seguendo next_cursor"""
+        visti, cursore = [], None
+        for _ in range(NUM_POESIE + 2):
+            url = f'/api/bacheca?per_page={PER_PAGE}&sort={ordinamento}{extra}'
+            if cursore:
+                url += f'&cursor={cursore}'
+            risposta = self.client.get(url)
+            self.assertEqual(risposta.status_code, 200, risposta.get_data(as_text=True))
+            dati = risposta.get_json()
+            self.assertEqual(dati['sort'], ordinamento)
+            self.assertLessEqual(len(dati['poesie']), PER_PAGE)
+            visti += [p['id'] for p in dati['poesie']]
+            if not dati['has_next']:
+                self.assertIsNone(dati['next_cursor'])
+                return visti
+            self.assertEqual(len(dati['poesie']), PER_PAGE)
+            cursore = dati['next_cursor']
+        self.fail(f"paginazione senza fine per sort={ordinamento}")
+
+    def test_ogni_ordinamento_senza_duplicati_ne_buchi(self):
+        poesie = self.poesie()
+        self.assertTrue(any(p.created_at is None for p in poesie))
+        self.assertTrue(any(p.poem_type is None for p in poesie))
+        for ordinamento in ORDINAMENTI:
+            with self.subTest(sort=ordinamento):
+                self.assertEqual(self.scorri(ordinamento), ordine_atteso(poesie, ordinamento))
+
+    def test_filtri(self):
+        for ordinamento in ('recent', 'type'):
+            with self.subTest(sort=ordinamento):
+                self.assertEqual(self.scorri(ordinamento, '&solo_valide=true'),
+                                 ordine_atteso(self.poesie(is_valid=True), ordinamento))
+                self.assertEqual(self.scorri(ordinamento, '&tipo=haiku'),
+                                 ordine_atteso(self.poesie(poem_type='haiku'), ordinamento))
+
+    def test_pagina_esatta(self):
+        # Il numero di righe è un multiplo di per_page: l'ultima pagina non ha un seguito
+        visti = self.scorri('oldest', '&tipo=haiku')
+        self.assertEqual(len(visti), len(self.poesie(poem_type='haiku')))
+        dati = self.client.get(f'/api/bacheca?per_page={len(visti)}&sort=oldest&tipo=haiku').get_json()
+        self.assertFalse(dati['has_next'])
+        self.assertEqual([p['id'] for p in dati['poesie']], visti)
+
+    def test_inserimento_durante_lo_scorrimento(self):
+        # Una poesia pubblicata dopo la prima pagina non sposta quelle successive
+        prima = self.client.get(f'/api/bacheca?per_page={PER_PAGE}&sort=recent').get_json()
+        with app.app_context():
+            db.session.add(Poem(title='Nuova', content='nuova', author='Autore', verse_count=1,
+                                syllable_counts='2', created_at=datetime(2030, 1, 1)))
+            db.session.commit()
+        visti = [p['id'] for p in prima['poesie']]
+        cursore = prima['next_cursor']
+        while cursore:
+            dati = self.client.get(f'/api/bacheca?per_page={PER_PAGE}&sort=recent&cursor={cursore}').get_json()
+            visti += [p['id'] for p in dati['poesie']]
+            cursore = dati['next_cursor']
+        self.assertEqual(len(visti), len(set(visti)))
+        self.assertEqual(len(visti), NUM_POESIE)
+
+    def test_totale_facoltativo(self):
+        dati = self.client.get('/api/bacheca?per_page=5').get_json()
+        self.assertNotIn('total', dati)
+        dati = self.client.get('/api/bacheca?per_page=5&include_total=true&solo_valide=true').get_json()
+        self.assertEqual(dati['total'], len(self.poesie(is_valid=True)))
+
+    def test_cursore_non_valido(self):
+        cursori = {
+            'non base64': 'xxx!',
+            'non JSON': cursore_grezzo('x')[:-2] + '!!',
+            'lista vuota': cursore_grezzo([]),
+            'oggetto': cursore_grezzo({'sort': 'recent'}),
+            'altro ordinamento': codifica_cursore('title', 'Titolo 1', 5),
+            'id non intero': cursore_grezzo(['recent', '2024-01-01T00:00:00', '5']),
+            'id booleano': cursore_grezzo(['recent', '2024-01-01T00:00:00', True]),
+            'data non valida': cursore_grezzo(['recent', 'ieri', 5]),
+            'valore numerico': cursore_grezzo(['recent', 12, 5]),
+            'ordinamento sconosciuto': cursore_grezzo(['likes', 3, 5]),
+        }
+        for descrizione, cursore in cursori.items():
+            with self.subTest(descrizione):
+                risposta = self.client.get(f'/api/bacheca?sort=recent&cursor={cursore}')
+                self.assertEqual(risposta.status_code, 400)
+                self.assertTrue(risposta.get_json()['error'])
+
+    def test_cursore_null_su_colonna_obbligatoria(self):
+        risposta = self.client.get('/api/bacheca?sort=title&cursor=' + cursore_grezzo(['title', None, 5]))
+        self.assertEqual(risposta.status_code, 400)
+        # created_at invece ammette NULL: il cursore è tra le righe senza data
+        risposta = self.client.get('/api/bacheca?sort=recent&cursor=' + cursore_grezzo(['recent', None, 10**6]))
+        self.assertEqual(risposta.status_code, 200)
+        attesi = [p.id for p in self.poesie(created_at=None)]
+        self.assertTrue(attesi)
+        self.assertEqual(sorted(p['id'] for p in risposta.get_json()['poesie']), sorted(attesi))
+
+
+if __name__ == '__main__':
+    unittest.main()
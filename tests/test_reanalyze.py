@@ -0,0 +1,60 @@
+"""Rianalisi della bacheca con EsecutoreAnalisi (utils.reanalyze_poems)"""
+import unittest
+
+from app import app
+from models.poem import Poem, db
+from services.executor import EsecutoreAnalisi
+from services.poetry_analyzer import analizza_poesia_completa, analizza_poesie_batch
+from tests.poesie import HAIKU, LIBERA, SONETTO_BREVE
+from utils.reanalyze_poems import rianalizza
+
+TESTI = [HAIKU, SONETTO_BREVE, LIBERA, HAIKU + '\n' + LIBERA]
+
+
+class TestRianalisi(unittest.TestCase):
+
+    def setUp(self):
+        self.contesto = app.app_context()
+        self.contesto.push()
+        db.create_all()
+        Poem.query.delete()
+        for i, testo in enumerate(TESTI):
+            poesia = Poem.create_from_analysis(f'Titolo {i}', testo, 'Autore',
+                                               analizza_poesia_completa(testo), poem_type_override='haiku')
+            if i % 2:
+                # Metriche salvate con un conteggio ormai superato
+                poesia.syllable_counts = '1,1,1'
+                poesia.is_valid = not poesia.is_valid
+            db.session.add(poesia)
+        db.session.commit()
+
+    def tearDown(self):
+        Poem.query.delete()
+        db.session.commit()
+        self.contesto.pop()
+
+    def metriche(self):
+        return {p.content: (p.verse_count, p.syllable_counts, p.rhyme_scheme, p.is_valid, p.poem_type)
+                for p in Poem.query.order_by(Poem.id)}
+
+    def attese(self):
+        return {t: tuple(Poem.campi_analisi(a).values()) + ('haiku',)
+                for t, a in zip(TESTI, analizza_poesie_batch(TESTI))}
+
+    def test_aggiorna_le_poesie_cambiate(self):
+        with EsecutoreAnalisi(workers=1) as esecutore:
+            self.assertEqual(rianalizza(esecutore, dimensione_blocco=3), (4, 2))
+        self.assertEqual(self.metriche(), self.attese())
+        with EsecutoreAnalisi(workers=1) as esecutore:
+            self.assertEqual(rianalizza(esecutore), (4, 0))
+
+    def test_dry_run(self):
+        prima = self.metriche()
+        # Due processi: i blocchi passano dal pool come nella rianalisi reale
+        with EsecutoreAnalisi(workers=2, chunksize=1) as esecutore:
+            self.assertEqual(rianalizza(esecutore, dry_run=True), (4, 2))
+        self.assertEqual(self.metriche(), prima)
+
+
+if __name__ == '__main__':
+    unittest.main()
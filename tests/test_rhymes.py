@@ -0,0 +1,207 @@
+"""Dizionario delle rime: IndiceRime (services.rhyme_index) e /api/rhymes"""
+import threading
+import time
+import unittest
+
+import routes.api as api
+from app import app
+from models.poem import Poem, db
+from services.rhyme_analyzer import rhyme_key, suoni_rimano
+from services.rhyme_index import IndiceRime
+
+PAROLE = {
+    'amore': 5, 'cuore': 3, 'fiore': 3, 'dolore': 1, 'ore': 1, 'sole': 4, 'mole': 1,
+    'mare': 2, 'cantare': 2, 'città': 1, 'là': 2, 'blu': 1, 'tu': 3, 'virtù': 1,
+    'gioia': 1, 'noia': 2, 'sera': 2, 'vera': 1, 'chimera': 1,
+}
+
+
+def rime_a_forza_bruta(parole, parola, min_count=1):
+    """Tutte le parole che rimano secondo suoni_rimano, nell'ordine di IndiceRime.cerca"""
+    suono = rhyme_key(parola)
+    candidati = sorted(
+        (rhyme_key(p) != suono, -n, p) for p, n in parole.items()
+        if p != parola and n >= min_count and suoni_rimano(suono, rhyme_key(p))
+    )
+    return [p for _, _, p in candidati]
+
+
+class TestIndiceRime(unittest.TestCase):
+
+    def setUp(self):
+        self.indice = IndiceRime()
+        for parola, occorrenze in PAROLE.items():
+            self.indice.aggiungi_parola(parola, occorrenze)
+
+    def cerca(self, parola, **kwargs):
+        return [r['word'] for r in self.indice.cerca(parola, **kwargs)[1]]
+
+    def test_come_il_confronto_a_coppie(self):
+        for parola in [*PAROLE, 'vapore', 'tremare', 'bontà', 'gru', 'x', 'aria']:
+            with self.subTest(parola=parola):
+                self.assertEqual(self.cerca(parola, limit=100), rime_a_forza_bruta(PAROLE, parola))
+
+    def test_ordine_e_campi(self):
+        suono, rime = self.indice.cerca('Amore ')
+        self.assertEqual(suono, 'ore')
+        # Prima le rime perfette per frequenza (a parità, in ordine alfabetico), poi le altre
+        self.assertEqual([r['word'] for r in rime], ['cuore', 'fiore', 'dolore', 'ore', 'cantare', 'mare'])
+        self.assertEqual(rime[0], {'word': 'cuore', 'count': 3, 'sound': 'ore', 'perfect': True})
+        self.assertEqual(rime[-1], {'word': 'mare', 'count': 2, 'sound': 'are', 'perfect': False})
+
+    def test_rime_imperfette_dopo_le_perfette(self):
+        # Anche se molto più frequenti
+        self.indice.aggiungi_parola('mare', 50)
+        rime = self.indice.cerca('amore')[1]
+        self.assertEqual([r['word'] for r in rime if not r['perfect']], ['mare', 'cantare'])
+        self.assertTrue(all(r['perfect'] for r in rime[:4]))
+
+    def test_suoni_di_un_carattere(self):
+        # 'à' rima solo con 'à', non con 'ittà'
+        self.assertEqual(self.cerca('là'), rime_a_forza_bruta(PAROLE, 'là'))
+        self.assertEqual(self.cerca('blu'), ['tu'])
+
+    def test_limit_e_min_count(self):
+        self.assertEqual(self.cerca('amore', limit=2), ['cuore', 'fiore'])
+        self.assertEqual(self.cerca('amore', min_count=3), ['cuore', 'fiore'])
+        self.indice.aggiungi_parola('vapore', 0)
+        self.assertNotIn('vapore', self.cerca('amore'))
+        self.assertIn('vapore', self.cerca('amore', min_count=0))
+
+    def test_occorrenze_sommate(self):
+        self.indice.aggiungi_parola('dolore', 9)
+        self.assertEqual(self.cerca('amore')[0], 'dolore')
+        self.assertEqual(len(self.indice), len(PAROLE))
+
+    def test_parola_senza_suono(self):
+        self.assertEqual(self.indice.cerca(''), ('', []))
+        self.assertEqual(self.indice.cerca('   '), ('', []))
+
+    def test_aggiungi_testo(self):
+        indice = IndiceRime()
+        indice.aggiungi_testo("L'amore e il cuore\nnell'ora del fiore, amore")
+        rime = {r['word']: r['count'] for r in indice.cerca('dolore')[1]}
+        self.assertEqual(rime, {'amore': 2, 'cuore': 1, 'fiore': 1})
+        # Elisioni divise nelle loro parti, parole di una lettera escluse
+        self.assertEqual([r['word'] for r in indice.cerca('dimora')[1]], ['ora'])
+        self.assertEqual([r['word'] for r in indice.cerca('bel')[1]], ['del', 'nel'])
+        self.assertEqual(len(indice), 7)
+
+
+class TestApiRime(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = app.test_client()
+        with app.app_context():
+            db.create_all()
+
+    def setUp(self):
+        self.aggiungi("Il mio cuore\nè un fiore", "sera di dolore")
+        self.azzera_indice()
+
+    def tearDown(self):
+        self.attendi_sincronizzazione()
+        with app.app_context():
+            Poem.query.delete()
+            db.session.commit()
+        self.azzera_indice()
+
+    def azzera_indice(self):
+        api._indice_rime = None
+        api._indice_rime_sync = 0.0
+
+    def aggiungi(self, *testi):
+        with app.app_context():
+            for testo in testi:
+                db.session.add(Poem(title='Titolo', content=testo, author='Autore', verse_count=1,
+                                    syllable_counts='1'))
+            db.session.commit()
+
+    def attendi_sincronizzazione(self):
+        for thread in threading.enumerate():
+            if thread.name == 'sync-indice-rime':
+                thread.join(5)
+        scadenza = time.monotonic() + 5
+        while api._indice_rime_sync_lock.locked() and time.monotonic() < scadenza:
+            time.sleep(0.001)
+
+    def rime(self, parola, **parametri):
+        risposta = self.client.get('/api/rhymes', query_string={'word': parola, **parametri})
+        self.assertEqual(risposta.status_code, 200, risposta.get_data(as_text=True))
+        return risposta.get_json()
+
+    def parole_in_rima(self, parola):
+        return [r['word'] for r in self.rime(parola)['rhymes']]
+
+    def test_prima_costruzione_in_background(self):
+        risposta = self.client.get('/api/rhymes?word=amore')
+        if risposta.status_code == 503:
+            self.assertEqual(risposta.get_json()['error_type'], 'index_building')
+            self.assertEqual(risposta.headers['Retry-After'], '2')
+        self.attendi_sincronizzazione()
+        dati = self.rime('amore')
+        self.assertFalse(dati['error'])
+        self.assertEqual(dati['sound'], 'ore')
+        self.assertEqual([r['word'] for r in dati['rhymes']], ['cuore', 'dolore', 'fiore'])
+
+    def costruisci(self):
+        self.client.get('/api/rhymes?word=amore')
+        self.attendi_sincronizzazione()
+        self.assertIsNotNone(api._indice_rime)
+
+    def forza_sincronizzazione(self):
+        api._indice_rime_sync = 0.0
+        self.client.get('/api/rhymes?word=amore')
+        self.attendi_sincronizzazione()
+
+    def test_nuove_poesie(self):
+        self.costruisci()
+        indice = api._indice_rime
+        self.aggiungi("cantando il tremore")
+        self.forza_sincronizzazione()
+        # Le poesie nuove sono aggiunte allo stesso indice
+        self.assertIs(api._indice_rime, indice)
+        self.assertIn('tremore', self.parole_in_rima('amore'))
+
+    def test_poesie_cancellate(self):
+        self.costruisci()
+        indice = api._indice_rime
+        with app.app_context():
+            Poem.query.filter(Poem.content.like('%dolore%')).delete(synchronize_session=False)
+            db.session.commit()
+        self.forza_sincronizzazione()
+        self.assertIsNot(api._indice_rime, indice)
+        self.assertEqual(self.parole_in_rima('amore'), ['cuore', 'fiore'])
+
+    def test_ricostruzione_periodica(self):
+        # Un testo modificato mantiene il numero di poesie: lo raccoglie la ricostruzione
+        self.costruisci()
+        with app.app_context():
+            poesia = Poem.query.filter(Poem.content.like('%dolore%')).one()
+            poesia.content = 'sera di rancore'
+            db.session.commit()
+        api._indice_rime_costruito -= api.INTERVALLO_RICOSTRUZIONE_RIME + 1
+        self.forza_sincronizzazione()
+        self.assertEqual(self.parole_in_rima('amore'), ['cuore', 'fiore', 'rancore'])
+
+    def test_pubblicazione(self):
+        self.costruisci()
+        risposta = self.client.post('/api/pubblica', json={
+            'testo': "Vecchio stagno\nuna rana si tuffa\nrumore d'acqua", 'autore': 'Bashō'})
+        self.assertTrue(risposta.get_json().get('success'), risposta.get_json())
+        self.attendi_sincronizzazione()
+        self.assertIn('rumore', self.parole_in_rima('amore'))
+
+    def test_parametri(self):
+        self.costruisci()
+        self.assertEqual(self.client.get('/api/rhymes').status_code, 400)
+        self.assertEqual(self.client.get('/api/rhymes?word=' + 'a' * 51).status_code, 400)
+        dati = self.rime('amore', limit=1, min_count=-3)
+        self.assertEqual((dati['limit'], dati['min_count']), (1, 0))
+        self.assertEqual(len(dati['rhymes']), 1)
+        self.assertEqual(self.rime('amore', limit=10**6)['limit'], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,276 @@
+"""Cache condivisa su SQLite (utils.shared_cache): CacheSQLite, CacheDueLivelli e crea_cache"""
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from typing import NamedTuple
+from unittest import mock
+
+from tests.test_cache import OrologioFinto
+from utils import shared_cache
+from utils.cache import LRUCache
+from utils.shared_cache import (
+    INTERVALLO_ACCESSO, INTERVALLO_GENERAZIONE, INTERVALLO_POTATURA,
+    CacheDueLivelli, CacheSQLite, crea_cache, directory_privata, versione_codice,
+)
+
+
+class Coppia(NamedTuple):
+    testo: str
+    numero: int
+
+
+class ConCartella(unittest.TestCase):
+    """Ogni test ha una directory privata per il file della cache"""
+
+    def setUp(self):
+        self.cartella = tempfile.mkdtemp()
+        self.percorso = os.path.join(self.cartella, 'cache', 'condivisa.sqlite3')
+        self.addCleanup(shutil.rmtree, self.cartella)
+
+    def apri(self, tabella='prova', **kwargs):
+        return CacheSQLite(self.percorso, tabella, **kwargs)
+
+    def accesso(self, cache, chiave):
+        conn = sqlite3.connect(self.percorso)
+        try:
+            return conn.execute(f'SELECT accesso FROM {cache.tabella} WHERE chiave = ?', (chiave,)).fetchone()[0]
+        finally:
+            conn.close()
+
+
+class TestCacheSQLite(ConCartella):
+
+    def test_get_set_e_codifica(self):
+        cache = self.apri(codifica=list, decodifica=lambda dati: Coppia(*dati))
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', 0), 0)
+        cache.set('a', Coppia('verso', 7))
+        self.assertEqual(cache.get('a'), Coppia('verso', 7))
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (1, 2, 1))
+
+    def test_condivisa_tra_istanze(self):
+        prima, seconda = self.apri(), self.apri()
+        prima.set('parola', 3)
+        self.assertEqual(seconda.get('parola'), 3)
+
+    def test_hit_senza_scrittura(self):
+        cache = self.apri()
+        orologio = OrologioFinto()
+        with mock.patch('utils.shared_cache.time.time', orologio):
+            cache.set('a', 1)
+            orologio.adesso += INTERVALLO_ACCESSO / 2
+            self.assertEqual(cache.get('a'), 1)
+            self.assertEqual(self.accesso(cache, 'a'), 1000.0)
+            orologio.adesso += INTERVALLO_ACCESSO
+            self.assertEqual(cache.get('a'), 1)
+            self.assertEqual(self.accesso(cache, 'a'), orologio.adesso)
+
+    def test_hit_con_database_bloccato(self):
+        cache = self.apri()
+        cache.set('a', 1)
+        conn = sqlite3.connect(self.percorso, isolation_level=None)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.assertEqual(cache.get('a'), 1)
+        finally:
+            conn.execute('ROLLBACK')
+            conn.close()
+        self.assertEqual(cache.errors, 0)
+
+    def test_scadenza(self):
+        cache = self.apri(ttl=10)
+        orologio = OrologioFinto()
+        with mock.patch('utils.shared_cache.time.time', orologio):
+            cache.set('a', 1)
+            orologio.adesso += 9
+            self.assertEqual(cache.get('a'), 1)
+            orologio.adesso += 2
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_potatura_meno_recenti(self):
+        cache = self.apri(maxsize=4)
+        orologio = OrologioFinto()
+        with mock.patch('utils.shared_cache.time.time', orologio):
+            cache.set('tenuta', 0)
+            for i in range(INTERVALLO_POTATURA - 1):
+                orologio.adesso += 1
+                cache.set(i, i)
+                if i == INTERVALLO_POTATURA - 5:
+                    # Letta dopo INTERVALLO_ACCESSO: torna tra le più recenti
+                    orologio.adesso += INTERVALLO_ACCESSO
+                    self.assertEqual(cache.get('tenuta'), 0)
+        self.assertEqual(len(cache), 4)
+        self.assertEqual(cache.get('tenuta'), 0)
+        self.assertIsNone(cache.get(0))
+        self.assertEqual(cache.get(INTERVALLO_POTATURA - 2), INTERVALLO_POTATURA - 2)
+
+    def test_resize(self):
+        cache = self.apri(maxsize=10)
+        for i in range(5):
+            cache.set(i, i)
+        cache.resize(2)
+        self.assertEqual(len(cache), 2)
+
+    def test_maxsize_zero(self):
+        cache = self.apri(maxsize=0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+    def test_voce_illeggibile(self):
+        cache = self.apri(decodifica=lambda dati: Coppia(*dati))
+        cache.set('a', 'non una coppia')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual((cache.errors, len(cache)), (1, 0))
+
+    def test_valore_non_json(self):
+        cache = self.apri()
+        cache.set('a', object())
+        self.assertEqual((cache.errors, len(cache)), (1, 0))
+
+    def test_clear_e_generazione(self):
+        prima, seconda = self.apri(), self.apri()
+        self.assertEqual(prima.generazione(), 0)
+        prima.set('a', 1)
+        seconda.clear()
+        self.assertIsNone(prima.get('a'))
+        self.assertEqual((prima.generazione(), seconda.generazione()), (1, 1))
+        self.assertEqual(prima.hits + prima.misses, 1)
+
+    def test_nome_tabella(self):
+        with self.assertRaises(ValueError):
+            self.apri('prova; DROP TABLE x')
+
+
+class TestCacheDueLivelli(ConCartella):
+
+    def worker(self, maxsize=100):
+        return CacheDueLivelli(LRUCache(maxsize), self.apri(maxsize=maxsize))
+
+    def test_hit_locale_senza_disco(self):
+        cache = self.worker()
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual((cache.locale.hits, cache.condivisa.hits), (1, 0))
+
+    def test_altro_worker(self):
+        prima, seconda = self.worker(), self.worker()
+        prima.set('a', 1)
+        self.assertEqual(seconda.get('a'), 1)
+        self.assertEqual(seconda.get('a'), 1)
+        self.assertEqual((seconda.locale.hits, seconda.condivisa.hits), (1, 1))
+        stats = seconda.stats()
+        self.assertEqual((stats['backend'], stats['hits'], stats['misses']), ('memory+sqlite', 2, 0))
+
+    def test_clear_di_un_altro_worker(self):
+        orologio = OrologioFinto()
+        with mock.patch('utils.shared_cache.time.monotonic', orologio):
+            prima, seconda = self.worker(), self.worker()
+            prima.set('a', 1)
+            seconda.clear()
+            # Fino al prossimo controllo della generazione la copia locale resta
+            self.assertEqual(prima.get('a'), 1)
+            orologio.adesso += INTERVALLO_GENERAZIONE + 0.1
+            self.assertIsNone(prima.get('a'))
+            self.assertEqual(len(prima.locale), 0)
+
+    def test_clear_proprio(self):
+        cache = self.worker()
+        cache.set('a', 1)
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache._generazione, 1)
+
+
+class TestCreaCache(ConCartella):
+
+    def ambiente(self, backend='sqlite', percorso=None):
+        return mock.patch.dict(os.environ, {
+            'CACHE_BACKEND': backend, 'SHARED_CACHE_PATH': percorso or self.percorso,
+        })
+
+    def tabelle(self):
+        conn = sqlite3.connect(self.percorso)
+        try:
+            return {riga[0] for riga in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            conn.close()
+
+    def test_memoria(self):
+        with self.ambiente('memory'):
+            self.assertIsInstance(crea_cache('prova', 10), LRUCache)
+        with self.ambiente():
+            self.assertIsInstance(crea_cache('prova', 0), LRUCache)
+
+    def test_backend_non_valido(self):
+        with self.ambiente('redis'), self.assertRaises(ValueError):
+            crea_cache('prova', 10)
+
+    def test_sqlite_con_versione(self):
+        with self.ambiente():
+            cache = crea_cache('prova', 10, ttl=5)
+        self.assertIsInstance(cache, CacheDueLivelli)
+        self.assertEqual(cache.condivisa.tabella, f'prova_v{versione_codice()}')
+        self.assertEqual((cache.maxsize, cache.condivisa.ttl, cache.locale.ttl), (10, 5.0, 5.0))
+
+    def test_versioni_precedenti_eliminate(self):
+        vecchia = self.apri('prova_v00000000')
+        vecchia.set('a', 1)
+        vecchia.clear()
+        self.apri('altra_v00000000').set('b', 2)
+        with self.ambiente():
+            cache = crea_cache('prova', 10)
+        tabelle = self.tabelle()
+        self.assertIn(cache.condivisa.tabella, tabelle)
+        self.assertNotIn('prova_v00000000', tabelle)
+        self.assertIn('altra_v00000000', tabelle)
+        conn = sqlite3.connect(self.percorso)
+        try:
+            nomi = [riga[0] for riga in conn.execute('SELECT nome FROM cache_generazioni')]
+        finally:
+            conn.close()
+        self.assertNotIn('prova_v00000000', nomi)
+
+    def test_versione_cambia_con_i_sorgenti(self):
+        radice = os.path.join(self.cartella, 'progetto')
+        os.makedirs(os.path.join(radice, 'services'))
+        sorgente = os.path.join(radice, 'services', 'modulo.py')
+        with open(sorgente, 'w') as f:
+            f.write('A = 1\n')
+        with mock.patch.object(shared_cache, '_RADICE_PROGETTO', radice):
+            prima = versione_codice()
+            self.assertEqual(versione_codice(), prima)
+            with open(sorgente, 'w') as f:
+                f.write('A = 2\n')
+            self.assertNotEqual(versione_codice(), prima)
+
+    def test_ripiego_in_memoria(self):
+        pubblica = os.path.join(self.cartella, 'pubblica')
+        os.makedirs(pubblica, mode=0o755)
+        os.chmod(pubblica, 0o755)
+        with self.ambiente(percorso=os.path.join(pubblica, 'cache.sqlite3')), \
+                mock.patch('builtins.print'):
+            cache = crea_cache('prova', 10, ttl=5)
+        self.assertIsInstance(cache, LRUCache)
+        self.assertEqual((cache.maxsize, cache.ttl), (10, 5.0))
+
+    def test_ripiego_su_errore_sqlite(self):
+        with self.ambiente(), mock.patch.object(shared_cache.sqlite3, 'connect',
+                                                side_effect=sqlite3.OperationalError('bloccato')), \
+                mock.patch('builtins.print'):
+            self.assertIsInstance(crea_cache('prova', 10), LRUCache)
+
+    def test_directory_privata(self):
+        self.assertEqual(directory_privata(self.percorso), os.path.dirname(self.percorso))
+        self.assertEqual(os.stat(os.path.dirname(self.percorso)).st_mode & 0o777, 0o700)
+        os.chmod(os.path.dirname(self.percorso), 0o770)
+        with self.assertRaises(PermissionError):
+            directory_privata(self.percorso)
+
+
+if __name__ == '__main__':
+    unittest.main()
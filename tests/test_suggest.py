@@ -0,0 +1,152 @@
+"""Suggerimenti per sillabe e rima: IndiceMetrico (services.suggest_index) e /api/suggest"""
+import gc
+import os
+import random
+import tempfile
+import unittest
+
+import services.suggest_index as suggest_index
+from app import app
+from services.rhyme_analyzer import rhyme_key
+from services.suggest_index import IndiceMetrico, scrivi_indice_metrico
+from services.syllable_analyzer import conta_sillabe_singola
+
+CONTEGGI = {
+    'amore': 50, 'cuore': 40, 'fiore': 30, 'dolore': 20, 'ore': 5, 'splendore': 3,
+    'mare': 25, 'cantare': 10, 'sole': 15, 'parole': 8, 'città': 12, 'verità': 6,
+    'là': 4, 'blu': 2, 'virtù': 7, 'sera': 9, 'primavera': 11,
+}
+
+
+def righe_indice(voci):
+    """Righe del file come le scrive scrivi_indice_metrico, da (rima, sillabe, parola, occorrenze)"""
+    voci = sorted(voci, key=lambda v: (v[0].encode('utf-8'), v[1], -v[3], v[2]))
+    return ''.join(f"{r}\t{s:02d}\t{p}\t{n}\n" for r, s, p, n in voci)
+
+
+class TestIndiceMetrico(unittest.TestCase):
+
+    def setUp(self):
+        self.cartella = tempfile.TemporaryDirectory()
+        self.percorso = os.path.join(self.cartella.name, 'suggerimenti.tsv')
+
+    def tearDown(self):
+        gc.collect()
+        self.cartella.cleanup()
+
+    def apri(self, contenuto):
+        with open(self.percorso, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(contenuto)
+        indice = IndiceMetrico(self.percorso)
+        self.addCleanup(indice.close)
+        return indice
+
+    def test_ricerca_binaria_come_scansione(self):
+        rng = random.Random(7)
+        rime = ['a', 'à', 'are', 'ore', 'or', 'ora', 'ore2', 'ò', 'u', 'ù', 'zzz']
+        voci = [(rng.choice(rime), rng.randint(1, 12), f'parola{i}', rng.randint(1, 100)) for i in range(400)]
+        contenuto = righe_indice(voci)
+        for finale in ('\n', ''):
+            indice = self.apri(contenuto.rstrip('\n') + finale)
+            for rima in rime + ['', '0', 'o', 'orf', 'zzzz', '~']:
+                for sillabe in range(0, 14):
+                    with self.subTest(rima=rima, sillabe=sillabe, finale=repr(finale)):
+                        attese = sorted(((p, n) for r, s, p, n in voci if r == rima and s == sillabe),
+                                        key=lambda v: (-v[1], v[0]))
+                        self.assertEqual(indice.sezione(rima, sillabe, 1000), attese)
+                        self.assertEqual(indice.sezione(rima, sillabe, 2), attese[:2])
+
+    def test_bordi_del_file(self):
+        indice = self.apri(righe_indice([('aa', 1, 'prima', 1), ('mm', 2, 'mezzo', 1), ('zz', 3, 'ultima', 1)]))
+        self.assertEqual(indice.sezione('aa', 1, 5), [('prima', 1)])
+        self.assertEqual(indice.sezione('zz', 3, 5), [('ultima', 1)])
+        self.assertEqual(indice.sezione('a', 1, 5), [])      # prima di tutto
+        self.assertEqual(indice.sezione('zzz', 3, 5), [])    # dopo tutto
+        self.assertEqual(indice.sezione('mm', 1, 5), [])     # sezione vicina, sillabe diverse
+        self.assertEqual(indice.sezione('m', 2, 5), [])      # prefisso di una rima
+
+    def test_una_sola_riga(self):
+        indice = self.apri("ore\t02\tcuore\t3")
+        self.assertEqual(indice.sezione('ore', 2, 5), [('cuore', 3)])
+        self.assertEqual(indice.sezione('or', 2, 5), [])
+        self.assertEqual(indice.sezione('ore', 3, 5), [])
+
+    def test_suggerisci_per_frequenza(self):
+        indice = self.apri(righe_indice([
+            ('ore', 2, 'cuore', 40), ('ore', 3, 'amore', 50), ('ore', 3, 'dolore', 20),
+            ('ore', 4, 'splendore', 3), ('are', 2, 'mare', 25),
+        ]))
+        self.assertEqual(indice.suggerisci('ore', 2, 3), [
+            {'word': 'amore', 'syllables': 3, 'count': 50},
+            {'word': 'cuore', 'syllables': 2, 'count': 40},
+            {'word': 'dolore', 'syllables': 3, 'count': 20},
+        ])
+        self.assertEqual([s['word'] for s in indice.suggerisci('ore', 1, 9, limit=2)], ['amore', 'cuore'])
+        self.assertEqual(indice.suggerisci('ore', 5, 9), [])
+        self.assertEqual(indice.suggerisci('ore', 0, 2), indice.suggerisci('ore', 1, 2))
+
+    def test_scrittura(self):
+        self.assertEqual(scrivi_indice_metrico(dict(CONTEGGI, **{'a\tb': 1}), self.percorso), len(CONTEGGI))
+        indice = IndiceMetrico(self.percorso)
+        self.addCleanup(indice.close)
+        for parola, occorrenze in CONTEGGI.items():
+            with self.subTest(parola=parola):
+                sezione = indice.sezione(rhyme_key(parola), conta_sillabe_singola(parola), 100)
+                self.assertIn((parola, occorrenze), sezione)
+                # Ogni sezione è in ordine di frequenza decrescente
+                self.assertEqual(sezione, sorted(sezione, key=lambda v: (-v[1], v[0])))
+
+
+class TestApiSuggest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = app.test_client()
+
+    def setUp(self):
+        cartella = tempfile.TemporaryDirectory()
+        percorso = os.path.join(cartella.name, 'suggerimenti.tsv')
+        scrivi_indice_metrico(CONTEGGI, percorso)
+        stato = (suggest_index._indice, suggest_index._caricato)
+        suggest_index._indice, suggest_index._caricato = IndiceMetrico(percorso), True
+
+        def ripristina():
+            suggest_index._indice.close()
+            suggest_index._indice, suggest_index._caricato = stato
+            cartella.cleanup()
+        self.addCleanup(ripristina)
+
+    def suggerisci(self, **parametri):
+        risposta = self.client.get('/api/suggest', query_string=parametri)
+        return risposta.status_code, risposta.get_json()
+
+    def test_rima_e_sillabe(self):
+        status, dati = self.suggerisci(rhyme='-ore', syllables=3)
+        self.assertEqual(status, 200)
+        self.assertEqual((dati['rhyme'], dati['min_syllables'], dati['max_syllables']), ('ore', 3, 3))
+        self.assertEqual([s['word'] for s in dati['suggestions']], ['amore', 'dolore', 'splendore'])
+
+    def test_intervallo_e_parola(self):
+        status, dati = self.suggerisci(word='Tremore', min_syllables=1, max_syllables=3, limit=2)
+        self.assertEqual(status, 200)
+        self.assertEqual(dati['rhyme'], 'ore')
+        self.assertEqual([s['word'] for s in dati['suggestions']], ['amore', 'cuore'])
+
+    def test_parametri_non_validi(self):
+        for parametri in ({}, {'rhyme': 'x' * 21}, {'rhyme': 'ore', 'min_syllables': 0},
+                          {'rhyme': 'ore', 'min_syllables': 3, 'max_syllables': 2},
+                          {'rhyme': 'ore', 'min_syllables': 1, 'max_syllables': 12}):
+            with self.subTest(parametri=parametri):
+                self.assertEqual(self.suggerisci(**parametri)[0], 400)
+
+    def test_indice_assente(self):
+        indice = suggest_index._indice
+        suggest_index._indice = None
+        try:
+            self.assertEqual(self.suggerisci(rhyme='ore')[0], 503)
+        finally:
+            suggest_index._indice = indice
+
+
+if __name__ == '__main__':
+    unittest.main()
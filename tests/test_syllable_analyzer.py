@@ -0,0 +1,90 @@
+"""Il motore compilato (regex) deve contare come il ciclo originale"""
+import os
+import random
+import subprocess
+import sys
+import unittest
+
+from config.constants import (DIGRAMMI, DITTONGHI, ECCEZIONI, PREFISSI_COMUNI,
+                              TRIGRAMMI, TRITTONGHI, VOCALI)
+from services.syllable_analyzer import (MOTORI_SILLABE, conta_sillabe_algoritmo,
+                                        conta_sillabe_compilato)
+
+RADICE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAROLE = [
+    '', 'a', 'e', 'ai', 'aia', 'aiuola', 'aiuole', 'gnomo', 'sciare', 'scienza',
+    'uscio', 'guai', 'miei', 'tuoi', 'buoi', 'quiete', 'paura', 'poeta', 'maestro',
+    'riempire', 'reazione', 'biologia', 'antiorario', 'sovrumano', 'preavviso',
+    'coabitare', 'città', 'perché', 'più', 'già', 'può', 'ciò', 'sì', 'tribù',
+    'xilofono', 'yogurt', 'jazz', 'wafer', 'kiwi', 'bcd', 'zzz',
+]
+
+
+def parole_casuali(quante, seme=20240501):
+    """Parole inventate che mescolano vocali accentate, dittonghi, trittonghi,
+    digrammi, trigrammi e prefissi, dove le due implementazioni possono divergere"""
+    rng = random.Random(seme)
+    pezzi = (list(VOCALI) + sorted(DITTONGHI) + sorted(TRITTONGHI)
+             + sorted(DIGRAMMI) + sorted(TRIGRAMMI) + list('bcdfglmnpqrstvzhjkwxy'))
+    prefissi = sorted(PREFISSI_COMUNI)
+    parole = []
+    for _ in range(quante):
+        parola = ''.join(rng.choice(pezzi) for _ in range(rng.randint(1, 6)))
+        if rng.random() < 0.3:
+            parola = rng.choice(prefissi) + parola
+        parole.append(parola)
+    return parole
+
+
+class TestMotoreCompilato(unittest.TestCase):
+
+    def assert_stesso_conteggio(self, parole):
+        for parola in parole:
+            with self.subTest(parola=parola):
+                self.assertEqual(conta_sillabe_compilato(parola), conta_sillabe_algoritmo(parola))
+
+    def test_parole_di_esempio(self):
+        self.assert_stesso_conteggio(PAROLE)
+
+    def test_eccezioni_e_tabelle(self):
+        self.assert_stesso_conteggio(sorted(ECCEZIONI))
+        self.assert_stesso_conteggio(sorted(DITTONGHI | TRITTONGHI | DIGRAMMI | TRIGRAMMI))
+        self.assert_stesso_conteggio(sorted(PREFISSI_COMUNI))
+
+    def test_parole_casuali(self):
+        diverse = [p for p in parole_casuali(20000)
+                   if conta_sillabe_compilato(p) != conta_sillabe_algoritmo(p)]
+        self.assertEqual(diverse, [])
+
+    def test_maiuscole(self):
+        self.assert_stesso_conteggio([p.upper() for p in PAROLE] + [p.title() for p in PAROLE])
+
+    def test_motori_registrati(self):
+        self.assertIs(MOTORI_SILLABE['algoritmo'], conta_sillabe_algoritmo)
+        self.assertIs(MOTORI_SILLABE['compilato'], conta_sillabe_compilato)
+
+
+class TestMotoreDaAmbiente(unittest.TestCase):
+    """SYLLABLE_ENGINE è letto all'import: si verifica in un processo separato"""
+
+    def importa_con_motore(self, motore):
+        ambiente = dict(os.environ, SYLLABLE_ENGINE=motore)
+        return subprocess.run(
+            [sys.executable, '-c',
+             'import services.syllable_analyzer as s; print(s.MOTORE_SILLABE, s.conta_sillabe_motore.__name__)'],
+            cwd=RADICE, env=ambiente, capture_output=True, text=True)
+
+    def test_motore_valido(self):
+        esito = self.importa_con_motore(' Algoritmo ')
+        self.assertEqual(esito.returncode, 0, esito.stderr)
+        self.assertEqual(esito.stdout.split()[-2:], ['algoritmo', 'conta_sillabe_algoritmo'])
+
+    def test_motore_non_valido(self):
+        esito = self.importa_con_motore('compilatoo')
+        self.assertNotEqual(esito.returncode, 0)
+        self.assertIn('SYLLABLE_ENGINE non valido', esito.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
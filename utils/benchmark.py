@@ -0,0 +1,305 @@
+"""Micro-benchmark e verifiche di equivalenza per l'analizzatore.
+
+Uso:
+    python -m utils.benchmark [--ripetizioni N] sillabe
+    python -m utils.benchmark [--ripetizioni N] prefissi
+    python -m utils.benchmark [--ripetizioni N] elisioni
+    python -m utils.benchmark [--ripetizioni N] parallelo
+    python -m utils.benchmark [--ripetizioni N] rime
+    python -m utils.benchmark [--ripetizioni N] modifica
+"""
+import argparse
+import sys
+import timeit
+
+from config.constants import PREFISSI_COMUNI, VOCALI_DEBOLI, VOCALI_FORTI
+
+# Corpus di riferimento: versi italiani con dittonghi, trittonghi, iati,
+# digrammi/trigrammi, prefissi ed elisioni.
+CORPUS_RIFERIMENTO = [
+    "Nel mezzo del cammin di nostra vita",
+    "mi ritrovai per una selva oscura",
+    "ché la diritta via era smarrita.",
+    "Ahi quanto a dir qual era è cosa dura",
+    "esta selva selvaggia e aspra e forte",
+    "che nel pensier rinova la paura!",
+    "Solo e pensoso i più deserti campi",
+    "vo mesurando a passi tardi e lenti",
+    "Tanto gentile e tanto onesta pare",
+    "la donna mia quand'ella altrui saluta",
+    "Sempre caro mi fu quest'ermo colle",
+    "e questa siepe, che da tanta parte",
+    "dell'ultimo orizzonte il guardo esclude.",
+    "Il lampo dell'aiuola, l'aiuto del guerriero",
+    "scienza coscienza sciame ascia fascio lasciare",
+    "gnomo sogno bagnato scena uscire pesce",
+    "quieto quiete aiuole buoi miei tuoi suoi",
+    "riaprire preavviso antieroe coautore reinventare",
+    "triennale biennio uniamo riusare bioetica",
+    "paura pausa aereo poeta teatro beato",
+    "un'amica sull'erba all'alba nell'acqua",
+    "guaio guaina acquaio gioia noia vuoi",
+]
+
+PAROLE_EXTRA = [
+    "a", "e", "io", "ai", "eu", "uia", "iuo", "aiuola", "ghiaccio",
+    "sciocco", "scialle", "gnocchi", "ognuno", "micro|onda", "ri|apre",
+    "qu", "x", "", "àèìòù", "pioggia", "figliuolo", "cuoio",
+]
+
+
+def _parole_corpus():
+    from utils.text_processing import pulisci_testo, gestisci_apostrofi
+    parole = []
+    for verso in CORPUS_RIFERIMENTO:
+        for parola in pulisci_testo(verso).split():
+            parole.extend(p for p in gestisci_apostrofi(parola) if p)
+    return parole + PAROLE_EXTRA
+
+
+def bench_sillabe(ripetizioni):
+    """Confronta il ciclo originale con il motore precompilato"""
+    from services.syllable_analyzer import conta_sillabe_algoritmo, conta_sillabe_compilato
+
+    parole = _parole_corpus()
+    differenze = [
+        (p, conta_sillabe_algoritmo(p), conta_sillabe_compilato(p))
+        for p in parole
+        if conta_sillabe_algoritmo(p) != conta_sillabe_compilato(p)
+    ]
+    for parola, atteso, ottenuto in differenze:
+        print(f"❌ '{parola}': algoritmo={atteso} compilato={ottenuto}")
+    print(f"Parole verificate: {len(parole)}, differenze: {len(differenze)}")
+
+    for nome, funzione in (("algoritmo", conta_sillabe_algoritmo), ("compilato", conta_sillabe_compilato)):
+        t = timeit.timeit(lambda: [funzione(p) for p in parole], number=ripetizioni)
+        print(f"{nome:>10}: {t / (ripetizioni * len(parole)) * 1e6:.2f} µs/parola")
+
+    return 1 if differenze else 0
+
+
+def _prefissi_lineare(parola):
+    """Versione precedente di gestisci_prefissi_vocalici (scansione del set)"""
+    parola_lower = parola.lower()
+    for prefisso in PREFISSI_COMUNI:
+        if parola_lower.startswith(prefisso):
+            resto_parola = parola_lower[len(prefisso):]
+            if (prefisso[-1] in VOCALI_DEBOLI and resto_parola and
+                    resto_parola[0] in VOCALI_FORTI):
+                return prefisso + "|" + resto_parola
+    return parola_lower
+
+
+def bench_prefissi(ripetizioni):
+    """Costo per parola di gestisci_prefissi_vocalici: set lineare vs trie"""
+    from utils.text_processing import gestisci_prefissi_vocalici
+
+    parole = _parole_corpus()
+    differenze = [p for p in parole if _prefissi_lineare(p) != gestisci_prefissi_vocalici(p)]
+    for parola in differenze:
+        print(f"❌ '{parola}': lineare={_prefissi_lineare(parola)} trie={gestisci_prefissi_vocalici(parola)}")
+    print(f"Parole verificate: {len(parole)}, differenze: {len(differenze)}")
+
+    for nome, funzione in (("lineare", _prefissi_lineare), ("trie", gestisci_prefissi_vocalici)):
+        t = timeit.timeit(lambda: [funzione(p) for p in parole], number=ripetizioni)
+        print(f"{nome:>10}: {t / (ripetizioni * len(parole)) * 1e6:.2f} µs/parola")
+
+    return 1 if differenze else 0
+
+
+TESTO_ELISIONI = (
+    "dell'alba nell'acqua all'ombra dall'alto sull'erba coll'arco quell'uomo "
+    "quest'anno sant'antonio un'amica l'amore d'amore c'era m'illumino "
+    "dell’infinito l’eco un’ora nell’aria sull’onda po' s'è t'amo"
+)
+
+
+def _apostrofi_dizionario(parola):
+    """Versione precedente di gestisci_apostrofi (dizionario ricostruito a ogni chiamata)"""
+    if "'" not in parola:
+        return [parola]
+    contrazioni = {
+        "dell'": ("del", "l'"), "nell'": ("nel", "l'"), "all'": ("al", "l'"),
+        "dall'": ("dal", "l'"), "sull'": ("sul", "l'"), "coll'": ("col", "l'"),
+        "quell'": ("quel", "l'"), "quest'": ("quest", ""), "sant'": ("sant", ""),
+        "un'": ("un", ""), "l'": ("", "l'"),
+    }
+    parola_lower = parola.lower()
+    for contrazione, (prima, dopo) in contrazioni.items():
+        if parola_lower.startswith(contrazione):
+            resto = parola_lower[len(contrazione):]
+            return [p for p in (prima, dopo, resto) if p]
+    risultato = [parte.strip() for parte in parola.split("'") if parte.strip()]
+    return risultato if risultato else [parola]
+
+
+def bench_elisioni(ripetizioni):
+    """Throughput di gestisci_apostrofi su testo ricco di elisioni"""
+    from utils.text_processing import gestisci_apostrofi
+
+    parole = TESTO_ELISIONI.split()
+    dritte = [p.replace("’", "'") for p in parole]
+    differenze = [p for p in dritte if tuple(_apostrofi_dizionario(p)) != gestisci_apostrofi(p)]
+    differenze += [p for p, d in zip(parole, dritte) if gestisci_apostrofi(p) != gestisci_apostrofi(d)]
+    for parola in differenze:
+        print(f"❌ '{parola}': dizionario={_apostrofi_dizionario(parola)} regex={gestisci_apostrofi(parola)}")
+    print(f"Parole verificate: {len(parole)}, differenze: {len(differenze)}")
+
+    for nome, funzione, dati in (
+        ("dizionario", _apostrofi_dizionario, dritte),
+        ("regex", gestisci_apostrofi, parole),
+    ):
+        t = timeit.timeit(lambda: [funzione(p) for p in dati], number=ripetizioni)
+        print(f"{nome:>10}: {ripetizioni * len(dati) / t / 1e6:.2f} M parole/s")
+
+    return 1 if differenze else 0
+
+
+def _poesie_sintetiche(n):
+    """n poesie di 3-14 versi ricombinando il corpus di riferimento"""
+    poesie = []
+    for i in range(n):
+        lunghezza = (3, 4, 5, 8, 14)[i % 5]
+        poesie.append("\n".join(
+            CORPUS_RIFERIMENTO[(i * 7 + j) % len(CORPUS_RIFERIMENTO)] for j in range(lunghezza)
+        ))
+    return poesie
+
+
+def bench_parallelo(ripetizioni):
+    """Analisi seriale vs EsecutoreAnalisi (ripetizioni = numero di poesie / 10).
+
+    Le due parti eseguono lo stesso lavoro: analizza_poesie_batch (senza la
+    cache dei versi) partendo da una cache delle parole scaldata come quella
+    dei worker, qui in un solo processo, là a blocchi su più processi.
+    """
+    import json
+    import time
+    from services.executor import EsecutoreAnalisi, _inizializza_worker
+    from services.poetry_analyzer import analizza_poesie_batch
+    from services.syllable_analyzer import invalida_cache_sillabe
+
+    poesie = _poesie_sintetiche(ripetizioni * 10)
+
+    invalida_cache_sillabe()
+    _inizializza_worker()
+    inizio = time.perf_counter()
+    seriale = analizza_poesie_batch(poesie)
+    t_seriale = time.perf_counter() - inizio
+
+    with EsecutoreAnalisi() as esecutore:
+        esecutore.analizza(poesie[:esecutore.workers * 2])  # avvio dei worker
+        inizio = time.perf_counter()
+        parallelo = esecutore.analizza(poesie)
+        t_parallelo = time.perf_counter() - inizio
+        workers = esecutore.workers
+
+    identici = json.dumps(seriale, sort_keys=True) == json.dumps(parallelo, sort_keys=True)
+    print(f"Poesie: {len(poesie)}, worker: {workers}, risultati identici: {'sì' if identici else 'NO'}")
+    if workers < 2:
+        print("⚠️  Un solo worker (ANALYSIS_WORKERS o CPU): il confronto non misura il parallelismo")
+    print(f"  seriale: {t_seriale:.2f} s")
+    print(f"parallelo: {t_parallelo:.2f} s ({t_seriale / t_parallelo:.1f}x)")
+    return 0 if identici else 1
+
+
+def _raggruppa_a_coppie(suoni_finali):
+    """Versione precedente di raggruppa_rime (confronto con ogni suono di ogni gruppo)"""
+    from services.rhyme_analyzer import suoni_rimano
+    gruppi_rime = {}
+    schema_lettere = []
+    lettera_corrente = 'A'
+    for suono in suoni_finali:
+        if not suono:
+            schema_lettere.append('-')
+            continue
+        for lettera, gruppo_suoni in gruppi_rime.items():
+            if any(suoni_rimano(suono, s) for s in gruppo_suoni):
+                schema_lettere.append(lettera)
+                gruppo_suoni.append(suono)
+                break
+        else:
+            gruppi_rime[lettera_corrente] = [suono]
+            schema_lettere.append(lettera_corrente)
+            lettera_corrente = chr(ord(lettera_corrente) + 1)
+    return {"schema": "".join(schema_lettere), "rime": gruppi_rime, "suoni_finali": suoni_finali}
+
+
+def bench_rime(ripetizioni):
+    """Raggruppamento rime su input sintetici da 500 versi: a coppie vs indice hash"""
+    import random
+    from services.rhyme_analyzer import raggruppa_rime
+
+    generatore = random.Random(42)
+    lettere = "abcdefghilmnoprstuvzàèìòù"
+    casi = [
+        # Molti suoni distinti (caso peggiore per il confronto a coppie)
+        ["".join(generatore.choice(lettere) for _ in range(generatore.randint(1, 5))) for _ in range(500)],
+        # Poche rime ripetute (come una sequenza di sonetti)
+        [generatore.choice(["ore", "ento", "ale", "ia", "one", "ata", "ire"]) for _ in range(500)],
+    ]
+    differenze = sum(_raggruppa_a_coppie(c) != raggruppa_rime(c) for c in casi)
+    print(f"Casi verificati: {len(casi)}, differenze: {differenze}")
+
+    numero = max(1, ripetizioni // 20)
+    for nome, funzione in (("coppie", _raggruppa_a_coppie), ("hash", raggruppa_rime)):
+        t = timeit.timeit(lambda: [funzione(c) for c in casi], number=numero)
+        print(f"{nome:>10}: {t / (numero * len(casi)) * 1e3:.3f} ms per 500 versi")
+
+    return 1 if differenze else 0
+
+
+def bench_modifica(ripetizioni):
+    """Sonetto con un verso modificato a ogni analisi: senza vs con cache dei versi"""
+    from services.poetry_analyzer import analizza_poesia_completa, analizza_versi_tokenizzati, cache_versi
+    from services.tokenizer import tokenizza_testo
+
+    sonetto = CORPUS_RIFERIMENTO[:14]
+    varianti = []
+    for i in range(ripetizioni):
+        versi = list(sonetto)
+        versi[i % 14] = f"{PAROLE_EXTRA[i % len(PAROLE_EXTRA)]} verso numero {i}"
+        varianti.append("\n".join(versi))
+
+    differenze = sum(
+        analizza_poesia_completa(v) != analizza_versi_tokenizzati(tokenizza_testo(v))
+        for v in varianti[:50]
+    )
+    print(f"Varianti verificate: {min(50, len(varianti))}, differenze: {differenze}")
+
+    cache_versi.clear()
+    for nome, funzione in (
+        ("completa", lambda v: analizza_versi_tokenizzati(tokenizza_testo(v))),
+        ("versi", analizza_poesia_completa),
+    ):
+        t = timeit.timeit(lambda: [funzione(v) for v in varianti], number=1)
+        print(f"{nome:>10}: {t / len(varianti) * 1e6:.0f} µs per modifica")
+
+    return 1 if differenze else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dell'analizzatore poetico")
+    parser.add_argument("--ripetizioni", type=int, default=200, help="Ripetizioni per misura")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("sillabe", help="Motore sillabe: equivalenza e tempo per parola")
+    sub.add_parser("prefissi", help="Prefissi vocalici: set lineare vs trie")
+    sub.add_parser("elisioni", help="Apostrofi/elisioni: dizionario per chiamata vs regex precompilata")
+    sub.add_parser("parallelo", help="Analisi seriale vs pool di processi")
+    sub.add_parser("rime", help="Raggruppamento rime su 500 versi: a coppie vs indice hash")
+    sub.add_parser("modifica", help="Sonetto modificato un verso alla volta: con e senza cache dei versi")
+
+    args = parser.parse_args()
+    comandi = {
+        "sillabe": bench_sillabe,
+        "prefissi": bench_prefissi,
+        "elisioni": bench_elisioni,
+        "parallelo": bench_parallelo,
+        "rime": bench_rime,
+        "modifica": bench_modifica,
+    }
+    return comandi[args.comando](args.ripetizioni)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
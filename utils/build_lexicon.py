@@ -0,0 +1,54 @@
+"""Costruisce il file binario del lessico (services/lexicon.py).
+
+Ogni riga del file sorgente contiene una parola, opzionalmente seguita da
+tab/spazio e dal numero esatto di sillabe. Senza conteggio viene usato
+l'analizzatore (eccezioni + algoritmo), la chiave di rima è sempre quella di
+estrai_suono_finale.
+
+Uso:
+    python -m utils.build_lexicon parole.txt [altre.txt ...] -o data/lessico.bin
+"""
+import argparse
+import sys
+
+
+def leggi_voci(percorsi):
+    from services.syllable_analyzer import ECCEZIONI, conta_sillabe_motore as conta
+    from services.rhyme_analyzer import estrai_suono_finale
+
+    for percorso in percorsi:
+        with open(percorso, encoding='utf-8') as f:
+            for riga in f:
+                campi = riga.split()
+                if not campi or campi[0].startswith('#'):
+                    continue
+                parola = campi[0].strip().lower()
+                if len(campi) > 1 and campi[1].isdigit():
+                    sillabe = int(campi[1])
+                else:
+                    sillabe = ECCEZIONI.get(parola) or conta(parola)
+                yield parola, sillabe, estrai_suono_finale(parola)
+
+
+def main():
+    from services.lexicon import PERCORSO_PREDEFINITO, scrivi_lessico, Lessico
+
+    parser = argparse.ArgumentParser(description="Build the mmap syllable lexicon")
+    parser.add_argument("sorgenti", nargs="+", help="Word list files (word [syllables] per line)")
+    parser.add_argument("-o", "--output", default=PERCORSO_PREDEFINITO, help="Output .bin path")
+    args = parser.parse_args()
+
+    try:
+        n = scrivi_lessico(leggi_voci(args.sorgenti), args.output)
+    except OSError as e:
+        print(f"Errore: {e}")
+        return 2
+
+    lessico = Lessico(args.output)
+    print(f"✅ Lessico scritto in {args.output}: {n} voci, {lessico.n_slot} slot")
+    lessico.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Costruisce l'indice metrico per /api/suggest (services/suggest_index.py).
+
+Le parole possono arrivare da liste (una parola per riga, opzionalmente
+seguita dal numero di occorrenze) e/o dalla tabella poems (--db).
+
+Uso:
+    python -m utils.build_suggest_index [parole.txt ...] [--db] -o data/suggerimenti.tsv
+"""
+import argparse
+import sys
+from collections import Counter
+
+
+def conta_da_liste(percorsi, conteggi):
+    for percorso in percorsi:
+        with open(percorso, encoding='utf-8') as f:
+            for riga in f:
+                campi = riga.split()
+                if not campi or campi[0].startswith('#'):
+                    continue
+                occorrenze = int(campi[1]) if len(campi) > 1 and campi[1].isdigit() else 1
+                conteggi[campi[0].strip().lower()] += occorrenze
+
+
+def conta_da_db(conteggi):
+    # Importi dentro al contesto app per usare la stessa config DB dell'istanza
+    from app import app
+    from models.poem import Poem, db
+    from services.tokenizer import tokenizza_testo
+
+    with app.app_context():
+        for (content,) in db.session.query(Poem.content).yield_per(500):
+            for verso in tokenizza_testo(content or ''):
+                for parti in verso.parti:
+                    for parte in parti:
+                        if "'" not in parte and len(parte) > 1:
+                            conteggi[parte] += 1
+
+
+def main():
+    from services.suggest_index import PERCORSO_PREDEFINITO, scrivi_indice_metrico
+
+    parser = argparse.ArgumentParser(description="Build the syllable/rhyme suggestion index")
+    parser.add_argument("sorgenti", nargs="*", help="Word list files (word [count] per line)")
+    parser.add_argument("--db", action="store_true", help="Also index words from the poems table")
+    parser.add_argument("-o", "--output", default=PERCORSO_PREDEFINITO, help="Output .tsv path")
+    args = parser.parse_args()
+
+    if not args.sorgenti and not args.db:
+        parser.error("specificare almeno un file di parole o --db")
+
+    conteggi = Counter()
+    try:
+        conta_da_liste(args.sorgenti, conteggi)
+        if args.db:
+            conta_da_db(conteggi)
+        n = scrivi_indice_metrico(conteggi, args.output)
+    except Exception as e:
+        print(f"Errore: {e}")
+        return 2
+
+    print(f"✅ Indice metrico scritto in {args.output}: {n} parole")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Cache in-process con limite di dimensione, scadenza opzionale e contatori di hit/miss/eviction."""
+import threading
+import time
+from collections import OrderedDict
+
+_MANCANTE = object()
+
+
+class LRUCache:
+    """Cache LRU thread-safe.
+
+    maxsize=0 disabilita la cache (ogni get è un miss, set non memorizza).
+    ttl (secondi) fa scadere le voci: una voce scaduta conta come miss.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl) if ttl else None
+        self._dati = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            valore = self._dati.get(key, _MANCANTE)
+            if valore is _MANCANTE:
+                self.misses += 1
+                return default
+            if self.ttl is not None:
+                # Con ttl le voci sono coppie (scadenza, valore)
+                scadenza, valore = valore
+                if scadenza <= time.monotonic():
+                    del self._dati[key]
+                    self.expirations += 1
+                    self.misses += 1
+                    return default
+            self._dati.move_to_end(key)
+            self.hits += 1
+            return valore
+
+    def set(self, key, value):
+        if not self.maxsize:
+            return
+        if self.ttl is not None:
+            value = (time.monotonic() + self.ttl, value)
+        with self._lock:
+            self._dati[key] = value
+            self._dati.move_to_end(key)
+            while len(self._dati) > self.maxsize:
+                self._dati.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Svuota la cache mantenendo i contatori"""
+        with self._lock:
+            self._dati.clear()
+
+    def resize(self, maxsize):
+        """Cambia il limite, scartando le voci meno recenti se necessario"""
+        with self._lock:
+            self.maxsize = max(0, int(maxsize))
+            while len(self._dati) > self.maxsize:
+                self._dati.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._dati)
+
+    def stats(self):
+        """Restituisce i contatori in forma serializzabile (es. per jsonify)"""
+        totale = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': len(self._dati),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hit_rate': round(self.hits / totale, 4) if totale else 0.0,
+        }
+
+
+class _Chiamata:
+    __slots__ = ('evento', 'risultato', 'errore')
+
+    def __init__(self):
+        self.evento = threading.Event()
+        self.risultato = None
+        self.errore = None
+
+
+class SingleFlight:
+    """Coalescenza di chiamate concorrenti con la stessa chiave.
+
+    Il primo thread che chiede una chiave esegue la funzione; quelli che
+    arrivano mentre è in corso aspettano e ricevono lo stesso risultato (o la
+    stessa eccezione).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_corso = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, funzione):
+        """Esegue funzione() una sola volta per le chiamate concorrenti su key"""
+        with self._lock:
+            chiamata = self._in_corso.get(key)
+            leader = chiamata is None
+            if leader:
+                chiamata = self._in_corso[key] = _Chiamata()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            chiamata.evento.wait()
+            if chiamata.errore is not None:
+                raise chiamata.errore
+            return chiamata.risultato
+
+        try:
+            chiamata.risultato = funzione()
+            return chiamata.risultato
+        except BaseException as e:
+            chiamata.errore = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_corso[key]
+            chiamata.evento.set()
+
+    def stats(self):
+        with self._lock:
+            in_corso = len(self._in_corso)
+        return {
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'in_flight': in_corso,
+        }
@@ -0,0 +1,75 @@
+"""Rianalizza le poesie della bacheca e aggiorna le colonne metriche.
+
+Da eseguire dopo una modifica a eccezioni, lessico o motore delle sillabe:
+verse_count, syllable_counts, rhyme_scheme e is_valid vengono ricalcolati
+come in pubblicazione (Poem.campi_analisi); poem_type resta quello salvato.
+Le poesie sono lette a blocchi per id e analizzate in parallelo con
+EsecutoreAnalisi (ANALYSIS_WORKERS o --workers processi).
+
+Uso:
+    python -m utils.reanalyze_poems [--dry-run] [--workers N] [--blocco N]
+"""
+import argparse
+import sys
+
+
+def rianalizza(esecutore, dimensione_blocco=500, dry_run=False):
+    """Rianalizza tutte le poesie; restituisce (analizzate, modificate)"""
+    from models.poem import Poem, db
+
+    analizzate = modificate = 0
+    ultimo_id = 0
+    while True:
+        poesie = (Poem.query.filter(Poem.id > ultimo_id).order_by(Poem.id)
+                  .limit(dimensione_blocco).all())
+        if not poesie:
+            break
+        ultimo_id = poesie[-1].id
+        for poesia, analisi in zip(poesie, esecutore.analizza([p.content for p in poesie])):
+            analizzate += 1
+            if 'errore' in analisi:
+                print(f"⚠️  id={poesia.id}: {analisi['errore']}")
+                continue
+            campi = Poem.campi_analisi(analisi)
+            cambiati = {k: v for k, v in campi.items() if getattr(poesia, k) != v}
+            if not cambiati:
+                continue
+            modificate += 1
+            print(f" - id={poesia.id} | {poesia.title}: "
+                  + ', '.join(f"{k} {getattr(poesia, k)!r} -> {v!r}" for k, v in cambiati.items()))
+            for k, v in cambiati.items():
+                setattr(poesia, k, v)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+        # Le righe del blocco non servono più: la sessione non cresce con la tabella
+        db.session.expunge_all()
+    return analizzate, modificate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-analyse published poems and update their metrics")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would change without committing")
+    parser.add_argument("--workers", type=int, default=None, help="Analysis processes (default: ANALYSIS_WORKERS or CPU count)")
+    parser.add_argument("--blocco", type=int, default=500, help="Poems read per query")
+    args = parser.parse_args()
+
+    # Importi dentro al contesto app per usare la stessa config DB dell'istanza
+    try:
+        from app import app
+        from services.executor import EsecutoreAnalisi
+    except Exception as e:
+        print(f"Errore: impossibile importare app/db: {e}")
+        return 2
+
+    with app.app_context(), EsecutoreAnalisi(workers=args.workers) as esecutore:
+        analizzate, modificate = rianalizza(esecutore, max(1, args.blocco), args.dry_run)
+
+    esito = "da aggiornare" if args.dry_run else "aggiornate"
+    print(f"✅ Poesie analizzate: {analizzate}, {esito}: {modificate} (worker: {esecutore.workers})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
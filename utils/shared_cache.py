@@ -0,0 +1,380 @@
+"""Cache condivisa tra i worker gunicorn su un file SQLite in modalità WAL.
+
+Con `gunicorn app:app` ogni worker ha le sue cache in-process (LRUCache),
+fredde a ogni riavvio e duplicate. CacheSQLite espone la stessa interfaccia
+(get/set/clear/resize/len/stats) su una tabella condivisa nello stesso file;
+CacheDueLivelli mette una LRUCache locale davanti alla tabella, così gli hit
+ripetuti nello stesso worker non toccano il disco.
+
+Backend scelto con CACHE_BACKEND=memory (default) o sqlite; il file è
+SHARED_CACHE_PATH (default instance/cache/ nel progetto). La directory del
+file deve essere privata (dell'utente del processo, permessi 0700): altri
+utenti locali non devono poter sostituire il file. I valori sono salvati in
+JSON, che a differenza di pickle non può eseguire codice alla lettura.
+
+Ogni tabella ha come suffisso una versione del codice (digest dei sorgenti di
+config/, services/ e utils/): dopo un deploy le voci calcolate dalla versione
+precedente non vengono più lette.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import stat
+import threading
+import time
+
+from utils.cache import LRUCache
+
+_RADICE_PROGETTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERCORSO_PREDEFINITO = os.path.join(_RADICE_PROGETTO, 'instance', 'cache', 'shared_cache.sqlite3')
+BACKEND_PREDEFINITO = 'memory'
+
+# Ogni quante scritture controllare il limite di dimensione (COUNT(*) è lineare)
+INTERVALLO_POTATURA = 64
+
+# Una lettura aggiorna `accesso` solo se più vecchio di così: l'ordine per la
+# potatura resta LRU con questa granularità e gli hit non scrivono (niente lock
+# di scrittura, che con più worker si contenderebbero per il busy timeout di 1s)
+INTERVALLO_ACCESSO = 60.0
+
+# Ogni quanti secondi la cache locale ricontrolla la generazione condivisa
+# (clear() di un altro worker): al più per questo tempo serve voci invalidate
+INTERVALLO_GENERAZIONE = 1.0
+
+# Sorgenti da cui dipendono i valori in cache (conteggi, token, analisi)
+CARTELLE_VERSIONE = ('config', 'services', 'utils')
+
+_NOME_TABELLA_RE = re.compile(r'^[a-z_][a-z0-9_]*$')
+_MANCANTE = object()
+
+
+def versione_codice():
+    """Digest breve dei sorgenti Python che determinano i valori in cache"""
+    digest = hashlib.blake2b(digest_size=4)
+    for cartella in CARTELLE_VERSIONE:
+        radice = os.path.join(_RADICE_PROGETTO, cartella)
+        for nome in sorted(os.listdir(radice)) if os.path.isdir(radice) else ():
+            if nome.endswith('.py'):
+                digest.update(nome.encode('utf-8'))
+                with open(os.path.join(radice, nome), 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def directory_privata(percorso):
+    """Crea (0700) la directory del file di cache e verifica che sia privata.
+
+    Solleva PermissionError se appartiene a un altro utente o è accessibile
+    ad altri: chi può scriverci potrebbe sostituire il database condiviso.
+    """
+    cartella = os.path.dirname(os.path.abspath(percorso))
+    os.makedirs(cartella, mode=0o700, exist_ok=True)
+    info = os.stat(cartella)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(
+            f"La directory della cache condivisa deve essere privata (0700) e dell'utente corrente: {cartella}"
+        )
+    return cartella
+
+
+class CacheSQLite:
+    """Cache LRU approssimata su una tabella SQLite condivisa tra processi.
+
+    I valori sono salvati in JSON: codifica/decodifica convertono i valori
+    che JSON non rappresenta (es. NamedTuple) da e verso liste e dizionari.
+    Una voce scaduta (ttl) conta come miss. Gli errori SQLite (file bloccato,
+    disco pieno) non interrompono l'analisi: get diventa un miss e set viene
+    ignorato; una voce illeggibile viene cancellata.
+
+    L'ultimo accesso di una voce è aggiornato al più ogni INTERVALLO_ACCESSO
+    secondi, quindi gli hit sono di norma solo letture.
+    """
+
+    def __init__(self, percorso, tabella, maxsize=1024, ttl=None, codifica=None, decodifica=None):
+        if not _NOME_TABELLA_RE.match(tabella):
+            raise ValueError(f"Nome tabella non valido: {tabella!r}")
+        self.percorso = percorso
+        self.tabella = tabella
+        self.codifica = codifica or (lambda valore: valore)
+        self.decodifica = decodifica or (lambda valore: valore)
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = float(ttl) if ttl else None
+        self._locale = threading.local()
+        self._lock = threading.Lock()
+        self._scritture = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.errors = 0
+        self._connessione()
+
+    def _connessione(self):
+        """Una connessione per thread e per processo (dopo un fork va riaperta)"""
+        locale = self._locale
+        conn = getattr(locale, 'conn', None)
+        if conn is not None and locale.pid == os.getpid():
+            return conn
+        directory_privata(self.percorso)
+        conn = sqlite3.connect(self.percorso, timeout=1.0, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.tabella} ('
+            'chiave PRIMARY KEY, valore TEXT NOT NULL, scadenza REAL, accesso REAL NOT NULL)'
+        )
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {self.tabella}_accesso ON {self.tabella} (accesso)')
+        conn.execute('CREATE TABLE IF NOT EXISTS cache_generazioni (nome TEXT PRIMARY KEY, valore INTEGER NOT NULL)')
+        locale.conn = conn
+        locale.pid = os.getpid()
+        return conn
+
+    def _conta(self, attributo):
+        with self._lock:
+            setattr(self, attributo, getattr(self, attributo) + 1)
+
+    def get(self, key, default=None):
+        if not self.maxsize:
+            self._conta('misses')
+            return default
+        try:
+            conn = self._connessione()
+            riga = conn.execute(
+                f'SELECT valore, scadenza, accesso FROM {self.tabella} WHERE chiave = ?', (key,)
+            ).fetchone()
+            if riga is None:
+                self._conta('misses')
+                return default
+            valore, scadenza, accesso = riga
+            adesso = time.time()
+            if scadenza is not None and scadenza <= adesso:
+                conn.execute(f'DELETE FROM {self.tabella} WHERE chiave = ?', (key,))
+                self._conta('expirations')
+                self._conta('misses')
+                return default
+            if adesso - accesso > INTERVALLO_ACCESSO:
+                conn.execute(f'UPDATE {self.tabella} SET accesso = ? WHERE chiave = ?', (adesso, key))
+            valore = self.decodifica(json.loads(valore))
+        except sqlite3.Error:
+            self._conta('errors')
+            self._conta('misses')
+            return default
+        except Exception:
+            # Voce illeggibile (formato cambiato, dati corrotti): miss e via la riga
+            self._conta('errors')
+            self._conta('misses')
+            self._elimina(key)
+            return default
+        self._conta('hits')
+        return valore
+
+    def _elimina(self, key):
+        try:
+            self._connessione().execute(f'DELETE FROM {self.tabella} WHERE chiave = ?', (key,))
+        except sqlite3.Error:
+            pass
+
+    def set(self, key, value):
+        if not self.maxsize:
+            return
+        adesso = time.time()
+        try:
+            dati = json.dumps(self.codifica(value), ensure_ascii=False, separators=(',', ':'))
+        except (TypeError, ValueError):
+            # Valore non rappresentabile in JSON: resta solo nella cache locale
+            self._conta('errors')
+            return
+        try:
+            conn = self._connessione()
+            conn.execute(
+                f'INSERT OR REPLACE INTO {self.tabella} (chiave, valore, scadenza, accesso) VALUES (?, ?, ?, ?)',
+                (key, dati, adesso + self.ttl if self.ttl is not None else None, adesso),
+            )
+            with self._lock:
+                self._scritture += 1
+                pota = self._scritture % INTERVALLO_POTATURA == 0
+            if pota:
+                self._pota(conn)
+        except sqlite3.Error:
+            self._conta('errors')
+
+    def _pota(self, conn):
+        """Scarta le voci scadute e quelle meno recenti oltre maxsize"""
+        conn.execute(f'DELETE FROM {self.tabella} WHERE scadenza IS NOT NULL AND scadenza <= ?', (time.time(),))
+        eccesso = conn.execute(f'SELECT COUNT(*) FROM {self.tabella}').fetchone()[0] - self.maxsize
+        if eccesso > 0:
+            conn.execute(
+                f'DELETE FROM {self.tabella} WHERE chiave IN '
+                f'(SELECT chiave FROM {self.tabella} ORDER BY accesso LIMIT ?)', (eccesso,)
+            )
+
+    def clear(self):
+        """Svuota la tabella (per tutti i worker) mantenendo i contatori e
+        incrementa la generazione, così le cache locali degli altri worker si
+        svuotano (CacheDueLivelli)"""
+        try:
+            conn = self._connessione()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(f'DELETE FROM {self.tabella}')
+                conn.execute(
+                    'INSERT INTO cache_generazioni (nome, valore) VALUES (?, 1) '
+                    'ON CONFLICT(nome) DO UPDATE SET valore = valore + 1', (self.tabella,)
+                )
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            self._conta('errors')
+
+    def elimina_versioni_precedenti(self, nome):
+        """Elimina le tabelle `nome` delle versioni del codice precedenti"""
+        versione_re = re.compile(rf'^{re.escape(nome)}_v[0-9a-f]+$')
+        try:
+            conn = self._connessione()
+            tabelle = [riga[0] for riga in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            for tabella in tabelle:
+                if tabella != self.tabella and versione_re.match(tabella):
+                    conn.execute(f'DROP TABLE IF EXISTS {tabella}')
+                    conn.execute('DELETE FROM cache_generazioni WHERE nome = ?', (tabella,))
+        except sqlite3.Error:
+            self._conta('errors')
+
+    def generazione(self):
+        """Numero di clear() eseguiti sulla tabella da tutti i worker (None se non leggibile)"""
+        try:
+            riga = self._connessione().execute(
+                'SELECT valore FROM cache_generazioni WHERE nome = ?', (self.tabella,)
+            ).fetchone()
+        except sqlite3.Error:
+            self._conta('errors')
+            return None
+        return riga[0] if riga else 0
+
+    def resize(self, maxsize):
+        self.maxsize = max(0, int(maxsize))
+        try:
+            self._pota(self._connessione())
+        except sqlite3.Error:
+            self._conta('errors')
+
+    def __len__(self):
+        try:
+            return self._connessione().execute(f'SELECT COUNT(*) FROM {self.tabella}').fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def stats(self):
+        totale = self.hits + self.misses
+        return {
+            'backend': 'sqlite',
+            'hits': self.hits,
+            'misses': self.misses,
+            'expirations': self.expirations,
+            'errors': self.errors,
+            'size': len(self),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hit_rate': round(self.hits / totale, 4) if totale else 0.0,
+        }
+
+
+class CacheDueLivelli:
+    """LRUCache locale davanti a una cache condivisa, con la stessa interfaccia.
+
+    La cache locale si svuota quando cambia la generazione della tabella
+    condivisa (clear() in un altro worker), controllata al più ogni
+    INTERVALLO_GENERAZIONE secondi.
+    """
+
+    def __init__(self, locale, condivisa):
+        self.locale = locale
+        self.condivisa = condivisa
+        self._generazione = condivisa.generazione()
+        self._verificata = time.monotonic()
+
+    @property
+    def maxsize(self):
+        return self.condivisa.maxsize
+
+    def _verifica_generazione(self):
+        adesso = time.monotonic()
+        if adesso - self._verificata < INTERVALLO_GENERAZIONE:
+            return
+        self._verificata = adesso
+        generazione = self.condivisa.generazione()
+        if generazione is not None and generazione != self._generazione:
+            self._generazione = generazione
+            self.locale.clear()
+
+    def get(self, key, default=None):
+        self._verifica_generazione()
+        valore = self.locale.get(key, _MANCANTE)
+        if valore is not _MANCANTE:
+            return valore
+        valore = self.condivisa.get(key, _MANCANTE)
+        if valore is _MANCANTE:
+            return default
+        self.locale.set(key, valore)
+        return valore
+
+    def set(self, key, value):
+        self._verifica_generazione()
+        self.locale.set(key, value)
+        self.condivisa.set(key, value)
+
+    def clear(self):
+        self.locale.clear()
+        self.condivisa.clear()
+        generazione = self.condivisa.generazione()
+        if generazione is not None:
+            self._generazione = generazione
+
+    def resize(self, maxsize):
+        self.locale.resize(maxsize)
+        self.condivisa.resize(maxsize)
+
+    def __len__(self):
+        return len(self.condivisa)
+
+    def stats(self):
+        """Hit locali + condivisi; i miss sono quelli della tabella condivisa"""
+        locale = self.locale.stats()
+        condivisa = self.condivisa.stats()
+        hits = locale['hits'] + condivisa['hits']
+        totale = hits + condivisa['misses']
+        return {
+            'backend': 'memory+sqlite',
+            'hits': hits,
+            'misses': condivisa['misses'],
+            'size': condivisa['size'],
+            'maxsize': condivisa['maxsize'],
+            'ttl': condivisa['ttl'],
+            'hit_rate': round(hits / totale, 4) if totale else 0.0,
+            'locale': locale,
+            'condivisa': condivisa,
+        }
+
+
+def crea_cache(nome, maxsize, ttl=None, codifica=None, decodifica=None):
+    """Cache per `nome` secondo CACHE_BACKEND: LRUCache o locale+SQLite condivisa.
+
+    codifica/decodifica: conversione dei valori da e verso JSON (vedi CacheSQLite).
+    """
+    backend = os.environ.get('CACHE_BACKEND', BACKEND_PREDEFINITO).strip().lower()
+    if backend == 'memory' or not maxsize:
+        return LRUCache(maxsize, ttl=ttl)
+    if backend != 'sqlite':
+        raise ValueError(f"CACHE_BACKEND non valido: {backend!r} (memory, sqlite)")
+
+    percorso = os.environ.get('SHARED_CACHE_PATH', PERCORSO_PREDEFINITO)
+    tabella = f"{nome}_v{versione_codice()}"
+    try:
+        condivisa = CacheSQLite(percorso, tabella, maxsize, ttl=ttl, codifica=codifica, decodifica=decodifica)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Cache condivisa non disponibile ({percorso}): {e}; uso la cache in memoria")
+        return LRUCache(maxsize, ttl=ttl)
+    condivisa.elimina_versioni_precedenti(nome)
+    return CacheDueLivelli(LRUCache(maxsize, ttl=ttl), condivisa)
@@ -1,4 +1,4 @@
-import string
+import re
 from config.constants import VOCALI, VOCALI_FORTI, VOCALI_DEBOLI, PREFISSI_COMUNI
 
 try:
@@ -7,11 +7,20 @@ try:
 except ImportError:
     BLEACH_AVAILABLE = False
 
+# Tutto ciò che non è lettera, apostrofo o spazio diventa separatore
+_NON_AMMESSI_RE = re.compile(r"[^a-zA-Zàèéìíîòóùú' ]")
+
+# Apostrofi tipografici (da tastiere mobili) equivalenti a quello dritto
+APOSTROFI = "'’ʼ"
+_APOSTROFO_DRITTO = str.maketrans({c: "'" for c in APOSTROFI[1:]})
+
 def pulisci_testo(testo):
     """Pulisce il testo mantenendo apostrofi e caratteri essenziali"""
-    caratteri_da_mantenere = string.ascii_letters + "àèéìíîòóùú' "
-    testo_pulito = ''.join(c if c in caratteri_da_mantenere else ' ' for c in testo.lower())
-    return ' '.join(testo_pulito.split())
+    return pulisci_testo_minuscolo(testo.lower())
+
+def pulisci_testo_minuscolo(testo):
+    """Come pulisci_testo, per testo già convertito in minuscolo"""
+    return ' '.join(_NON_AMMESSI_RE.sub(' ', testo.translate(_APOSTROFO_DRITTO)).split())
 
 
 def sanitize_user_text(value: str) -> str:
@@ -31,66 +40,80 @@ def sanitize_user_text(value: str) -> str:
 
         return value
 
+# Contrazioni note -> parti precalcolate (senza stringhe vuote)
+_CONTRAZIONI = {
+    "dell'": ("del", "l'"),
+    "nell'": ("nel", "l'"),
+    "all'": ("al", "l'"),
+    "dall'": ("dal", "l'"),
+    "sull'": ("sul", "l'"),
+    "coll'": ("col", "l'"),
+    "quell'": ("quel", "l'"),
+    "quest'": ("quest",),
+    "sant'": ("sant",),
+    "un'": ("un",),
+    "l'": ("l'",),
+}
+# Regex ancorata (usata con match) compilata una volta: le alternative più lunghe prima
+_CONTRAZIONI_RE = re.compile(
+    '|'.join(re.escape(c) for c in sorted(_CONTRAZIONI, key=len, reverse=True))
+)
+
 def gestisci_apostrofi(parola):
-    """Gestisce parole con apostrofi dividendole correttamente"""
+    """Gestisce parole con apostrofi dividendole correttamente (' e ’ equivalenti)"""
     if "'" not in parola:
-        return [parola]
-    
-    contrazioni = {
-        "dell'": ("del", "l'"),
-        "nell'": ("nel", "l'"),
-        "all'": ("al", "l'"),
-        "dall'": ("dal", "l'"),
-        "sull'": ("sul", "l'"),
-        "coll'": ("col", "l'"),
-        "quell'": ("quel", "l'"),
-        "quest'": ("quest", ""),
-        "sant'": ("sant", ""),
-        "un'": ("un", ""),
-        "l'": ("", "l'")
-    }
+        if "’" not in parola and "ʼ" not in parola:
+            return (parola,)
+        parola = parola.translate(_APOSTROFO_DRITTO)
     
     parola_lower = parola.lower()
     
-    for contrazione, (prima, dopo) in contrazioni.items():
-        if parola_lower.startswith(contrazione):
-            resto = parola_lower[len(contrazione):]
-            parti = []
-            if prima: parti.append(prima)
-            if dopo: parti.append(dopo)
-            if resto: parti.append(resto)
-            return parti
+    m = _CONTRAZIONI_RE.match(parola_lower)
+    if m:
+        resto = parola_lower[m.end():]
+        prima = _CONTRAZIONI[m.group()]
+        return prima + (resto,) if resto else prima
     
     # Gestione generica per altri apostrofi
-    parti = parola.split("'")
-    risultato = []
-    
-    for i, parte in enumerate(parti):
-        parte = parte.strip()
-        if parte:
-            if i == 0 and len(parte) > 1:
-                risultato.append(parte)
-            elif i > 0 and parte and is_vocale(parte[0]):
-                risultato.append(parte)
-            elif parte:
-                risultato.append(parte)
-    
-    return risultato if risultato else [parola]
+    risultato = tuple(parte.strip() for parte in parola.split("'") if parte.strip())
+    return risultato if risultato else (parola,)
+
+def _costruisci_trie_prefissi(prefissi):
+    """Trie a dizionari annidati; la chiave '' marca la fine di un prefisso.
+
+    Solo i prefissi che terminano in vocale debole possono generare il
+    separatore, quindi gli altri non entrano nel trie.
+    """
+    trie = {}
+    for prefisso in prefissi:
+        if prefisso[-1] not in VOCALI_DEBOLI:
+            continue
+        nodo = trie
+        for c in prefisso:
+            nodo = nodo.setdefault(c, {})
+        nodo[''] = prefisso
+    return trie
+
+_TRIE_PREFISSI = _costruisci_trie_prefissi(PREFISSI_COMUNI)
 
 def gestisci_prefissi_vocalici(parola):
-    """Gestisce i prefissi con separatore virtuale"""
+    """Gestisce i prefissi con separatore virtuale (vince il prefisso più lungo)"""
     parola_lower = parola.lower()
     
-    for prefisso in PREFISSI_COMUNI:
-        if parola_lower.startswith(prefisso):
-            resto_parola = parola_lower[len(prefisso):]
-            
-            if (prefisso[-1] in VOCALI_DEBOLI and 
-                resto_parola and 
-                is_vocale(resto_parola[0]) and
-                resto_parola[0] in VOCALI_FORTI):
-                
-                return prefisso + "|" + resto_parola
+    # Scorre il trie lungo la parola raccogliendo le lunghezze dei prefissi trovati
+    nodo = _TRIE_PREFISSI
+    trovati = []
+    for c in parola_lower:
+        nodo = nodo.get(c)
+        if nodo is None:
+            break
+        if '' in nodo:
+            trovati.append(len(nodo['']))
+    
+    for lunghezza in reversed(trovati):
+        resto_parola = parola_lower[lunghezza:]
+        if resto_parola and resto_parola[0] in VOCALI_FORTI:
+            return parola_lower[:lunghezza] + "|" + resto_parola
     
     return parola_lower
 